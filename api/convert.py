@@ -2,14 +2,23 @@ from http.server import BaseHTTPRequestHandler
 import json
 import os
 import sys
-import tempfile
 from urllib.parse import parse_qs
 import io
+from itertools import chain
 
 # Add src to path to import our modules
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from src.extractor import PDFExtractor, process_pdf_to_excel
+from src.admission import Rejected, admission, client_address, estimate_pages, upload_cost
+from src.backends import DEFAULT_BACKEND, available_backends
+from src.cache import cache_key, conversion_cache
+from src.conversion import convert_upload, should_stream, stream_upload
+from src.sinks import available_sinks, get_sink
+from src.multipart import (MultipartError, MultipartParser, RequestTooLarge,
+                           boundary_from_content_type)
+from src.version import EXTRACTOR_VERSION
+
+MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50MB max
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
@@ -29,10 +38,20 @@ class handler(BaseHTTPRequestHandler):
                 "service": "PDF to Excel Converter",
                 "endpoints": {
                     "health": "/api/health",
-                    "convert": "/api/convert (POST with file and optional format parameter)"
+                    "convert": "/api/convert (POST with file and optional format and backend parameters)",
+                    "cache_stats": "/api/cache/stats",
+                    "admission_stats": "/api/admission/stats"
                 }
             }
             self.wfile.write(json.dumps(response).encode())
+        elif self.path == '/api/cache/stats':
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            self.wfile.write(json.dumps(conversion_cache.stats()).encode())
+        elif self.path == '/api/admission/stats':
+            self._send_json(200, admission.stats())
         else:
             self.send_response(404)
             self.end_headers()
@@ -40,87 +59,45 @@ class handler(BaseHTTPRequestHandler):
     def do_POST(self):
         try:
             if self.path == '/api/convert':
-                content_length = int(self.headers.get('Content-Length', 0))
-                post_data = self.rfile.read(content_length)
-                
                 # Parse multipart form data
                 content_type = self.headers.get('Content-Type', '')
                 if 'multipart/form-data' not in content_type:
-                    self.send_response(400)
-                    self.send_header('Content-type', 'application/json')
-                    self.send_header('Access-Control-Allow-Origin', '*')
-                    self.end_headers()
-                    self.wfile.write(json.dumps({"error": "Content-Type must be multipart/form-data"}).encode())
+                    self._send_json(400, {"error": "Content-Type must be multipart/form-data"})
                     return
                 
-                # Extract boundary
-                boundary = content_type.split("boundary=")[1].encode()
-                parts = post_data.split(b'--' + boundary)
-                
-                file_content = None
-                file_name = None
-                format_type = 'auto'
-                
-                for part in parts:
-                    if b'Content-Disposition' in part:
-                        if b'filename=' in part:
-                            # Extract file content
-                            file_start = part.find(b'\r\n\r\n') + 4
-                            file_end = part.rfind(b'\r\n')
-                            file_content = part[file_start:file_end]
-                            
-                            # Extract filename
-                            filename_start = part.find(b'filename="') + 10
-                            filename_end = part.find(b'"', filename_start)
-                            file_name = part[filename_start:filename_end].decode()
-                        elif b'name="format"' in part:
-                            # Extract format
-                            format_start = part.find(b'\r\n\r\n') + 4
-                            format_end = part.rfind(b'\r\n')
-                            format_type = part[format_start:format_end].decode().strip()
+                content_length = int(self.headers.get('Content-Length', 0))
                 
-                if not file_content or not file_name:
-                    self.send_response(400)
-                    self.send_header('Content-type', 'application/json')
-                    self.send_header('Access-Control-Allow-Origin', '*')
-                    self.end_headers()
-                    self.wfile.write(json.dumps({"error": "No file provided"}).encode())
+                # Shed load before the body is read
+                try:
+                    admission.check(self._client())
+                except Rejected as e:
+                    self.close_connection = True
+                    self._send_json(e.status, {"error": str(e), "reason": e.reason},
+                                    {'Retry-After': str(e.retry_after)})
                     return
                 
-                # Save temporary file
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
-                    tmp.write(file_content)
-                    tmp_path = tmp.name
+                # Stream the body in chunks; the file part is spooled with
+                # bounded memory and the size limit is checked while reading
+                try:
+                    parser = MultipartParser(
+                        self.rfile, boundary_from_content_type(content_type),
+                        content_length, MAX_CONTENT_LENGTH
+                    )
+                    fields, files = parser.parse()
+                except RequestTooLarge as e:
+                    self.close_connection = True
+                    self._send_json(413, {"error": str(e)})
+                    return
+                except MultipartError as e:
+                    self.close_connection = True
+                    self._send_json(400, {"error": str(e)})
+                    return
                 
                 try:
-                    # Process the PDF
-                    if format_type == 'table':
-                        df = PDFExtractor.extract_lab_report(tmp_path)
-                    elif format_type == 'text':
-                        text = PDFExtractor.extract_text(tmp_path)
-                        import pandas as pd
-                        df = pd.DataFrame({"Extracted Text": [text]})
-                    else:
-                        df = PDFExtractor.extract_lab_report(tmp_path)
-                    
-                    # Create Excel file in memory
-                    excel_buffer = io.BytesIO()
-                    df.to_excel(excel_buffer, index=False, sheet_name="Data")
-                    excel_buffer.seek(0)
-                    excel_data = excel_buffer.getvalue()
-                    
-                    # Send response
-                    self.send_response(200)
-                    self.send_header('Content-type', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-                    self.send_header('Content-Disposition', f'attachment; filename="{file_name.replace(".pdf", "_extracted.xlsx")}"')
-                    self.send_header('Access-Control-Allow-Origin', '*')
-                    self.send_header('Content-Length', str(len(excel_data)))
-                    self.end_headers()
-                    self.wfile.write(excel_data)
+                    self._convert_upload(fields, files)
                 finally:
-                    # Clean up temp file
-                    if os.path.exists(tmp_path):
-                        os.remove(tmp_path)
+                    for part in files.values():
+                        part.close()
             else:
                 self.send_response(404)
                 self.end_headers()
@@ -131,6 +108,111 @@ class handler(BaseHTTPRequestHandler):
             self.end_headers()
             self.wfile.write(json.dumps({"error": str(e), "type": type(e).__name__}).encode())
 
+    def _convert_upload(self, fields, files):
+        """Convert the uploaded PDF and send the workbook (or an error)."""
+        format_type = fields.get('format', 'auto').strip()
+        backend = fields.get('backend', DEFAULT_BACKEND).strip()
+        upload = next((part for part in files.values() if part.filename), None)
+        
+        if upload is None or upload.size == 0:
+            self._send_json(400, {"error": "No file provided"})
+            return
+        file_name = upload.filename
+        
+        if backend not in available_backends():
+            self._send_json(400, {"error": f"Unknown backend: {backend}"})
+            return
+        
+        output = fields.get('output', 'xlsx').strip()
+        if output not in available_sinks():
+            self._send_json(400, {"error": f"Unknown output: {output}"})
+            return
+        sink = get_sink(output)
+        
+        download_name = file_name.replace(".pdf", "_extracted" + sink.extensions[0])
+        pages = estimate_pages(upload.file)
+        key = cache_key(upload.file, EXTRACTOR_VERSION,
+                        format=format_type, backend=backend, output=output)
+        
+        # Serve repeated uploads of the same report from the cache; only
+        # conversions are admitted
+        def convert():
+            with admission.admit(upload_cost(upload.file, pages)):
+                return convert_upload(upload.file, format_type, backend, output)
+        
+        try:
+            # Large workbooks are streamed while they are extracted (not cached)
+            if (should_stream(output, pages, fields.get('stream'))
+                    and not conversion_cache.contains(key)):
+                chunks = stream_upload(upload.file, format_type, backend,
+                                       admission.admit(upload_cost(upload.file, pages)))
+                first = next(chunks)
+                self._send_stream(chain([first], chunks), sink.mimetype, download_name)
+                return
+            excel_data = conversion_cache.get_or_compute(key, convert)
+        except Rejected as e:
+            self._send_json(e.status, {"error": str(e), "reason": e.reason},
+                            {'Retry-After': str(e.retry_after)})
+            return
+        
+        # Send response
+        self.send_response(200)
+        self.send_header('Content-type', sink.mimetype)
+        self.send_header('Content-Disposition', f'attachment; filename="{download_name}"')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Content-Length', str(len(excel_data)))
+        self.end_headers()
+        self.wfile.write(excel_data)
+
+    def _send_stream(self, chunks, mimetype, file_name):
+        """Send a response body as it is produced, then close the connection.
+        
+        HTTP/1.1 clients get chunked transfer encoding; HTTP/1.0 clients
+        get a body that ends when the connection closes.
+        """
+        chunked = self.request_version == 'HTTP/1.1'
+        if chunked:
+            # This response only; the connection is closed after it
+            self.protocol_version = 'HTTP/1.1'
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header('Content-type', mimetype)
+        self.send_header('Content-Disposition', f'attachment; filename="{file_name}"')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Connection', 'close')
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                if chunked:
+                    self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+                else:
+                    self.wfile.write(chunk)
+                self.wfile.flush()
+        except Exception:
+            # Too late for an error response: end the body unterminated so
+            # the client sees a truncated download (logged by stream_upload)
+            return
+        if chunked:
+            self.wfile.write(b'0\r\n\r\n')
+
+    def _send_json(self, status, payload, headers=None):
+        self.send_response(status)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(json.dumps(payload).encode())
+
+    def _client(self):
+        """Client address for rate limiting (see admission.client_address)."""
+        return client_address(self.client_address[0],
+                              self.headers.get_all('X-Forwarded-For') or ())
+
     def do_OPTIONS(self):
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
@@ -1,15 +1,28 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file, stream_with_context
 from werkzeug.utils import secure_filename
 import os
 import sys
-import tempfile
 import io
+from contextlib import ExitStack
+from itertools import chain
 from pathlib import Path
 
 # Add parent directory to path to import src modules
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.extractor import PDFExtractor
+# Only light modules are imported at load time, so a cold start that serves
+# /api/health, / or a preflight never loads pandas or the PDF stack. The
+# extraction modules are imported by the routes that convert.
+from src.admission import Rejected, admission, client_address, estimate_pages, upload_cost
+from src.backends import DEFAULT_BACKEND, available_backends
+from src.cache import cache_key, conversion_cache
+from src.conversion import (convert_source, convert_upload, pdf_source, should_stream,
+                            stream_upload)
+from src.jobs import DONE, FAILED, JobManager, QueueFull
+from src.profiling import METRICS
+from src.sinks import available_sinks, get_sink
+from src.templates import template_registry
+from src.version import EXTRACTOR_VERSION
 
 app = Flask(__name__)
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB max
@@ -18,6 +31,15 @@ ALLOWED_EXTENSIONS = {'pdf'}
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def _client():
+    """Client address for rate limiting (see admission.client_address)."""
+    return client_address(request.remote_addr, request.headers.getlist('X-Forwarded-For'))
+
+def _rejected(e):
+    response = jsonify({"error": str(e), "reason": e.reason})
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, e.status
+
 @app.route('/api/health', methods=['GET'])
 def health():
     return jsonify({"status": "ok", "message": "PDF to Excel converter is running"})
@@ -25,6 +47,9 @@ def health():
 @app.route('/api/convert', methods=['POST'])
 def convert_pdf():
     try:
+        # Shed load before the upload is read
+        admission.check(_client())
+        
         if 'file' not in request.files:
             return jsonify({"error": "No file provided"}), 400
         
@@ -39,50 +64,238 @@ def convert_pdf():
         if output_format not in ['auto', 'table', 'text']:
             output_format = 'auto'
         
-        # Save to temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
-            file.save(tmp.name)
-            tmp_path = tmp.name
+        backend = request.form.get('backend', DEFAULT_BACKEND)
+        if backend not in available_backends():
+            return jsonify({"error": f"Unknown backend: {backend}"}), 400
+        
+        output = request.form.get('output', 'xlsx')
+        if output not in available_sinks():
+            return jsonify({"error": f"Unknown output: {output}"}), 400
+        sink = get_sink(output)
+        
+        download_name = f"{secure_filename(file.filename.rsplit('.', 1)[0])}_extracted{sink.extensions[0]}"
+        pages = estimate_pages(file.stream)
+        key = cache_key(file.stream, EXTRACTOR_VERSION,
+                        format=output_format, backend=backend, output=output)
+        
+        # Large workbooks are streamed while they are extracted (not cached)
+        if (should_stream(output, pages, request.form.get('stream'))
+                and not conversion_cache.contains(key)):
+            chunks = stream_upload(file, output_format, backend,
+                                   admission.admit(upload_cost(file, pages)))
+            first = next(chunks)
+            return Response(stream_with_context(chain([first], chunks)),
+                            mimetype=sink.mimetype,
+                            headers={"Content-Disposition": f"attachment; filename={download_name}"})
+        
+        # Serve repeated uploads of the same report from the cache; only
+        # conversions are admitted
+        def convert():
+            with admission.admit(upload_cost(file, pages)):
+                return convert_upload(file, output_format, backend, output)
+        
+        excel_data = conversion_cache.get_or_compute(key, convert)
+        
+        # Return Excel file
+        return send_file(
+            io.BytesIO(excel_data),
+            mimetype=sink.mimetype,
+            as_attachment=True,
+            download_name=download_name
+        )
+    except Rejected as e:
+        return _rejected(e)
+    except Exception as e:
+        return jsonify({"error": str(e), "type": type(e).__name__}), 500
+
+@app.route('/api/convert/bulk', methods=['POST'])
+def convert_bulk():
+    """Convert several PDFs into one workbook with one sheet per report."""
+    from src.bulk import MAX_BULK_FILES, convert_reports
+    try:
+        admission.check(_client())
+        
+        files = [f for f in request.files.getlist('files') if f.filename]
+        if not files:
+            return jsonify({"error": "No files provided"}), 400
+        if len(files) > MAX_BULK_FILES:
+            return jsonify({"error": f"At most {MAX_BULK_FILES} files per request"}), 400
+        
+        bad = [f.filename for f in files if not allowed_file(f.filename)]
+        if bad:
+            return jsonify({"error": f"Only PDF files allowed: {', '.join(bad)}"}), 400
+        
+        output_format = request.form.get('format', 'auto')
+        if output_format not in ['auto', 'table', 'text']:
+            output_format = 'auto'
+        
+        backend = request.form.get('backend', DEFAULT_BACKEND)
+        if backend not in available_backends():
+            return jsonify({"error": f"Unknown backend: {backend}"}), 400
+        
+        excel_buffer = io.BytesIO()
+        cost = sum(upload_cost(file) for file in files)
+        # Uploads are read in memory or spooled, as for /api/convert
+        with admission.admit(cost), ExitStack() as stack:
+            reports = [(file.filename, stack.enter_context(pdf_source(file)))
+                       for file in files]
+            convert_reports(reports, excel_buffer, output_format, backend)
+        excel_buffer.seek(0)
+        
+        return send_file(
+            excel_buffer,
+            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            as_attachment=True,
+            download_name="reports_extracted.xlsx"
+        )
+    except Rejected as e:
+        return _rejected(e)
+    except Exception as e:
+        return jsonify({"error": str(e), "type": type(e).__name__}), 500
+
+def _run_job(input_path, result_path, options, progress):
+    """Job worker: convert a queued upload and write the result file."""
+    output_format, backend = options['format'], options['backend']
+    output = options.get('output', 'xlsx')
+    # Same key as /api/convert, so either one serves the other's conversions
+    with open(input_path, 'rb') as f:
+        key = cache_key(f, EXTRACTOR_VERSION,
+                        format=output_format, backend=backend, output=output)
+    
+    # Extraction is reported as 0-90%, writing the workbook as the rest
+    def on_page(done, total):
+        progress(0.9 * done / total)
+    
+    excel_data = conversion_cache.get_or_compute(
+        key, lambda: convert_source(input_path, output_format, backend, output,
+                                    progress=on_page)
+    )
+    with open(result_path, 'wb') as f:
+        f.write(excel_data)
+
+job_manager = JobManager.from_env(_run_job)
+
+def _job_urls(job):
+    return {
+        "status_url": f"/api/jobs/{job.id}",
+        "result_url": f"/api/jobs/{job.id}/result",
+    }
+
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    try:
+        # Jobs have their own queue; only the client's rate limit applies
+        admission.throttle(_client())
+        
+        if 'file' not in request.files:
+            return jsonify({"error": "No file provided"}), 400
+        
+        file = request.files['file']
+        if file.filename == '':
+            return jsonify({"error": "No file selected"}), 400
+        
+        if not allowed_file(file.filename):
+            return jsonify({"error": "Only PDF files allowed"}), 400
+        
+        output_format = request.form.get('format', 'auto')
+        if output_format not in ['auto', 'table', 'text']:
+            output_format = 'auto'
+        
+        backend = request.form.get('backend', DEFAULT_BACKEND)
+        if backend not in available_backends():
+            return jsonify({"error": f"Unknown backend: {backend}"}), 400
+        
+        output = request.form.get('output', 'xlsx')
+        if output not in available_sinks():
+            return jsonify({"error": f"Unknown output: {output}"}), 400
         
         try:
-            # Process the PDF
-            if output_format == 'table':
-                df = PDFExtractor.extract_lab_report(tmp_path)
-            elif output_format == 'text':
-                text = PDFExtractor.extract_text(tmp_path)
-                import pandas as pd
-                df = pd.DataFrame({"Extracted Text": [text]})
-            else:
-                df = PDFExtractor.extract_lab_report(tmp_path)
-            
-            # Create Excel in memory
-            excel_buffer = io.BytesIO()
-            df.to_excel(excel_buffer, index=False, sheet_name="Data")
-            excel_buffer.seek(0)
-            
-            # Return Excel file
-            return send_file(
-                excel_buffer,
-                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                as_attachment=True,
-                download_name=f"{secure_filename(file.filename.rsplit('.', 1)[0])}_extracted.xlsx"
-            )
-        finally:
-            if os.path.exists(tmp_path):
-                os.remove(tmp_path)
+            job = job_manager.submit(file.save, file.filename,
+                                     {"format": output_format, "backend": backend,
+                                      "output": output})
+        except QueueFull as e:
+            response = jsonify({"error": str(e)})
+            response.headers['Retry-After'] = '30'
+            return response, 503
+        
+        response = jsonify({**job.to_dict(), **_job_urls(job)})
+        response.headers['Location'] = f"/api/jobs/{job.id}"
+        return response, 202
+    
+    except Rejected as e:
+        return _rejected(e)
     except Exception as e:
         return jsonify({"error": str(e), "type": type(e).__name__}), 500
 
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    return jsonify({**job.to_dict(), **_job_urls(job)})
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    if job.status == FAILED:
+        return jsonify({"error": job.error, "status": job.status}), 500
+    if job.status != DONE:
+        return jsonify({"error": "Job not finished", "status": job.status,
+                        "progress": job.progress}), 409
+    
+    sink = get_sink(job.options.get('output', 'xlsx'))
+    return send_file(
+        job.result_path,
+        mimetype=sink.mimetype,
+        as_attachment=True,
+        download_name=f"{secure_filename(job.filename.rsplit('.', 1)[0])}_extracted{sink.extensions[0]}"
+    )
+
+@app.route('/api/jobs/stats', methods=['GET'])
+def job_stats():
+    return jsonify(job_manager.stats())
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(conversion_cache.stats())
+
+@app.route('/api/admission/stats', methods=['GET'])
+def admission_stats():
+    """Capacity in use, queue depth and wait times, and rejection counts."""
+    return jsonify(admission.stats())
+
+@app.route('/api/templates/stats', methods=['GET'])
+def template_stats():
+    """Learned-template hit rate and table detection time saved."""
+    return jsonify(template_registry.stats())
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Per-stage conversion histograms in Prometheus text format."""
+    return app.response_class(METRICS.render_prometheus(),
+                              mimetype='text/plain; version=0.0.4')
+
 @app.route('/', methods=['GET'])
 def index():
     return jsonify({
         "service": "PDF to Excel Converter",
         "endpoints": {
             "health": "/api/health",
-            "convert": "/api/convert (POST with file)"
+            "convert": "/api/convert (POST with file, optional format, backend, output and stream)",
+            "convert_bulk": "/api/convert/bulk (POST with files, one sheet per report)",
+            "cache_stats": "/api/cache/stats",
+            "admission_stats": "/api/admission/stats",
+            "template_stats": "/api/templates/stats",
+            "metrics": "/api/metrics",
+            "jobs": "/api/jobs (POST with file, returns job id)",
+            "job_status": "/api/jobs/<id>",
+            "job_result": "/api/jobs/<id>/result"
         }
     })
 
 @app.route('/api/convert', methods=['OPTIONS'])
+@app.route('/api/convert/bulk', methods=['OPTIONS'])
 def handle_options():
     return '', 204
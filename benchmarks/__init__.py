@@ -0,0 +1,5 @@
+"""Benchmarks for the PDF to Excel conversion pipeline.
+
+Run ``python -m benchmarks --help`` for the stage benchmark; the other
+modules in this package are standalone scripts for specific components.
+"""
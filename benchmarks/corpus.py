@@ -0,0 +1,202 @@
+"""Deterministic synthetic lab-report PDFs for benchmarking.
+
+The PDFs are written directly (no PDF library needed) with the standard
+Helvetica font, so the same seed always produces byte-identical files.
+Three report kinds are generated:
+
+- ``text``: results laid out as positioned text, no ruling lines
+- ``single_table``: one ruled results table per page
+- ``multi_table``: several ruled panels (CBC, biochemistry, ...) per page
+"""
+
+import random
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842
+KINDS = ('text', 'single_table', 'multi_table')
+
+# (test, unit, low, high)
+TESTS = [
+    ('Haemoglobin', 'g/dL', 13.0, 17.0),
+    ('Total RBC Count', 'mill/cumm', 4.5, 5.5),
+    ('Packed Cell Volume', '%', 40.0, 50.0),
+    ('MCV', 'fL', 83.0, 101.0),
+    ('MCH', 'pg', 27.0, 32.0),
+    ('MCHC', 'g/dL', 31.5, 34.5),
+    ('RDW', '%', 11.6, 14.0),
+    ('Total WBC Count', 'cumm', 4000, 11000),
+    ('Neutrophils', '%', 40.0, 80.0),
+    ('Lymphocytes', '%', 20.0, 40.0),
+    ('Eosinophils', '%', 1.0, 6.0),
+    ('Monocytes', '%', 2.0, 10.0),
+    ('Platelet Count', 'lakh/cumm', 1.5, 4.1),
+    ('Fasting Glucose', 'mg/dL', 70.0, 100.0),
+    ('HbA1c', '%', 4.0, 5.6),
+    ('Serum Creatinine', 'mg/dL', 0.7, 1.3),
+    ('Blood Urea', 'mg/dL', 15.0, 40.0),
+    ('Total Cholesterol', 'mg/dL', 125.0, 200.0),
+    ('Triglycerides', 'mg/dL', 25.0, 150.0),
+    ('SGPT (ALT)', 'U/L', 7.0, 56.0),
+    ('SGOT (AST)', 'U/L', 5.0, 40.0),
+    ('Sodium', 'mmol/L', 135.0, 145.0),
+    ('Potassium', 'mmol/L', 3.5, 5.1),
+    ('TSH', 'uIU/mL', 0.4, 4.0),
+]
+PANELS = ['Complete Blood Count', 'Biochemistry', 'Lipid Profile', 'Electrolytes']
+COLUMNS = ['Test', 'Value', 'Unit', 'Flag', 'Reference']
+COLUMN_X = [50, 215, 285, 375, 420, 545]
+ROW_HEIGHT = 16
+
+
+def _escape(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def _text(x: float, y: float, text: str, size: int = 9) -> str:
+    return f"BT /F1 {size} Tf {x:.1f} {y:.1f} Td ({_escape(text)}) Tj ET"
+
+
+def _result_row(rng: random.Random) -> List[str]:
+    test, unit, low, high = rng.choice(TESTS)
+    span = high - low
+    value = rng.uniform(low - span * 0.3, high + span * 0.3)
+    flag = 'H' if value > high else 'L' if value < low else ''
+    fmt = '{:.0f}' if high >= 1000 else '{:.1f}'
+    reference = f"{fmt.format(low)} - {fmt.format(high)}"
+    return [test, fmt.format(value), unit, flag, reference]
+
+
+def _header(rng: random.Random, index: int, page: int) -> Tuple[List[str], float]:
+    """Report letterhead; returns content ops and the y below it."""
+    ops = [
+        _text(50, 800, 'City Pathology Laboratory', 14),
+        _text(50, 782, f"Patient Name: Patient {index:05d}"),
+        _text(300, 782, f"Patient ID: CP{index:06d}"),
+        _text(50, 768, f"Report Date: 2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"),
+        _text(300, 768, f"Page {page}"),
+    ]
+    return ops, 740
+
+
+def _table(rng: random.Random, top: float, rows: int, title: str) -> Tuple[List[str], float]:
+    """A ruled results table; returns content ops and the y below it."""
+    ops = [_text(50, top, title, 11)]
+    top -= 8
+    body = [COLUMNS] + [_result_row(rng) for _ in range(rows)]
+    bottom = top - ROW_HEIGHT * len(body)
+    ops.append('0.5 w')
+    for i in range(len(body) + 1):
+        y = top - ROW_HEIGHT * i
+        ops.append(f"{COLUMN_X[0]} {y:.1f} m {COLUMN_X[-1]} {y:.1f} l S")
+    for x in COLUMN_X:
+        ops.append(f"{x} {top:.1f} m {x} {bottom:.1f} l S")
+    for i, row in enumerate(body):
+        y = top - ROW_HEIGHT * (i + 1) + 5
+        for x, cell in zip(COLUMN_X, row):
+            ops.append(_text(x + 3, y, cell))
+    return ops, bottom - 24
+
+
+def _page_content(kind: str, rng: random.Random, index: int, page: int,
+                  rows: Optional[int] = None) -> str:
+    ops, y = _header(rng, index, page)
+    if kind == 'text':
+        while y > 60:
+            for x, cell in zip(COLUMN_X, _result_row(rng)):
+                ops.append(_text(x, y, cell))
+            y -= 14
+    elif kind == 'single_table':
+        table, _ = _table(rng, y, rows or 38, PANELS[0])
+        ops += table
+    else:
+        for panel in PANELS[:3]:
+            table, y = _table(rng, y, rows or 11, panel)
+            ops += table
+    return '\n'.join(ops)
+
+
+def build_pdf(kind: str, pages: int, seed: int = 0, rows: Optional[int] = None) -> bytes:
+    """Return the bytes of a synthetic report of the given kind and length.
+
+    rows sets the result rows per table (default 38 for single_table, 11
+    per panel for multi_table).
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Unknown report kind '{kind}'. Choose from {', '.join(KINDS)}")
+    rng = random.Random(f"{kind}-{pages}-{seed}")
+    index = rng.randint(1, 99999)
+    return _pdf_file([_page_content(kind, rng, index, page, rows)
+                      for page in range(1, pages + 1)])
+
+
+def build_prose_pdf(lines: Sequence[str]) -> bytes:
+    """Return a one-page PDF of plain text lines (no results, no tables)."""
+    return _pdf_file(['\n'.join(_text(50, 800 - 14 * i, line)
+                                for i, line in enumerate(lines))])
+
+
+def _pdf_file(contents: Sequence[str]) -> bytes:
+    """A PDF with one page per content stream."""
+    pages = len(contents)
+    # Object numbers: 1 catalog, 2 pages, 3 font, then (page, content) pairs
+    objects: Dict[int, bytes] = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica "
+           b"/Encoding /WinAnsiEncoding >>",
+    }
+    kids = []
+    for page, content in enumerate(contents, start=1):
+        page_obj, content_obj = 2 + 2 * page, 3 + 2 * page
+        kids.append(f"{page_obj} 0 R")
+        stream = zlib.compress(content.encode('latin-1'))
+        objects[page_obj] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_obj} 0 R >>"
+        ).encode()
+        objects[content_obj] = (
+            f"<< /Length {len(stream)} /Filter /FlateDecode >>\nstream\n".encode()
+            + stream + b"\nendstream"
+        )
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = {}
+    for number in sorted(objects):
+        offsets[number] = len(out)
+        out += f"{number} 0 obj\n".encode() + objects[number] + b"\nendobj\n"
+    xref = len(out)
+    size = max(objects) + 1
+    out += f"xref\n0 {size}\n0000000000 65535 f \n".encode()
+    for number in range(1, size):
+        out += f"{offsets[number]:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+# Named corpora: (kind, pages) cases
+CORPORA = {
+    'quick': [('text', 1), ('text', 20), ('single_table', 1), ('single_table', 20),
+              ('multi_table', 1), ('multi_table', 20)],
+    'full': [(kind, pages) for kind in KINDS for pages in (1, 10, 100, 500)],
+}
+
+
+def case_id(kind: str, pages: int) -> str:
+    return f"{kind}_{pages}p"
+
+
+def generate_corpus(directory: str, cases: Sequence[Tuple[str, int]],
+                    seed: int = 0) -> List[Path]:
+    """Write the corpus files (reusing identical existing ones) and return their paths."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for kind, pages in cases:
+        path = directory / f"{case_id(kind, pages)}.pdf"
+        data = build_pdf(kind, pages, seed)
+        if not path.exists() or path.read_bytes() != data:
+            path.write_bytes(data)
+        paths.append(path)
+    return paths
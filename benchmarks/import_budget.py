@@ -0,0 +1,116 @@
+"""Cold-start import cost of the serverless entry point, checked against a budget.
+
+Imports a module (``api.index`` by default) in a fresh interpreter with
+``python -X importtime``, then serves the requests a cold instance
+typically answers first (health check, index, CORS preflight) with the
+Flask test client. Prints the import time grouped by top-level package
+and fails (exit status 1) when:
+
+- importing the module takes longer than --budget-ms, or
+- any of the heavy PDF/data modules (pandas, pdfplumber, openpyxl, ...)
+  was loaded by the import or by those requests.
+
+Usage:
+    python benchmarks/import_budget.py
+    python benchmarks/import_budget.py --budget-ms 400 --top 20
+"""
+
+import argparse
+import importlib
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded only by routes that convert
+HEAVY_MODULES = ('pandas', 'numpy', 'pdfplumber', 'pdfminer', 'pypdfium2', 'PIL',
+                 'openpyxl', 'pyarrow', 'PyPDF2')
+
+# (method, path) answered without touching the conversion stack
+LIGHT_REQUESTS = (('GET', '/api/health'), ('GET', '/'), ('OPTIONS', '/api/convert'))
+
+
+def child(module: str) -> None:
+    """Import the module, serve the light requests, print a JSON report."""
+    sys.path.insert(0, ROOT)
+    start = time.perf_counter()
+    app_module = importlib.import_module(module)
+    import_ms = (time.perf_counter() - start) * 1000
+    loaded_by_import = _heavy_loaded()
+
+    client = app_module.app.test_client()
+    statuses = {f"{method} {path}": client.open(path, method=method).status_code
+                for method, path in LIGHT_REQUESTS}
+    print(json.dumps({"import_ms": import_ms, "loaded_by_import": loaded_by_import,
+                      "loaded_by_requests": _heavy_loaded(), "statuses": statuses}))
+
+
+def _heavy_loaded() -> List[str]:
+    return sorted(name for name in HEAVY_MODULES if name in sys.modules)
+
+
+def parse_importtime(stderr: str) -> Dict[str, float]:
+    """Self import time in ms per top-level package from -X importtime output."""
+    by_package: Dict[str, float] = defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|', 2)
+        by_package[name.strip().split('.')[0]] += int(self_us) / 1000
+    return dict(by_package)
+
+
+def measure(module: str) -> Tuple[dict, Dict[str, float]]:
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', os.path.abspath(__file__), '--child', module],
+        capture_output=True, text=True, cwd=ROOT)
+    if result.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{result.stderr[-2000:]}")
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    return report, parse_importtime(result.stderr)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--module', default='api.index')
+    parser.add_argument('--budget-ms', type=float, default=500.0,
+                        help='Allowed import time of the module')
+    parser.add_argument('--top', type=int, default=15,
+                        help='Packages to list in the breakdown')
+    parser.add_argument('--child', metavar='MODULE', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        return 0
+
+    report, by_package = measure(args.module)
+    print(f"{'package':<24} {'self ms':>9}")
+    for package, ms in sorted(by_package.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{package:<24} {ms:9.1f}")
+    for request_name, status in report["statuses"].items():
+        print(f"{request_name:<24} {status:>9}")
+
+    failures = []
+    if report["import_ms"] > args.budget_ms:
+        failures.append(f"import took {report['import_ms']:.0f} ms "
+                        f"(budget {args.budget_ms:.0f} ms)")
+    if report["loaded_by_import"]:
+        failures.append(f"import loaded {', '.join(report['loaded_by_import'])}")
+    extra = sorted(set(report["loaded_by_requests"]) - set(report["loaded_by_import"]))
+    if extra:
+        failures.append(f"light requests loaded {', '.join(extra)}")
+
+    status = 'FAILED: ' + '; '.join(failures) if failures else 'ok'
+    print(f"import {args.module}: {report['import_ms']:.0f} ms "
+          f"(budget {args.budget_ms:.0f} ms): {status}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""Concurrent load test of an HTTP conversion entry point.
+
+Serves one of the entry points on a local threaded server, then sends
+--requests conversions of several distinct synthetic reports, --concurrency
+at a time. Every response is compared with the output of converting the
+same report on its own, so a request that gets another request's input
+(or a partial file) shows up as a mismatch. The conversion cache is
+disabled, so every request really converts.
+
+Requests refused by admission control (503 or 429, with Retry-After)
+are counted as shed, not as errors; the queue wait times and rejection
+counts of the run are printed to help size PDF_ADMIT_*. All requests come
+from one address, so the per-client rate limit is off unless
+PDF_CLIENT_RATE is set.
+
+The check fails (exit status 1) on any error or mismatch, when more than
+--max-shed of the requests are shed, or when throughput falls below
+--min-rps.
+
+Entry points:
+
+- ``index``: api/index.py (Flask, the Vercel function)
+- ``app``: src/api.py (Flask, local server)
+- ``convert``: api/convert.py (http.server handler)
+
+Usage:
+    python benchmarks/load_test.py --requests 200 --concurrency 16
+    python benchmarks/load_test.py --target convert --output xlsx --min-rps 5
+    PDF_ADMIT_CAPACITY=20 PDF_ADMIT_QUEUE=4 python benchmarks/load_test.py --max-shed 0.9
+"""
+
+import argparse
+import http.client
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer
+from typing import List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Read when the entry points are imported
+os.environ['PDF_CACHE_DISABLED'] = '1'
+os.environ.setdefault('PDF_OCR', 'off')
+os.environ.setdefault('PDF_CLIENT_RATE', '0')
+
+from benchmarks.corpus import KINDS, build_pdf  # noqa: E402
+
+TARGETS = ('index', 'app', 'convert')
+BOUNDARY = '----pdfx-load-test-boundary'
+SHED = (429, 503)
+
+
+def start_server(target: str):
+    """Serve the entry point on a free local port in a background thread."""
+    if target == 'convert':
+        from api.convert import handler
+        server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    else:
+        from werkzeug.serving import make_server
+        if target == 'index':
+            from api.index import app
+        else:
+            from src.api import app
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def multipart_body(pdf: bytes, output: str) -> bytes:
+    return (f'--{BOUNDARY}\r\n'
+            f'Content-Disposition: form-data; name="output"\r\n\r\n{output}\r\n'
+            f'--{BOUNDARY}\r\n'
+            'Content-Disposition: form-data; name="file"; filename="report.pdf"\r\n'
+            'Content-Type: application/pdf\r\n\r\n').encode() + pdf + \
+        f'\r\n--{BOUNDARY}--\r\n'.encode()
+
+
+def post(port: int, body: bytes) -> Tuple[int, bytes, float]:
+    """Send one conversion; return (status, response body, seconds).
+
+    A shed response without a Retry-After header is reported as status 0.
+    """
+    started = time.perf_counter()
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=600)
+    try:
+        connection.request('POST', '/api/convert', body, {
+            'Content-Type': f'multipart/form-data; boundary={BOUNDARY}',
+            'Content-Length': str(len(body)),
+        })
+        response = connection.getresponse()
+        status = response.status
+        if status in SHED and not response.getheader('Retry-After'):
+            status = 0
+        return status, response.read(), time.perf_counter() - started
+    finally:
+        connection.close()
+
+
+def expected_outputs(reports: List[bytes], output: str) -> List[bytes]:
+    from src.conversion import convert_upload
+    return [convert_upload(pdf, output=output) for pdf in reports]
+
+
+def same_output(actual: bytes, expected: bytes, output: str) -> bool:
+    if output != 'xlsx':
+        return actual == expected
+    # Workbooks embed their creation time; compare the cell values
+    import io
+
+    from openpyxl import load_workbook
+
+    def cells(data):
+        workbook = load_workbook(io.BytesIO(data), read_only=True)
+        return [list(sheet.values) for sheet in workbook.worksheets]
+    return cells(actual) == cells(expected)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--target', choices=TARGETS, default='index')
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--reports', type=int, default=6,
+                        help='Distinct reports the requests cycle through')
+    parser.add_argument('--pages', type=int, default=2)
+    parser.add_argument('--output', default='csv', help='Output format requested')
+    parser.add_argument('--min-rps', type=float, default=0.0,
+                        help='Fail when throughput is below this many requests/s')
+    parser.add_argument('--max-shed', type=float, default=0.0,
+                        help='Fraction of requests admission control may shed')
+    args = parser.parse_args()
+
+    reports = [build_pdf(KINDS[i % len(KINDS)], args.pages, seed=i)
+               for i in range(args.reports)]
+    expected = expected_outputs(reports, args.output)
+    bodies = [multipart_body(pdf, args.output) for pdf in reports]
+
+    server = start_server(args.target)
+    port = server.server_address[1]
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(lambda i: (i % len(reports),
+                                               post(port, bodies[i % len(reports)])),
+                                    range(args.requests)))
+        elapsed = time.perf_counter() - started
+    finally:
+        server.shutdown()
+
+    from src.admission import admission
+    
+    shed = sum(1 for _, (status, _, _) in results if status in SHED)
+    errors = [status for _, (status, _, _) in results if status not in (200,) + SHED]
+    mismatches = sum(1 for index, (status, body, _) in results
+                     if status == 200 and not same_output(body, expected[index], args.output))
+    latencies = sorted(seconds for _, (status, _, seconds) in results if status == 200) or [0.0]
+    rps = (len(results) - shed) / elapsed
+    p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+
+    print(f"{args.target}: {len(results)} requests, concurrency {args.concurrency}, "
+          f"{args.reports} reports x {args.pages} pages, output {args.output}")
+    print(f"throughput {rps:.1f} req/s   latency p50 {statistics.median(latencies) * 1000:.0f} ms"
+          f"   p95 {p95 * 1000:.0f} ms")
+    print(f"errors {len(errors)}   mismatched outputs {mismatches}   shed {shed}")
+    stats = admission.stats()
+    waits = stats['wait_seconds']
+    print(f"admission: queue wait p50 {waits['p50'] * 1000:.0f} ms   p95 {waits['p95'] * 1000:.0f} ms"
+          f"   max {waits['max'] * 1000:.0f} ms   rejected {stats['rejected']} "
+          f"(queue full {stats['queue_full']}, wait timeout {stats['wait_timeout']}, "
+          f"rate limited {stats['rate_limited']})")
+
+    failed = errors or mismatches or shed > args.max_shed * len(results) or rps < args.min_rps
+    print('FAILED' if failed else 'ok')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""Check that streamed extraction keeps peak memory flat as page count grows.
+
+Each case converts a synthetic report (see corpus.py) in a fresh Python
+process and reports that process's peak RSS. Two modes can be measured:
+
+- ``stream``: ``stream_lab_report`` into the output sink, page by page
+- ``frame``: ``extract_dataframe`` then a whole-frame write, for contrast
+
+The check fails (exit status 1) when the streamed peak on the longest
+report exceeds the peak on the shortest by more than --tolerance-mb.
+
+Usage:
+    python benchmarks/memory_bench.py --pages 10 200
+    python benchmarks/memory_bench.py --pages 10 1000 --kind single_table --modes stream frame
+"""
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.corpus import KINDS, build_pdf  # noqa: E402
+
+MODES = ('stream', 'frame')
+
+
+def child(mode: str, pdf_path: str, output: str) -> None:
+    """Convert one report in this process and print its peak RSS in MB."""
+    from src.extractor import extract_dataframe, stream_lab_report
+    from src.sinks import sink_for_path
+
+    sink = sink_for_path(output)
+    if mode == 'stream':
+        stream_lab_report(pdf_path, output, sink)
+    else:
+        sink.write_dataframe(extract_dataframe(pdf_path, workers=1), output)
+    # ru_maxrss is in kilobytes on Linux
+    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+
+
+def peak_rss_mb(mode: str, pdf_path: str, output: str) -> float:
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', mode, pdf_path, output],
+        capture_output=True, text=True, check=True, cwd=ROOT,
+        env=dict(os.environ, PDF_OCR='off'))
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[10, 200])
+    parser.add_argument('--kind', choices=KINDS, default='text')
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=['stream'])
+    parser.add_argument('--output-ext', default='.xlsx',
+                        help='Output extension, which picks the sink')
+    parser.add_argument('--tolerance-mb', type=float, default=25.0,
+                        help='Allowed growth of the streamed peak RSS')
+    parser.add_argument('--child', nargs=3, metavar=('MODE', 'PDF', 'OUTPUT'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return 0
+
+    peaks = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for pages in sorted(args.pages):
+            pdf_path = os.path.join(tmpdir, f'{args.kind}_{pages}p.pdf')
+            with open(pdf_path, 'wb') as f:
+                f.write(build_pdf(args.kind, pages))
+            output = os.path.join(tmpdir, f'out{args.output_ext}')
+            for mode in args.modes:
+                peaks[mode, pages] = peak_rss_mb(mode, pdf_path, output)
+                print(f"{args.kind:<13} {pages:>6} pages  {mode:<6} "
+                      f"peak RSS {peaks[mode, pages]:8.1f} MB", flush=True)
+
+    if 'stream' not in args.modes or len(args.pages) < 2:
+        return 0
+    smallest, largest = min(args.pages), max(args.pages)
+    growth = peaks['stream', largest] - peaks['stream', smallest]
+    status = 'ok' if growth <= args.tolerance_mb else 'FAILED'
+    print(f"stream peak grew {growth:+.1f} MB from {smallest} to {largest} pages "
+          f"(limit {args.tolerance_mb:.0f} MB): {status}")
+    return 0 if status == 'ok' else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
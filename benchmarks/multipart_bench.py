@@ -0,0 +1,121 @@
+"""Benchmark the streaming multipart parser against the legacy split parser.
+
+Each parser runs in a fresh subprocess that reads a generated upload body
+from a file (standing in for the request socket) and gets the PDF part ready
+for conversion, i.e. written to the temporary file handed to the extractor.
+No response byte can be sent before that point, so its duration is the
+parser's contribution to time-to-first-byte. Peak RSS is the subprocess's
+ru_maxrss growth over its baseline.
+
+Usage:
+    python benchmarks/multipart_bench.py --size-mb 50
+"""
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BOUNDARY = b'----pdfx-benchmark-boundary'
+
+
+def build_body(path: str, size: int) -> None:
+    """Write a multipart body with a `format` field and a `size`-byte file."""
+    block = os.urandom(1024 * 1024)
+    with open(path, 'wb') as f:
+        f.write(b'--' + BOUNDARY + b'\r\n'
+                b'Content-Disposition: form-data; name="format"\r\n\r\nauto\r\n')
+        f.write(b'--' + BOUNDARY + b'\r\n'
+                b'Content-Disposition: form-data; name="file"; filename="report.pdf"\r\n'
+                b'Content-Type: application/pdf\r\n\r\n')
+        remaining = size
+        while remaining > 0:
+            f.write(block[:min(remaining, len(block))])
+            remaining -= len(block)
+        f.write(b'\r\n--' + BOUNDARY + b'--\r\n')
+
+
+def legacy_parse(rfile, content_length: int) -> str:
+    """The api/convert.py parsing code before the streaming parser."""
+    post_data = rfile.read(content_length)
+    parts = post_data.split(b'--' + BOUNDARY)
+    file_content = None
+    for part in parts:
+        if b'Content-Disposition' in part and b'filename=' in part:
+            file_start = part.find(b'\r\n\r\n') + 4
+            file_end = part.rfind(b'\r\n')
+            file_content = part[file_start:file_end]
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
+        tmp.write(file_content)
+        return tmp.name
+
+
+def streaming_parse(rfile, content_length: int) -> str:
+    """The current api/convert.py path: stream, spool, copy to a temp file."""
+    from src.multipart import MultipartParser
+    parser = MultipartParser(rfile, BOUNDARY, content_length, 1 << 40)
+    fields, files = parser.parse()
+    upload = files['file']
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
+        shutil.copyfileobj(upload.file, tmp)
+    upload.close()
+    return tmp.name
+
+
+def run_child(mode: str, body_path: str) -> None:
+    """Subprocess entry: parse once and print the measurements as JSON."""
+    import src.multipart  # noqa: F401  (exclude import cost from the baseline)
+    parse = legacy_parse if mode == 'legacy' else streaming_parse
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    content_length = os.path.getsize(body_path)
+    started = time.perf_counter()
+    with open(body_path, 'rb') as rfile:
+        tmp_path = parse(rfile, content_length)
+    ready = time.perf_counter() - started
+    os.remove(tmp_path)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline
+    print(json.dumps({'mode': mode, 'ready_seconds': ready,
+                      'peak_rss_mb': peak / 1024}))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=float, default=50)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--child', choices=['legacy', 'streaming'])
+    parser.add_argument('--body')
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.body)
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        body_path = os.path.join(tmpdir, 'body.bin')
+        build_body(body_path, int(args.size_mb * 1024 * 1024))
+        print(f"Upload body: {os.path.getsize(body_path) / 1024 / 1024:.1f} MB")
+        for mode in ('legacy', 'streaming'):
+            runs = []
+            for _ in range(args.repeat):
+                out = subprocess.run(
+                    [sys.executable, __file__, '--child', mode, '--body', body_path],
+                    check=True, capture_output=True, text=True,
+                ).stdout
+                runs.append(json.loads(out))
+            best = min(run['ready_seconds'] for run in runs)
+            peak = max(run['peak_rss_mb'] for run in runs)
+            print(f"{mode:<10} ready-to-convert {best * 1000:8.1f} ms   "
+                  f"peak RSS +{peak:7.1f} MB")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
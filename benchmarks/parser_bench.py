@@ -0,0 +1,95 @@
+"""Benchmark the lab-result parser on long text reports.
+
+The report text is generated from the benchmark corpus rows (with a header
+block every 40 lines, as on a real multi-page report). Two parsers are
+timed on it:
+
+- ``per_line``: the same compiled pattern matched line by line in a Python
+  loop, one dict per row, then a DataFrame
+- ``vectorized``: ``parse_lab_results``, one ``findall`` over the text and
+  column-wise filtering
+
+Both must produce the same rows.
+
+Usage:
+    python benchmarks/parser_bench.py --lines 10000 50000
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.corpus import _result_row  # noqa: E402
+from src.lab_parser import RESULT_COLUMNS, RESULT_PATTERN, parse_lab_results  # noqa: E402
+
+
+def build_text(lines: int, seed: int = 0) -> str:
+    """Return `lines` lines of report text."""
+    rng = random.Random(seed)
+    out = []
+    while len(out) < lines:
+        if len(out) % 40 == 0:
+            page = len(out) // 40 + 1
+            out += ['City Pathology Laboratory',
+                    'Patient Name: Patient 00042 Patient ID: CP000042',
+                    f'Report Date: 2026-03-14 Page {page}']
+        out.append(' '.join(cell for cell in _result_row(rng) if cell))
+    return '\n'.join(out[:lines])
+
+
+_LINE_PATTERN = re.compile(RESULT_PATTERN.pattern, re.VERBOSE)
+
+
+def parse_per_line(text: str) -> pd.DataFrame:
+    """Reference implementation: one regex match and one dict per line."""
+    rows = []
+    for line in text.split('\n'):
+        match = _LINE_PATTERN.match(line)
+        if not match:
+            continue
+        row = dict(zip(RESULT_COLUMNS, match.groups(default='')))
+        if row['Unit'] or row['Reference'] or re.search('[A-Za-z]', row['Value']):
+            rows.append(row)
+    return pd.DataFrame(rows, columns=RESULT_COLUMNS)
+
+
+def best_time(func, text: str, repeat: int):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(text)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, nargs='+', default=[10000, 50000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    for lines in args.lines:
+        text = build_text(lines)
+        loop_seconds, expected = best_time(parse_per_line, text, args.repeat)
+        vec_seconds, actual = best_time(parse_lab_results, text, args.repeat)
+        if not expected.equals(actual):
+            print(f"{lines} lines: parsers disagree", file=sys.stderr)
+            return 1
+        print(f"{lines:>7} lines, {len(actual):>7} results   "
+              f"per_line {loop_seconds * 1000:8.1f} ms   "
+              f"vectorized {vec_seconds * 1000:8.1f} ms "
+              f"({lines / vec_seconds / 1000:6.0f}k lines/s, "
+              f"{loop_seconds / vec_seconds:.2f}x)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
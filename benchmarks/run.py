@@ -0,0 +1,192 @@
+"""Run the conversion benchmarks and check them against a baseline.
+
+Usage:
+    python -m benchmarks --corpus quick --output bench.json
+    python -m benchmarks --baseline baseline.json --threshold 0.25
+
+The exit status is 1 when any stage is slower than the baseline by more
+than the threshold (stages faster than --min-seconds in the baseline are
+ignored as noise). Stages are the profiling stage records of the real
+conversion code (see benchmarks/stages.py); a baseline saved in another
+results format cannot be compared (exit status 2) and has to be recorded
+again.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.corpus import CORPORA, KINDS, case_id, generate_corpus  # noqa: E402
+from benchmarks.stages import PATHS, STAGES, best_of  # noqa: E402
+
+# Bumped when the stages in the results change meaning; 2: profiling
+# stage records (1 timed hand-written copies of the stages)
+RESULTS_FORMAT = 2
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run_benchmarks(cases, paths: List[str], repeat: int,
+                   corpus_dir: str) -> Dict[str, object]:
+    """Generate the corpus and time every path on every case."""
+    files = generate_corpus(corpus_dir, cases)
+    # Warm-up: keep one-off imports and caches out of the first timing
+    for path in paths:
+        PATHS[path](str(files[0]))
+
+    results = {}
+    for (kind, pages), pdf_path in zip(cases, files):
+        name = case_id(kind, pages)
+        results[name] = {'kind': kind, 'pages': pages,
+                         'bytes': pdf_path.stat().st_size, 'paths': {}}
+        for path in paths:
+            stages = best_of(PATHS[path], str(pdf_path), repeat)
+            results[name]['paths'][path] = stages
+            print(f"{name:<22} {path:<4} " +
+                  ' '.join(f"{stage}{'*' if stages[stage]['nested'] else ''}="
+                           f"{stages[stage]['wall'] * 1000:.1f}ms"
+                           for stage in (*STAGES, 'total') if stage in stages), flush=True)
+    return {
+        'meta': {
+            'format': RESULTS_FORMAT,
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'repeat': repeat,
+        },
+        'cases': results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float,
+            min_seconds: float) -> List[Dict[str, object]]:
+    """Return the stages that got slower than baseline * (1 + threshold)."""
+    regressions = []
+    for name, case in current['cases'].items():
+        base_case = baseline.get('cases', {}).get(name)
+        if base_case is None:
+            continue
+        for path, stages in case['paths'].items():
+            base_stages = base_case['paths'].get(path, {})
+            for stage, entry in stages.items():
+                seconds = entry['wall']
+                base = base_stages.get(stage, {}).get('wall')
+                if base is None or base < min_seconds:
+                    continue
+                ratio = seconds / base
+                if ratio > 1 + threshold:
+                    regressions.append({'case': name, 'path': path, 'stage': stage,
+                                        'baseline': base, 'current': seconds,
+                                        'ratio': ratio})
+    return regressions
+
+
+def stage_changes(current: Dict, baseline: Dict) -> List[str]:
+    """Stages recorded in only one of the runs, as 'case path stage (added|gone)'."""
+    changes = []
+    for name, case in current['cases'].items():
+        base_case = baseline.get('cases', {}).get(name)
+        if base_case is None:
+            continue
+        for path, stages in case['paths'].items():
+            base_stages = base_case['paths'].get(path)
+            if base_stages is None:
+                continue
+            changes += [f"{name} {path} {stage} (added)"
+                        for stage in stages if stage not in base_stages]
+            changes += [f"{name} {path} {stage} (gone)"
+                        for stage in base_stages if stage not in stages]
+    return changes
+
+
+def _parse_cases(spec: str):
+    cases = []
+    for item in spec.split(','):
+        kind, _, pages = item.strip().partition(':')
+        if kind not in KINDS or not pages.isdigit() or not 1 <= int(pages) <= 500:
+            raise argparse.ArgumentTypeError(
+                f"bad case '{item}': expected <kind>:<pages> with kind in "
+                f"{', '.join(KINDS)} and 1-500 pages")
+        cases.append((kind, int(pages)))
+    return cases
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument('--corpus', choices=sorted(CORPORA), default='quick',
+                        help='Named set of synthetic reports')
+    parser.add_argument('--cases', type=_parse_cases,
+                        help='Explicit cases, e.g. text:1,multi_table:100')
+    parser.add_argument('--paths', default=','.join(PATHS),
+                        help='Comma-separated conversion paths to time')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Runs per case; the fastest is kept')
+    parser.add_argument('--corpus-dir',
+                        default=os.path.join(tempfile.gettempdir(), 'pdfx-bench-corpus'))
+    parser.add_argument('--output', help='Write results as JSON')
+    parser.add_argument('--baseline', help='Compare against a saved results JSON')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Allowed slowdown per stage (0.25 = 25%%)')
+    parser.add_argument('--min-seconds', type=float, default=0.005,
+                        help='Ignore stages faster than this in the baseline')
+    args = parser.parse_args(argv)
+
+    paths = [p.strip() for p in args.paths.split(',') if p.strip()]
+    unknown = set(paths) - set(PATHS)
+    if unknown:
+        parser.error(f"unknown paths: {', '.join(sorted(unknown))}")
+
+    baseline = None
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        if baseline.get('meta', {}).get('format') != RESULTS_FORMAT:
+            print(f"{args.baseline} is not in results format {RESULTS_FORMAT} "
+                  "(profiling stages); record the baseline again")
+            return 2
+
+    from loguru import logger
+    logger.disable('src')
+
+    results = run_benchmarks(args.cases or CORPORA[args.corpus], paths,
+                             args.repeat, args.corpus_dir)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+        print(f"Results written to {args.output}")
+
+    if baseline is not None:
+        for change in stage_changes(results, baseline):
+            print(f"Stage recorded in only one run: {change}")
+        regressions = compare(results, baseline, args.threshold, args.min_seconds)
+        if regressions:
+            print(f"\n{len(regressions)} regressions over {args.threshold:.0%} "
+                  f"against {args.baseline} ({baseline['meta'].get('commit')}):")
+            for r in regressions:
+                print(f"  {r['case']:<22} {r['path']:<4} {r['stage']:<14} "
+                      f"{r['baseline'] * 1000:8.1f}ms -> {r['current'] * 1000:8.1f}ms "
+                      f"({r['ratio']:.2f}x)")
+            return 1
+        print(f"\nNo regressions over {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
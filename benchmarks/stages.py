@@ -0,0 +1,69 @@
+"""Per-stage timings of the CLI converter and API conversion paths.
+
+Each path runs the real conversion code inside ``profiling.profile()``
+and reports ``Profiler.summary()``, so the stages are the ones the code
+is instrumented with (see src/profiling.py): extraction (with OCR nested
+in it), parsing, dataframe, normalization and serialization. A stage a
+path does not run is absent from its summary. ``total`` is the wall time
+of the whole call.
+
+The ``cli`` path is ``PDFtoExcelConverter.convert_pdf`` (default
+plain-text backend) writing an XLSX file; the ``api`` path is
+``conversion.convert_source`` as ``/api/convert`` runs it for
+``format=auto`` and ``output=xlsx``.
+"""
+
+import os
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from src import profiling
+
+STAGES = profiling.STAGES
+
+# Stage name -> Profiler.summary() entry (calls, wall, cpu, pages, rows, nested)
+Summary = Dict[str, Dict[str, object]]
+
+
+def _profile(func: Callable, *args) -> Summary:
+    """Run func inside a profiler and return its per-stage summary plus the total."""
+    with profiling.profile(trace_memory=False) as profiler:
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
+        func(*args)
+        wall, cpu = time.perf_counter() - wall_start, time.thread_time() - cpu_start
+    summary = profiler.summary()
+    summary['total'] = {'calls': 1, 'wall': wall, 'cpu': cpu, 'peak_memory': None,
+                        'pages': 0, 'rows': 0, 'nested': False}
+    return summary
+
+
+def time_cli_path(pdf_path: str) -> Summary:
+    """Profile PDFtoExcelConverter.convert_pdf (default plain-text backend)."""
+    from src.pdf_extractor import PDFtoExcelConverter
+
+    converter = PDFtoExcelConverter()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        return _profile(converter.convert_pdf, pdf_path, os.path.join(tmpdir, 'out.xlsx'))
+
+
+def time_api_path(pdf_path: str) -> Summary:
+    """Profile the /api/convert conversion (pdfplumber, format=auto, xlsx)."""
+    from src.conversion import convert_source
+
+    return _profile(convert_source, pdf_path, 'auto', None, 'xlsx')
+
+
+PATHS: Dict[str, Callable[[str], Summary]] = {
+    'cli': time_cli_path,
+    'api': time_api_path,
+}
+
+
+def best_of(path_func: Callable[[str], Summary], pdf_path: str, repeat: int) -> Summary:
+    """Run a path `repeat` times and keep the fastest run of each stage."""
+    runs: List[Summary] = [path_func(pdf_path) for _ in range(repeat)]
+    stages = dict.fromkeys(stage for run in runs for stage in run)
+    return {stage: min((run[stage] for run in runs if stage in run),
+                       key=lambda entry: entry['wall'])
+            for stage in stages}
@@ -0,0 +1,162 @@
+"""Time to first byte and peak memory of streamed XLSX responses.
+
+Serves an HTTP entry point (see load_test.py) and posts one long
+synthetic report twice: buffered (``stream=0``, the workbook is built
+before the response) and streamed (``stream=1``, chunked while pages are
+extracted). For each it prints the time to the first body byte and to
+the last. Both workbooks must hold the same header and number of rows.
+
+Peak memory is then measured in fresh processes that run the streamed
+conversion on the shortest and the longest report of --pages, discarding
+the chunks. It should depend on the chunk size, not on the workbook size.
+
+The check fails (exit status 1) when the streamed first byte takes more
+than --max-ttfb-fraction of the buffered response time, when the two
+workbooks differ in shape, or when the streamed peak RSS grows by more
+than --tolerance-mb between the shortest and the longest report.
+
+Usage:
+    python benchmarks/ttfb_bench.py --pages 20 300
+    python benchmarks/ttfb_bench.py --target convert --kind multi_table
+"""
+
+import argparse
+import http.client
+import io
+import os
+import resource
+import subprocess
+import sys
+import time
+from typing import Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.corpus import KINDS, build_pdf  # noqa: E402
+from benchmarks.load_test import BOUNDARY, TARGETS, start_server  # noqa: E402
+
+
+def multipart_body(pdf: bytes, stream: str) -> bytes:
+    return (f'--{BOUNDARY}\r\n'
+            f'Content-Disposition: form-data; name="stream"\r\n\r\n{stream}\r\n'
+            f'--{BOUNDARY}\r\n'
+            'Content-Disposition: form-data; name="file"; filename="report.pdf"\r\n'
+            'Content-Type: application/pdf\r\n\r\n').encode() + pdf + \
+        f'\r\n--{BOUNDARY}--\r\n'.encode()
+
+
+def timed_post(port: int, body: bytes) -> Tuple[float, float, bytes, bool]:
+    """Send one conversion; return (first byte s, last byte s, body, chunked)."""
+    started = time.perf_counter()
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=600)
+    try:
+        connection.request('POST', '/api/convert', body, {
+            'Content-Type': f'multipart/form-data; boundary={BOUNDARY}',
+            'Content-Length': str(len(body)),
+        })
+        response = connection.getresponse()
+        if response.status != 200:
+            raise RuntimeError(f"HTTP {response.status}: {response.read()[:200]!r}")
+        first = response.read(1)
+        first_byte = time.perf_counter() - started
+        data = first + response.read()
+        chunked = response.getheader('Transfer-Encoding', '').lower() == 'chunked'
+        return first_byte, time.perf_counter() - started, data, chunked
+    finally:
+        connection.close()
+
+
+def shape(workbook: bytes) -> Tuple[tuple, int]:
+    """Header and data row count of a workbook's sheets."""
+    from openpyxl import load_workbook
+    rows = [row for sheet in load_workbook(io.BytesIO(workbook), read_only=True).worksheets
+            for row in sheet.values]
+    return rows[0], len(rows) - 1
+
+
+def child(pdf_path: str) -> None:
+    """Stream one conversion in this process and print its peak RSS in MB."""
+    from src.conversion import stream_upload
+
+    with open(pdf_path, 'rb') as f:
+        for _ in stream_upload(f.read()):
+            pass
+    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+
+
+def peak_rss_mb(pdf_path: str) -> float:
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', pdf_path],
+        capture_output=True, text=True, check=True, cwd=ROOT,
+        env=dict(os.environ, PDF_OCR='off'))
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--target', choices=TARGETS, default='index')
+    parser.add_argument('--kind', choices=KINDS, default='single_table')
+    parser.add_argument('--pages', type=int, nargs='+', default=[20, 300],
+                        help='Report lengths; the longest is timed over HTTP')
+    parser.add_argument('--max-ttfb-fraction', type=float, default=0.25,
+                        help='Allowed streamed first byte, as a fraction of the '
+                             'buffered response time')
+    parser.add_argument('--tolerance-mb', type=float, default=25.0,
+                        help='Allowed growth of the streamed peak RSS')
+    parser.add_argument('--child', metavar='PDF', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        return 0
+
+    import tempfile
+    failures = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        paths = {}
+        for pages in sorted(set(args.pages)):
+            paths[pages] = os.path.join(tmpdir, f'{args.kind}_{pages}p.pdf')
+            with open(paths[pages], 'wb') as f:
+                f.write(build_pdf(args.kind, pages))
+
+        longest = max(paths)
+        with open(paths[longest], 'rb') as f:
+            pdf = f.read()
+        server = start_server(args.target)
+        port = server.server_address[1]
+        try:
+            results = {mode: timed_post(port, multipart_body(pdf, flag))
+                       for mode, flag in (('buffered', '0'), ('streamed', '1'))}
+        finally:
+            server.shutdown()
+
+        print(f"{args.target}: {args.kind} report, {longest} pages")
+        for mode, (first_byte, total, data, chunked) in results.items():
+            print(f"  {mode:<9} first byte {first_byte * 1000:8.0f} ms   "
+                  f"last byte {total * 1000:8.0f} ms   {len(data) / 1024:8.0f} KB"
+                  f"{'   chunked' if chunked else ''}")
+        limit = args.max_ttfb_fraction * results['buffered'][1]
+        if results['streamed'][0] > limit:
+            failures.append(f"streamed first byte over {limit * 1000:.0f} ms")
+        if shape(results['streamed'][2]) != shape(results['buffered'][2]):
+            failures.append("streamed and buffered workbooks differ in header or rows")
+
+        peaks = {pages: peak_rss_mb(path) for pages, path in paths.items()}
+        for pages, peak in peaks.items():
+            print(f"  streamed {pages:>6} pages  peak RSS {peak:8.1f} MB")
+        if len(peaks) > 1:
+            growth = peaks[longest] - peaks[min(peaks)]
+            print(f"  peak grew {growth:+.1f} MB (limit {args.tolerance_mb:.0f} MB)")
+            if growth > args.tolerance_mb:
+                failures.append("streamed peak memory grows with the report")
+
+    for failure in failures:
+        print(f"FAILED: {failure}")
+    if not failures:
+        print('ok')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,10 +2,19 @@
 """Main entry point for PDF to Excel extractor."""
 
 import click
+import json
 import os
+import signal
+import threading
+from contextlib import nullcontext
 from pathlib import Path
 from loguru import logger
+from src.backends import available_backends, compare_backends
 from src.pdf_extractor import PDFtoExcelConverter
+from src.profiling import profile
+from src.results_store import QUERY_COLUMNS, STORE_PATH, ResultsStore
+from src.sinks import available_sinks, sink_for_path
+from src.templates import TEMPLATES_PATH, TemplateRegistry, learn_templates, template_registry
 
 # Configure logger
 logger.remove()
@@ -21,17 +30,40 @@ def cli():
 
 @cli.command()
 @click.option('--input', '-i', required=True, help='Input PDF file path')
-@click.option('--output', '-o', required=True, help='Output Excel file path')
+@click.option('--output', '-o', required=True,
+              help='Output file path; .xlsx, .csv, .jsonl or .parquet')
 @click.option('--format', '-f', default='generic', 
               help='Document format type: generic, medical, invoice')
-def convert(input, output, format):
+@click.option('--backend', '-b', default='pypdf',
+              type=click.Choice(available_backends()),
+              help='Extraction engine')
+@click.option('--stream', is_flag=True,
+              help='Write lab results page by page as they are extracted; '
+                   'memory stays flat on very large PDFs (cells are not typed)')
+@click.option('--profile', 'show_profile', is_flag=True,
+              help='Print a per-stage time and memory breakdown')
+@click.option('--store', help='Also load the lab results into this SQLite results store')
+def convert(input, output, format, backend, stream, show_profile, store):
     """Convert a single PDF file to Excel."""
     try:
+        if stream and store:
+            raise click.BadParameter("--store cannot be combined with --stream")
         logger.info(f"Starting conversion: {input} -> {output}")
-        converter = PDFtoExcelConverter(format_type=format)
-        converter.convert_pdf(input, output)
+        converter = PDFtoExcelConverter(format_type=format, backend=backend)
+        with profile() if show_profile else nullcontext() as profiler:
+            if stream:
+                converter.stream_pdf(input, output)
+            else:
+                converter.convert_pdf(input, output, collect=bool(store))
+        if store:
+            with ResultsStore(store) as results:
+                results.add_report(converter.last_report)
         logger.success(f"Successfully converted {input} to {output}")
         click.echo(f"\u2713 Conversion completed: {output}")
+        if template_registry.stats()['pages']:
+            click.echo(template_registry.summary())
+        if profiler:
+            click.echo(profiler.report())
     except Exception as e:
         logger.error(f"Conversion failed: {str(e)}")
         click.echo(f"\u2717 Error: {str(e)}", err=True)
@@ -43,18 +75,252 @@ def convert(input, output, format):
 @click.option('--format', '-f', default='generic',
               help='Document format type: generic, medical, invoice')
 @click.option('--pattern', '-p', default='*.pdf', help='File pattern to match')
-def batch(input, output, format, pattern):
+@click.option('--workers', '-w', default=1, type=click.IntRange(min=1),
+              help='Number of worker processes')
+@click.option('--force', is_flag=True,
+              help='Reconvert every file, ignoring the conversion manifest')
+@click.option('--backend', '-b', default='pypdf',
+              type=click.Choice(available_backends()),
+              help='Extraction engine')
+@click.option('--sink', '-s', default='xlsx', type=click.Choice(available_sinks()),
+              help='Output file type')
+@click.option('--profile', 'show_profile', is_flag=True,
+              help='Print a per-stage time and memory breakdown')
+@click.option('--store', help='Also load the lab results into this SQLite results store')
+def batch(input, output, format, pattern, workers, force, backend, sink,
+          show_profile, store):
     """Convert multiple PDF files in a folder to Excel."""
     try:
         logger.info(f"Starting batch conversion: {input} -> {output}")
-        converter = PDFtoExcelConverter(format_type=format)
-        converter.batch_convert(input, output, pattern)
+        converter = PDFtoExcelConverter(format_type=format, backend=backend)
+        with profile() if show_profile else nullcontext() as profiler, \
+                ResultsStore(store) if store else nullcontext() as results:
+            summary = converter.batch_convert(input, output, pattern,
+                                              workers=workers, resume=not force,
+                                              sink=sink, store=results)
         logger.success(f"Batch conversion completed")
         click.echo(f"\u2713 Batch conversion completed")
+        click.echo(
+            f"  {summary['converted']}/{summary['files']} files, "
+            f"{summary['pages']} pages, {summary['skipped']} unchanged "
+            f"skipped in {summary['elapsed']:.2f}s "
+            f"({summary['files_per_sec']:.2f} files/s, "
+            f"{summary['pages_per_sec']:.2f} pages/s)"
+        )
+        if profiler:
+            click.echo(profiler.report())
     except Exception as e:
         logger.error(f"Batch conversion failed: {str(e)}")
         click.echo(f"\u2717 Error: {str(e)}", err=True)
 
 
+@cli.command()
+@click.option('--input', '-i', required=True, help='Folder to watch for new PDFs')
+@click.option('--output', '-o', required=True, help='Output folder path')
+@click.option('--archive', help='Folder for converted PDFs (default: <input>/processed)')
+@click.option('--errors', help='Folder for PDFs that failed (default: <input>/failed)')
+@click.option('--format', '-f', default='generic',
+              help='Document format type: generic, medical, invoice')
+@click.option('--pattern', '-p', default='*.pdf', help='File pattern to match')
+@click.option('--workers', '-w', default=2, type=click.IntRange(min=1),
+              help='Number of worker processes')
+@click.option('--backend', '-b', default='pypdf',
+              type=click.Choice(available_backends()),
+              help='Extraction engine')
+@click.option('--sink', '-s', default='xlsx', type=click.Choice(available_sinks()),
+              help='Output file type')
+@click.option('--settle', default=2.0, type=click.FloatRange(min=0),
+              help='Seconds a file must stay unchanged before it is converted')
+@click.option('--poll-interval', default=1.0, type=click.FloatRange(min=0.1),
+              help='Seconds between folder scans when polling')
+@click.option('--polling', is_flag=True,
+              help='Poll instead of using inotify (e.g. for network shares)')
+@click.option('--store', help='Also load the lab results into this SQLite results store')
+def watch(input, output, archive, errors, format, pattern, workers, backend, sink,
+          settle, poll_interval, polling, store):
+    """Convert PDFs as they are dropped into a folder (Ctrl+C to stop)."""
+    def report(event):
+        if 'file' not in event:
+            click.echo(f"  queue: {event['queued']} waiting, {event['running']} "
+                       f"converting, {event['settling']} still being written")
+        elif event['error'] is None:
+            click.echo(f"\u2713 {event['file']} ({event['pages']} pages)")
+        else:
+            click.echo(f"\u2717 {event['file']}: {event['error']}", err=True)
+
+    # Ctrl+C or SIGTERM: finish the conversions in progress, then exit
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+
+    try:
+        converter = PDFtoExcelConverter(format_type=format, backend=backend)
+        click.echo(f"Watching {input} -> {output} (Ctrl+C to stop)")
+        with ResultsStore(store) if store else nullcontext() as results:
+            counts = converter.watch_folder(input, output, archive, errors, pattern,
+                                            workers=workers, sink=sink, settle=settle,
+                                            poll_interval=poll_interval,
+                                            use_inotify=not polling, store=results,
+                                            stop=stop, on_result=report)
+        click.echo(f"Stopped watching: {counts['converted']} converted, "
+                   f"{counts['failed']} failed")
+    except Exception as e:
+        logger.error(f"Watch failed: {str(e)}")
+        click.echo(f"\u2717 Error: {str(e)}", err=True)
+
+
+@cli.command()
+@click.option('--input', '-i', required=True, help='Folder of sample PDFs')
+@click.option('--pattern', '-p', default='*.pdf', help='File pattern to match')
+@click.option('--backends', default=','.join(available_backends()),
+              help='Comma-separated backends to compare')
+@click.option('--reference', '-r', default='pdfplumber',
+              type=click.Choice(available_backends()),
+              help='Backend whose output is treated as correct')
+@click.option('--json-output', help='Also write the per-file results as JSON')
+def compare(input, pattern, backends, reference, json_output):
+    """Compare extraction backends for speed and output on sample PDFs."""
+    try:
+        names = [name.strip() for name in backends.split(',') if name.strip()]
+        unknown = set(names) - set(available_backends())
+        if unknown:
+            raise click.BadParameter(f"unknown backends: {', '.join(sorted(unknown))}")
+        
+        pdf_files = sorted(Path(input).glob(pattern))
+        rows = compare_backends(pdf_files, names, reference=reference)
+        
+        click.echo(f"{'file':<32} {'backend':<12} {'seconds':>8} {'speedup':>8} "
+                   f"{'tables':>6} {'lines':>6} {'similarity':>10}")
+        for row in rows:
+            error = f"  ERROR: {row['error']}" if row['error'] else ''
+            click.echo(f"{row['file'][:32]:<32} {row['backend']:<12} "
+                       f"{row['seconds']:>8.3f} {row['speedup']:>7.1f}x "
+                       f"{row['tables']:>6} {row['lines']:>6} "
+                       f"{row['text_similarity']:>10.3f}{error}")
+        
+        click.echo(f"\nSummary against '{reference}' over {len(pdf_files)} files:")
+        for name in dict.fromkeys([reference, *names]):
+            mine = [row for row in rows if row['backend'] == name]
+            if not mine:
+                continue
+            seconds = sum(row['seconds'] for row in mine)
+            similarity = sum(row['text_similarity'] for row in mine) / len(mine)
+            tables_ok = sum(row['tables_match'] for row in mine)
+            click.echo(f"  {name:<12} total {seconds:.3f}s, mean text similarity "
+                       f"{similarity:.3f}, table counts match on "
+                       f"{tables_ok}/{len(mine)} files")
+        
+        if json_output:
+            with open(json_output, 'w') as f:
+                json.dump(rows, f, indent=2)
+            click.echo(f"\u2713 Results written to {json_output}")
+    except Exception as e:
+        logger.error(f"Backend comparison failed: {str(e)}")
+        click.echo(f"\u2717 Error: {str(e)}", err=True)
+
+
+@cli.command('learn-template')
+@click.option('--name', '-n', required=True, help='Template name (replaces an existing one)')
+@click.option('--input', '-i', 'inputs', required=True, multiple=True,
+              help='Sample PDF or folder of sample PDFs (repeatable)')
+@click.option('--pattern', '-p', default='*.pdf', help='File pattern to match in folders')
+@click.option('--templates', '-t', 'templates_path', default=TEMPLATES_PATH,
+              show_default=True, help='Template file to update')
+def learn_template(name, inputs, pattern, templates_path):
+    """Learn a report layout from sample PDFs so its pages skip table detection."""
+    try:
+        pdf_files = []
+        for path in map(Path, inputs):
+            pdf_files.extend(sorted(path.glob(pattern)) if path.is_dir() else [path])
+        if not pdf_files:
+            raise click.BadParameter("no sample PDFs found")
+        
+        registry = TemplateRegistry.from_file(templates_path)
+        for template, agreement in learn_templates(name, pdf_files):
+            registry.add(template)
+            click.echo(f"{template.name:<24} {template.samples:>4} pages  "
+                       f"{len(template.tables)} tables  {len(template.anchors)} anchors  "
+                       f"detection {template.detect_seconds * 1000:.1f} ms/page  "
+                       f"matches detection on {agreement:.0%} of samples")
+            if agreement < 1:
+                click.echo(f"  warning: '{template.name}' differs from table detection "
+                           "on some samples; check them before relying on it", err=True)
+        registry.save(templates_path)
+        click.echo(f"\u2713 Templates written to {templates_path}")
+    except Exception as e:
+        logger.error(f"Learning template failed: {str(e)}")
+        click.echo(f"\u2717 Error: {str(e)}", err=True)
+
+
+def store_filters(func):
+    """Options selecting a slice of the results store (query and export)."""
+    options = [
+        click.option('--store', default=STORE_PATH, show_default=True,
+                     help='Results store (see batch --store)'),
+        click.option('--test', '-t', 'tests', multiple=True,
+                     help="Test name, case-insensitive; '%' is a wildcard (repeatable)"),
+        click.option('--patient', help='Patient ID'),
+        click.option('--from', 'date_from', type=click.DateTime(['%Y-%m-%d']),
+                     help='First report date (YYYY-MM-DD)'),
+        click.option('--to', 'date_to', type=click.DateTime(['%Y-%m-%d']),
+                     help='Last report date (YYYY-MM-DD)'),
+        click.option('--sha256', help='Source PDF content hash'),
+        click.option('--flagged', is_flag=True, help='Only results flagged H, L, ...'),
+    ]
+    for option in reversed(options):
+        func = option(func)
+    return func
+
+
+def _filter_args(tests, patient, date_from, date_to, sha256, flagged):
+    return dict(tests=tests, patient_id=patient,
+                date_from=date_from.date().isoformat() if date_from else None,
+                date_to=date_to.date().isoformat() if date_to else None,
+                sha256=sha256, flagged=flagged)
+
+
+def _open_store(path):
+    if not Path(path).exists():
+        raise click.BadParameter(f"no results store at {path}")
+    return ResultsStore(path)
+
+
+@cli.command()
+@store_filters
+@click.option('--limit', '-n', default=50, type=click.IntRange(min=1),
+              show_default=True, help='Rows to print')
+def query(store, tests, patient, date_from, date_to, sha256, flagged, limit):
+    """Print lab results from the results store."""
+    try:
+        filters = _filter_args(tests, patient, date_from, date_to, sha256, flagged)
+        with _open_store(store) as results:
+            total = results.count(**filters)
+            click.echo('\t'.join(QUERY_COLUMNS))
+            for row in results.query(limit=limit, **filters):
+                click.echo('\t'.join('' if value is None else str(value) for value in row))
+        click.echo(f"{min(total, limit)} of {total} results", err=True)
+    except Exception as e:
+        logger.error(f"Query failed: {str(e)}")
+        click.echo(f"\u2717 Error: {str(e)}", err=True)
+
+
+@cli.command()
+@store_filters
+@click.option('--output', '-o', required=True,
+              help='Output file path; .xlsx, .csv, .jsonl or .parquet')
+def export(store, tests, patient, date_from, date_to, sha256, flagged, output):
+    """Export lab results from the results store, without reading the PDFs."""
+    try:
+        filters = _filter_args(tests, patient, date_from, date_to, sha256, flagged)
+        with _open_store(store) as results:
+            total = results.count(**filters)
+            sink_for_path(output).write_rows(results.query(**filters), QUERY_COLUMNS, output)
+        logger.success(f"Exported {total} results to {output}")
+        click.echo(f"\u2713 Exported {total} results: {output}")
+    except Exception as e:
+        logger.error(f"Export failed: {str(e)}")
+        click.echo(f"\u2717 Error: {str(e)}", err=True)
+
+
 if __name__ == '__main__':
     cli()
@@ -68,40 +68,43 @@ convertBtn.addEventListener('click', async () => {
     try {
         statusText.textContent = `Processing ${selectedFiles.length} file(s)...`;
         
-        // Process each file
-        for (let i = 0; i < selectedFiles.length; i++) {
-            const file = selectedFiles[i];
-            statusText.textContent = `Processing file ${i + 1} of ${selectedFiles.length}: ${file.name}...`;
-            
-            const formData = new FormData();
+        const formData = new FormData();
+        formData.append('format', format);
+        let endpoint, downloadName;
+        if (selectedFiles.length === 1) {
+            // Single report: its own workbook
+            const file = selectedFiles[0];
             formData.append('file', file);
-            formData.append('format', format);
-
-            const response = await fetch('/api/convert', {
-                method: 'POST',
-                body: formData
-            });
+            endpoint = '/api/convert';
+            downloadName = file.name.replace(/\.pdf$/i, '_extracted.xlsx');
+        } else {
+            // Several reports: one request, one workbook with a sheet per report
+            selectedFiles.forEach(file => formData.append('files', file));
+            endpoint = '/api/convert/bulk';
+            downloadName = 'reports_extracted.xlsx';
+        }
 
-            if (!response.ok) {
-                const error = await response.json();
-                throw new Error(`File ${file.name}: ${error.error || 'Conversion failed'}`);
-            }
+        const response = await fetch(endpoint, {
+            method: 'POST',
+            body: formData
+        });
 
-            // Download the file
-            const blob = await response.blob();
-            const url = window.URL.createObjectURL(blob);
-            const a = document.createElement('a');
-            a.href = url;
-            a.download = file.name.replace('.pdf', '_extracted.xlsx');
-            document.body.appendChild(a);
-            a.click();
-            window.URL.revokeObjectURL(url);
-            document.body.removeChild(a);
-            
-            // Small delay between downloads
-            await new Promise(resolve => setTimeout(resolve, 500));
+        if (!response.ok) {
+            const error = await response.json();
+            throw new Error(error.error || 'Conversion failed');
         }
 
+        // Download the file
+        const blob = await response.blob();
+        const url = window.URL.createObjectURL(blob);
+        const a = document.createElement('a');
+        a.href = url;
+        a.download = downloadName;
+        document.body.appendChild(a);
+        a.click();
+        window.URL.revokeObjectURL(url);
+        document.body.removeChild(a);
+
         statusText.textContent = `Successfully converted ${selectedFiles.length} file(s)!`;
         
         // Reset UI
@@ -0,0 +1,345 @@
+"""Admission control and backpressure for the conversion API.
+
+A burst of large uploads should be shed quickly, not accepted and then
+converted slowly together. Before a conversion runs it has to be
+admitted:
+
+- each client (by address, see client_address) has a token bucket of
+  requests; past it the request is refused with 429
+- conversions in flight share a capacity of cost units, where a
+  request costs 1 + its page count + its size in MB; a request that
+  does not fit waits in a bounded FIFO queue, at most PDF_ADMIT_WAIT
+  seconds
+- a request arriving when the queue is already full, or that waits too
+  long, is refused with 503 and a Retry-After estimated from recent
+  conversion times
+
+The queue-full check runs before the upload is read, so a shed request
+costs almost nothing. Cache hits are served without being admitted.
+Queue wait times and rejection counts are reported by ``stats()`` for
+sizing the deployment.
+
+Configuration (environment variables):
+    PDF_ADMIT_CAPACITY      Cost units converting at once (default: 200,
+                            0 turns admission control off)
+    PDF_ADMIT_QUEUE         Requests allowed to wait (default: 32)
+    PDF_ADMIT_WAIT          Seconds a request may wait (default: 10)
+    PDF_CLIENT_RATE         Requests per second per client (default: 5,
+                            0 turns the per-client limit off)
+    PDF_CLIENT_BURST        Requests a client may send at once (default: 20)
+    PDF_TRUSTED_PROXIES     Reverse proxies in front of the API that append
+                            to X-Forwarded-For (default: 0, the peer
+                            address is the client)
+"""
+
+import io
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import BinaryIO, Deque, Dict, Iterator, Optional, Sequence
+
+# Rejection reasons, as counted in stats()
+RATE_LIMITED = 'rate_limited'
+QUEUE_FULL = 'queue_full'
+WAIT_TIMEOUT = 'wait_timeout'
+
+# Per-client buckets kept (least recently used ones are dropped)
+MAX_CLIENTS = 10000
+TRUSTED_PROXIES = int(os.environ.get('PDF_TRUSTED_PROXIES', '0'))
+# Recent queue waits kept for the percentiles in stats()
+WAIT_SAMPLES = 1000
+
+_COUNT = re.compile(rb'/Count\s+(\d+)')
+_PAGE = re.compile(rb'/Type\s*/Page(?![A-Za-z])')
+_SCAN_CHUNK = 1024 * 1024
+# Rough page size of a scanned report, used when the page tree is compressed
+_BYTES_PER_PAGE = 100 * 1024
+
+
+class Rejected(Exception):
+    """A request was not admitted; retry after ``retry_after`` seconds."""
+
+    status = 503
+
+    def __init__(self, message: str, reason: str, retry_after: int):
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class RateLimited(Rejected):
+    """A client sent requests faster than its token bucket allows."""
+
+    status = 429
+
+
+class TokenBucket:
+    """Token bucket refilled at ``rate`` tokens per second up to ``burst``."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, tokens: float = 1.0) -> float:
+        """Take tokens; return 0 on success or the seconds until they are available."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+
+
+def client_address(remote_addr: str, forwarded_for: Sequence[str] = (),
+                   trusted_proxies: Optional[int] = None) -> str:
+    """Address a request is rate limited by.
+
+    X-Forwarded-For is set by the client, so only the hops appended by
+    the trusted_proxies (default: PDF_TRUSTED_PROXIES) proxies in front of
+    the API count: the client is the hop that many places from the right,
+    as with werkzeug's ProxyFix(x_for=N). Without trusted proxies, or when
+    the header has fewer hops, it is the peer address.
+
+    Args:
+        remote_addr: Address of the connection's peer
+        forwarded_for: Values of the X-Forwarded-For header(s), in order
+    """
+    if trusted_proxies is None:
+        trusted_proxies = TRUSTED_PROXIES
+    if trusted_proxies <= 0:
+        return remote_addr
+    hops = [hop.strip() for value in forwarded_for for hop in value.split(',')]
+    hops = [hop for hop in hops if hop]
+    return hops[-trusted_proxies] if len(hops) >= trusted_proxies else remote_addr
+
+
+def estimate_pages(stream: BinaryIO) -> int:
+    """Estimate the page count of a PDF without parsing it.
+
+    The largest /Count in the page tree is the page count; when the page
+    tree is in a compressed object stream, fall back to counting page
+    objects and then to the file size. The stream is rewound.
+    """
+    count = pages = size = 0
+    tail = b''
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(_SCAN_CHUNK), b''):
+        size += len(chunk)
+        data = tail + chunk
+        # Matches ending in the carried-over tail were counted with the last chunk
+        for match in _COUNT.finditer(data):
+            count = max(count, int(match.group(1)))
+        pages += sum(1 for match in _PAGE.finditer(data) if match.end() > len(tail))
+        tail = data[-32:]
+    stream.seek(0)
+    return count or pages or max(1, size // _BYTES_PER_PAGE)
+
+
+def upload_cost(upload, pages: Optional[int] = None) -> int:
+    """Cost units of converting an upload: 1 + its page count + its size in MB.
+
+    upload is the bytes or a seekable binary file object (or a Werkzeug
+    FileStorage), which is rewound. pages is estimated unless given.
+    """
+    if isinstance(upload, (bytes, bytearray)):
+        upload = io.BytesIO(upload)
+    stream = getattr(upload, 'stream', upload)
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    if pages is None:
+        pages = estimate_pages(stream)
+    stream.seek(0)
+    return 1 + pages + size // (1024 * 1024)
+
+
+class AdmissionController:
+    """Concurrency limiter with a bounded wait queue and per-client rate limits."""
+
+    def __init__(self, capacity: int = 200, max_queue: int = 32,
+                 max_wait: float = 10.0, client_rate: float = 5.0,
+                 client_burst: float = 20.0):
+        """Initialize the controller.
+
+        Args:
+            capacity: Cost units allowed to convert at once (0 admits everything)
+            max_queue: Maximum number of requests waiting for capacity
+            max_wait: Seconds a request may wait before it is refused
+            client_rate: Requests per second per client (0 disables the limit)
+            client_burst: Bucket size of each client
+        """
+        self.capacity = capacity
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self._cond = threading.Condition()
+        self._in_use = 0
+        self._active = 0
+        self._waiting: Deque[object] = deque()
+        self._clients: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._waits: Deque[float] = deque(maxlen=WAIT_SAMPLES)
+        # Moving average of seconds per cost unit, for Retry-After
+        self._seconds_per_unit = 0.05
+        self._stats = {'admitted': 0, 'completed': 0, RATE_LIMITED: 0,
+                       QUEUE_FULL: 0, WAIT_TIMEOUT: 0}
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        """Create a controller configured from PDF_ADMIT_* and PDF_CLIENT_* variables."""
+        return cls(
+            capacity=int(os.environ.get('PDF_ADMIT_CAPACITY', '200')),
+            max_queue=int(os.environ.get('PDF_ADMIT_QUEUE', '32')),
+            max_wait=float(os.environ.get('PDF_ADMIT_WAIT', '10')),
+            client_rate=float(os.environ.get('PDF_CLIENT_RATE', '5')),
+            client_burst=float(os.environ.get('PDF_CLIENT_BURST', '20')),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def throttle(self, client: str) -> None:
+        """Take a token from the client's bucket.
+
+        Raises:
+            RateLimited: If the client is over its rate limit
+        """
+        if self.client_rate <= 0:
+            return
+        with self._cond:
+            bucket = self._clients.get(client)
+            if bucket is None:
+                bucket = self._clients[client] = TokenBucket(self.client_rate,
+                                                             self.client_burst)
+                if len(self._clients) > MAX_CLIENTS:
+                    self._clients.popitem(last=False)
+            else:
+                self._clients.move_to_end(client)
+            delay = bucket.take()
+            if delay:
+                self._stats[RATE_LIMITED] += 1
+        if delay:
+            raise RateLimited("Too many requests, retry later", RATE_LIMITED,
+                              max(1, math.ceil(delay)))
+
+    def check(self, client: str) -> None:
+        """Refuse a conversion early, before its upload is read.
+
+        Applies the client's rate limit and sheds the request if the wait
+        queue is already full.
+
+        Raises:
+            RateLimited: If the client is over its rate limit
+            Rejected: If the wait queue is full
+        """
+        self.throttle(client)
+        if not self.enabled:
+            return
+        with self._cond:
+            if len(self._waiting) >= self.max_queue:
+                self._stats[QUEUE_FULL] += 1
+                raise Rejected("Server is busy, retry later", QUEUE_FULL,
+                               self._retry_after_locked())
+
+    @contextmanager
+    def admit(self, cost: int) -> Iterator[None]:
+        """Hold cost units of capacity while the block runs.
+
+        Requests are admitted in arrival order. A cost above the capacity
+        is capped at it, so an oversized request runs alone.
+
+        Raises:
+            Rejected: If the wait queue is full or capacity does not free
+                up within max_wait seconds
+        """
+        if not self.enabled:
+            yield
+            return
+        cost = max(1, min(cost, self.capacity))
+        self._acquire(cost)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            with self._cond:
+                self._in_use -= cost
+                self._active -= 1
+                self._stats['completed'] += 1
+                self._seconds_per_unit += 0.1 * (elapsed / cost - self._seconds_per_unit)
+                self._cond.notify_all()
+
+    def _acquire(self, cost: int) -> None:
+        ticket = object()
+        started = time.monotonic()
+        deadline = started + self.max_wait
+        with self._cond:
+            if not self._waiting and self._in_use + cost <= self.capacity:
+                self._admit_locked(cost, 0.0)
+                return
+            if len(self._waiting) >= self.max_queue:
+                self._stats[QUEUE_FULL] += 1
+                raise Rejected("Server is busy, retry later", QUEUE_FULL,
+                               self._retry_after_locked())
+
+            self._waiting.append(ticket)
+            try:
+                while not (self._waiting[0] is ticket
+                           and self._in_use + cost <= self.capacity):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats[WAIT_TIMEOUT] += 1
+                        raise Rejected("Server is busy, retry later", WAIT_TIMEOUT,
+                                       self._retry_after_locked())
+                    self._cond.wait(remaining)
+                self._admit_locked(cost, time.monotonic() - started)
+            finally:
+                self._waiting.remove(ticket)
+                # The next request in line may fit now
+                self._cond.notify_all()
+
+    def _admit_locked(self, cost: int, waited: float) -> None:
+        self._in_use += cost
+        self._active += 1
+        self._stats['admitted'] += 1
+        self._waits.append(waited)
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+
+    def _retry_after_locked(self) -> int:
+        # One average conversion, plus the time for the queue ahead to drain
+        # through the capacity, at the recent seconds per cost unit
+        average_cost = self._in_use / self._active if self._active else 1
+        queued = len(self._waiting) * average_cost / self.capacity
+        return max(1, math.ceil(average_cost * self._seconds_per_unit * (1 + queued)))
+
+    def stats(self) -> Dict[str, object]:
+        """Return capacity use, queue depth, wait times and rejection counts."""
+        with self._cond:
+            stats: Dict[str, object] = dict(self._stats)
+            stats.update(capacity=self.capacity, in_use=self._in_use,
+                         active=self._active, waiting=len(self._waiting),
+                         max_queue=self.max_queue, clients=len(self._clients))
+            waits = sorted(self._waits)
+            admitted = self._stats['admitted']
+            wait_total, wait_max = self._wait_total, self._wait_max
+        stats['rejected'] = stats[RATE_LIMITED] + stats[QUEUE_FULL] + stats[WAIT_TIMEOUT]
+        stats['wait_seconds'] = {
+            'mean': round(wait_total / admitted, 4) if admitted else 0.0,
+            'p50': round(waits[len(waits) // 2], 4) if waits else 0.0,
+            'p95': round(waits[max(0, math.ceil(len(waits) * 0.95) - 1)], 4) if waits else 0.0,
+            'max': round(wait_max, 4),
+        }
+        return stats
+
+
+admission = AdmissionController.from_env()
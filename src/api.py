@@ -1,8 +1,19 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file, stream_with_context
 from werkzeug.utils import secure_filename
+import io
 import os
-import tempfile
-from extractor import PDFExtractor, process_pdf_to_excel
+import sys
+from itertools import chain
+
+# Add parent directory to path to import src modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.admission import Rejected, admission, client_address, estimate_pages, upload_cost
+from src.backends import DEFAULT_BACKEND, available_backends
+from src.cache import cache_key, conversion_cache
+from src.conversion import convert_upload, should_stream, stream_upload
+from src.sinks import available_sinks, get_sink
+from src.version import EXTRACTOR_VERSION
 
 app = Flask(__name__)
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB max
@@ -11,6 +22,10 @@ ALLOWED_EXTENSIONS = {'pdf'}
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def _client():
+    """Client address for rate limiting (see admission.client_address)."""
+    return client_address(request.remote_addr, request.headers.getlist('X-Forwarded-For'))
+
 @app.route('/api/health', methods=['GET'])
 def health():
     return jsonify({"status": "ok", "message": "PDF to Excel converter is running"})
@@ -18,6 +33,9 @@ def health():
 @app.route('/api/convert', methods=['POST'])
 def convert_pdf():
     try:
+        # Shed load before the upload is read
+        admission.check(_client())
+        
         if 'file' not in request.files:
             return jsonify({"error": "No file provided"}), 400
         
@@ -32,26 +50,68 @@ def convert_pdf():
         if output_format not in ['auto', 'table', 'text']:
             output_format = 'auto'
         
-        # Process the PDF
-        excel_buffer, df = process_pdf_to_excel(file, output_format)
+        backend = request.form.get('backend', DEFAULT_BACKEND)
+        if backend not in available_backends():
+            return jsonify({"error": f"Unknown backend: {backend}"}), 400
+        
+        output = request.form.get('output', 'xlsx')
+        if output not in available_sinks():
+            return jsonify({"error": f"Unknown output: {output}"}), 400
+        sink = get_sink(output)
+        
+        download_name = f"{secure_filename(file.filename.rsplit('.', 1)[0])}_extracted{sink.extensions[0]}"
+        pages = estimate_pages(file.stream)
+        key = cache_key(file.stream, EXTRACTOR_VERSION,
+                        format=output_format, backend=backend, output=output)
+        
+        # Large workbooks are streamed while they are extracted (not cached)
+        if (should_stream(output, pages, request.form.get('stream'))
+                and not conversion_cache.contains(key)):
+            chunks = stream_upload(file, output_format, backend,
+                                   admission.admit(upload_cost(file, pages)))
+            first = next(chunks)
+            return Response(stream_with_context(chain([first], chunks)),
+                            mimetype=sink.mimetype,
+                            headers={"Content-Disposition": f"attachment; filename={download_name}"})
+        
+        # Process the PDF once admitted, serving repeated uploads from the cache
+        def convert():
+            with admission.admit(upload_cost(file, pages)):
+                return convert_upload(file, output_format, backend, output)
+        
+        excel_data = conversion_cache.get_or_compute(key, convert)
         
         return send_file(
-            excel_buffer,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            io.BytesIO(excel_data),
+            mimetype=sink.mimetype,
             as_attachment=True,
-            download_name=f"{secure_filename(file.filename.rsplit('.', 1)[0])}_extracted.xlsx"
+            download_name=download_name
         )
     
+    except Rejected as e:
+        response = jsonify({"error": str(e), "reason": e.reason})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, e.status
     except Exception as e:
         return jsonify({"error": str(e), "type": type(e).__name__}), 500
 
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(conversion_cache.stats())
+
+@app.route('/api/admission/stats', methods=['GET'])
+def admission_stats():
+    return jsonify(admission.stats())
+
 @app.route('/', methods=['GET'])
 def index():
     return {
         "service": "PDF to Excel Converter",
         "endpoints": {
             "health": "/api/health",
-            "convert": "/api/convert (POST with file and optional format parameter)"
+            "convert": "/api/convert (POST with file and optional format and backend parameters)",
+            "cache_stats": "/api/cache/stats",
+            "admission_stats": "/api/admission/stats"
         }
     }
 
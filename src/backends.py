@@ -0,0 +1,218 @@
+"""Pluggable PDF extraction backends.
+
+A backend turns a PDF into per-page text and raw tables. Two engines are
+built in:
+
+- ``pypdf``: PyPDF2 plain-text extraction. Fast, no layout analysis and
+  no table detection.
+- ``pdfplumber``: full character layout analysis with table detection
+  (the engine behind ``PDFExtractor``). Slower, but finds tables.
+
+Additional engines can be added with ``register_backend``.
+"""
+
+import difflib
+import os
+import time
+from contextlib import contextmanager
+from itertools import zip_longest
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Sequence, Type
+
+DEFAULT_BACKEND = "pdfplumber"
+
+
+class ExtractionBackend:
+    """Base class for extraction engines."""
+
+    name: str = ""
+    supports_tables: bool = False
+
+    def extract_text_pages(self, pdf_path: str,
+                           pages: Optional[Sequence[int]] = None) -> List[str]:
+        """Return the text of each (selected, 1-based) page in page order."""
+        raise NotImplementedError
+
+    def iter_text_pages(self, pdf_path: str,
+                        pages: Optional[Sequence[int]] = None) -> Iterator[str]:
+        """Yield the text of each (selected, 1-based) page as it is extracted.
+
+        Engines that can work page by page override this to keep memory flat.
+        """
+        yield from self.extract_text_pages(pdf_path, pages)
+
+    def extract_tables(self, pdf_path: str,
+                       pages: Optional[Sequence[int]] = None) -> List[list]:
+        """Return each (selected) page's raw tables (lists of rows, header first)."""
+        return []
+
+    def analyze(self, pdf_path: str,
+                pages: Optional[Sequence[int]] = None) -> Dict[str, object]:
+        """Return {"tables": [[...] per page], "text": str, "page_count": int}."""
+        text_pages = self.extract_text_pages(pdf_path, pages)
+        return {
+            "tables": self.extract_tables(pdf_path, pages) if self.supports_tables else [],
+            "text": "\n".join(text for text in text_pages if text),
+            "page_count": len(text_pages),
+        }
+
+
+class PyPDFBackend(ExtractionBackend):
+    """Fast plain-text engine based on PyPDF2."""
+
+    name = "pypdf"
+
+    def extract_text_pages(self, pdf_path, pages=None):
+        return list(self.iter_text_pages(pdf_path, pages))
+
+    def iter_text_pages(self, pdf_path, pages=None):
+        try:
+            import PyPDF2
+        except ImportError:
+            raise ImportError("PyPDF2 required: pip install PyPDF2") from None
+
+        with _open_binary(pdf_path) as file:
+            reader = PyPDF2.PdfReader(file)
+            if pages is None:
+                numbers = range(1, len(reader.pages) + 1)
+            else:
+                numbers = [n for n in pages if 0 < n <= len(reader.pages)]
+            for n in numbers:
+                yield reader.pages[n - 1].extract_text() or ""
+
+
+class PdfplumberBackend(ExtractionBackend):
+    """Layout and table engine based on pdfplumber."""
+
+    name = "pdfplumber"
+    supports_tables = True
+
+    def extract_text_pages(self, pdf_path, pages=None):
+        from .extractor import PDFExtractor
+        return [text or "" for text in
+                PDFExtractor._map_pages(pdf_path, "text", pages=pages)]
+
+    def iter_text_pages(self, pdf_path, pages=None):
+        from .extractor import PDFExtractor
+        for _, text in PDFExtractor.iter_pages(pdf_path, "text", pages):
+            yield text or ""
+
+    def extract_tables(self, pdf_path, pages=None):
+        from .extractor import PDFExtractor
+        return PDFExtractor._map_pages(pdf_path, "tables", pages=pages)
+
+    def analyze(self, pdf_path, pages=None):
+        from .extractor import PDFExtractor
+        return PDFExtractor.analyze(pdf_path, pages=pages)
+
+
+_BACKENDS: Dict[str, Type[ExtractionBackend]] = {}
+
+
+def register_backend(backend_cls: Type[ExtractionBackend]) -> Type[ExtractionBackend]:
+    """Register a backend class under its name (usable as a decorator)."""
+    _BACKENDS[backend_cls.name] = backend_cls
+    return backend_cls
+
+
+def available_backends() -> List[str]:
+    """Names of all registered backends."""
+    return list(_BACKENDS)
+
+
+def get_backend(name: Optional[str] = None) -> ExtractionBackend:
+    """Instantiate a backend by name (None selects the default)."""
+    name = name or DEFAULT_BACKEND
+    try:
+        return _BACKENDS[name]()
+    except KeyError:
+        raise ValueError(
+            f"Unknown backend '{name}'. Available: {', '.join(_BACKENDS)}"
+        ) from None
+
+
+register_backend(PyPDFBackend)
+register_backend(PdfplumberBackend)
+
+
+def compare_backends(pdf_files: Sequence[str], backends: Sequence[str],
+                     reference: str = DEFAULT_BACKEND) -> List[Dict[str, object]]:
+    """Run every backend over sample files and compare them to a reference.
+
+    For each file and backend this records the extraction time, the number
+    of pages, tables and non-empty text lines, and how similar the
+    extracted text is to the reference backend's (1.0 means identical
+    words in the same order). Text is compared page by page, so the
+    comparison stays fast on long reports.
+
+    Args:
+        pdf_files: Sample PDF paths
+        backends: Backend names to compare
+        reference: Backend whose output is treated as correct
+
+    Returns:
+        One result row per (file, backend)
+    """
+    names = list(dict.fromkeys([reference, *backends]))
+    rows = []
+    for pdf_file in pdf_files:
+        outputs = {}
+        for name in names:
+            backend = get_backend(name)
+            started = time.perf_counter()
+            try:
+                tables = backend.extract_tables(str(pdf_file))
+                text_pages = backend.extract_text_pages(str(pdf_file))
+                error = None
+            except Exception as e:
+                tables, text_pages, error = [], [], str(e)
+            result = {"tables": tables, "text": "\n".join(text_pages),
+                      "page_words": [(page or "").split() for page in text_pages],
+                      "page_count": len(text_pages)}
+            outputs[name] = (result, time.perf_counter() - started, error)
+
+        ref_result, ref_seconds, _ = outputs[reference]
+        for name in names:
+            result, seconds, error = outputs[name]
+            rows.append({
+                "file": Path(pdf_file).name,
+                "backend": name,
+                "seconds": seconds,
+                "speedup": ref_seconds / seconds if seconds > 0 else 0.0,
+                "pages": result["page_count"],
+                "tables": sum(len(page_tables) for page_tables in result["tables"]),
+                "lines": sum(1 for line in result["text"].splitlines() if line.strip()),
+                "text_similarity": 0.0 if error else _similarity(ref_result["page_words"],
+                                                                 result["page_words"]),
+                "tables_match": ([len(t) for t in result["tables"]]
+                                 == [len(t) for t in ref_result["tables"]]),
+                "error": error,
+            })
+    return rows
+
+
+@contextmanager
+def _open_binary(pdf_path) -> Iterator[BinaryIO]:
+    """Open a PDF path for reading; a binary file object is rewound and left open."""
+    if not isinstance(pdf_path, (str, os.PathLike)):
+        pdf_path.seek(0)
+        yield pdf_path
+        return
+    with open(pdf_path, 'rb') as file:
+        yield file
+
+
+def _similarity(reference: List[List[str]], other: List[List[str]]) -> float:
+    """SequenceMatcher ratio of two documents' words, matched page by page.
+
+    Matching whole documents is quadratic in their length; per page it is
+    bounded by the page size. A page missing from either side counts as
+    unmatched.
+    """
+    matched = total = 0
+    for ref_words, words in zip_longest(reference, other, fillvalue=[]):
+        total += len(ref_words) + len(words)
+        if ref_words and words:
+            matcher = difflib.SequenceMatcher(None, ref_words, words, autojunk=False)
+            matched += sum(block.size for block in matcher.get_matching_blocks())
+    return 2 * matched / total if total else 1.0
@@ -0,0 +1,148 @@
+"""Convert many reports into one workbook, one sheet per report.
+
+Reports are extracted concurrently on a process pool (extraction is
+CPU-bound, so threads would serialize on the GIL) and written with
+ExcelWriter.write_multiple_sheets behind a summary sheet listing every
+file with its sheet, row count and error, if any. A report that fails to
+extract only shows up in the summary; the rest of the workbook is still
+produced.
+
+The pool holds BULK_WORKERS processes, is started by the first bulk
+conversion and shared by all of them, so concurrent requests queue on it
+instead of each paying for (and adding) processes of their own.
+"""
+
+import io
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+from typing import BinaryIO, Dict, List, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+
+from . import extractor
+from .excel_writer import ExcelWriter, sheet_titles
+from .extractor import extract_dataframe
+from .ocr_processor import ocr_processor
+
+SUMMARY_SHEET = 'Summary'
+SUMMARY_COLUMNS = ['File', 'Sheet', 'Status', 'Rows', 'Error']
+BULK_WORKERS = int(os.environ.get('PDF_BULK_WORKERS', str(os.cpu_count() or 1)))
+MAX_BULK_FILES = int(os.environ.get('PDF_BULK_MAX_FILES', '50'))
+
+# A PDF path, or a binary file object (e.g. from conversion.pdf_source)
+Source = Union[str, os.PathLike, BinaryIO]
+
+_bulk_pool: Optional[ProcessPoolExecutor] = None
+_bulk_pool_lock = threading.Lock()
+
+
+def _extract_report(pdf_path, output_format: str,
+                    backend: Optional[str]) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+    """Extract one report (path, bytes or file object), capturing any failure."""
+    if isinstance(pdf_path, bytes):
+        pdf_path = io.BytesIO(pdf_path)
+    try:
+        # One process per file already; no page sharding inside it
+        return extract_dataframe(pdf_path, output_format, backend, workers=1), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def extract_reports(pdf_paths: Sequence[Source], output_format: str = 'auto',
+                    backend: Optional[str] = None,
+                    workers: Optional[int] = None
+                    ) -> List[Tuple[Optional[pd.DataFrame], Optional[str]]]:
+    """Extract reports concurrently; returns (frame, error) pairs in input order.
+
+    workers <= 1 extracts in-process; otherwise the shared pool is used.
+    """
+    workers = min(workers or BULK_WORKERS, len(pdf_paths))
+    if workers <= 1:
+        return [_extract_report(path, output_format, backend) for path in pdf_paths]
+    pool = _get_bulk_pool()
+    try:
+        return list(pool.map(_extract_report, map(_worker_source, pdf_paths),
+                             repeat(output_format), repeat(backend)))
+    except BrokenProcessPool:
+        _discard_bulk_pool(pool)
+        raise
+
+
+def build_workbook_sheets(names: Sequence[str],
+                          results: Sequence[Tuple[Optional[pd.DataFrame], Optional[str]]]
+                          ) -> Dict[str, pd.DataFrame]:
+    """Lay out the summary sheet and one sheet per extracted report."""
+    titles = sheet_titles([SUMMARY_SHEET, *(os.path.splitext(n)[0] for n in names)])
+    sheets = {SUMMARY_SHEET: None}
+    summary = []
+    for name, title, (df, error) in zip(names, titles[1:], results):
+        if error is None:
+            sheets[title] = df
+            summary.append([name, title, 'ok', len(df), ''])
+        else:
+            summary.append([name, '', 'failed', 0, error])
+    sheets[SUMMARY_SHEET] = pd.DataFrame(summary, columns=SUMMARY_COLUMNS)
+    return sheets
+
+
+def convert_reports(reports: Sequence[Tuple[str, Source]],
+                    output: Union[str, BinaryIO], output_format: str = 'auto',
+                    backend: Optional[str] = None,
+                    workers: Optional[int] = None) -> pd.DataFrame:
+    """Convert reports into one workbook.
+
+    Args:
+        reports: (display name, PDF path or binary file object) pairs; the
+            name gives the sheet name
+        output: Output file path, or a binary file object
+        output_format: 'auto', 'table' or 'text'
+        backend: Extraction engine (default: pdfplumber)
+        workers: Extraction processes (default: PDF_BULK_WORKERS)
+
+    Returns:
+        The summary frame written to the summary sheet
+    """
+    names = [name for name, _ in reports]
+    results = extract_reports([path for _, path in reports], output_format,
+                              backend, workers)
+    sheets = build_workbook_sheets(names, results)
+    ExcelWriter(write_only=True).write_multiple_sheets(sheets, output)
+    return sheets[SUMMARY_SHEET]
+
+
+def _init_bulk_worker() -> None:
+    """Bulk workers each extract one file at a time: no pools inside them."""
+    extractor.SHARD_WORKERS = 1
+    ocr_processor.workers = 1
+
+
+def _get_bulk_pool() -> ProcessPoolExecutor:
+    """The process pool shared by every bulk conversion, started on first use."""
+    global _bulk_pool
+    with _bulk_pool_lock:
+        if _bulk_pool is None:
+            _bulk_pool = ProcessPoolExecutor(max_workers=max(1, BULK_WORKERS),
+                                             initializer=_init_bulk_worker)
+        return _bulk_pool
+
+
+def _discard_bulk_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a broken shared pool so the next conversion starts a new one."""
+    global _bulk_pool
+    with _bulk_pool_lock:
+        if _bulk_pool is pool:
+            _bulk_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _worker_source(pdf_path: Source):
+    """What worker processes open: the path, or the bytes of an in-memory PDF."""
+    if isinstance(pdf_path, (str, os.PathLike)):
+        return pdf_path
+    if hasattr(pdf_path, 'getvalue'):
+        return pdf_path.getvalue()
+    pdf_path.seek(0)
+    return pdf_path.read()
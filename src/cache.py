@@ -0,0 +1,266 @@
+"""Content-addressed cache for converted workbooks.
+
+Entries are keyed on the SHA-256 of the uploaded PDF together with the
+conversion options and the extractor version, so a re-upload of the same
+report is served without running the extraction again. Entries hold the
+output of any sink (XLSX, CSV, ...), so on disk they are stored as .bin
+files.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Optional, Union
+
+
+def cache_key(data: Union[bytes, BinaryIO], version: str, **options: str) -> str:
+    """Build the cache key for an upload and its conversion options.
+
+    data is either the uploaded bytes or a seekable file object, which is
+    hashed in chunks and rewound.
+    """
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        digest = hashlib.sha256(data).hexdigest()
+    else:
+        hasher = hashlib.sha256()
+        data.seek(0)
+        for chunk in iter(lambda: data.read(1024 * 1024), b""):
+            hasher.update(chunk)
+        data.seek(0)
+        digest = hasher.hexdigest()
+    settings = "|".join([version] + [f"{k}={options[k]}" for k in sorted(options)])
+    return f"{digest}-{hashlib.sha256(settings.encode()).hexdigest()[:16]}"
+
+
+class _Flight:
+    """A computation in progress that concurrent callers can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Optional[bytes] = None
+        self.error: Optional[BaseException] = None
+
+
+class ConversionCache:
+    """Two-tier (memory LRU + disk) cache with in-flight request collapsing."""
+
+    def __init__(self, memory_bytes: int = 64 * 1024 * 1024,
+                 disk_dir: Optional[str] = None,
+                 disk_bytes: int = 512 * 1024 * 1024,
+                 suffix: str = ".bin"):
+        """Initialize the cache.
+
+        Args:
+            memory_bytes: Size budget of the in-memory LRU tier (0 disables it)
+            disk_dir: Directory of the on-disk tier (None disables it)
+            disk_bytes: Size budget of the on-disk tier
+            suffix: File extension of on-disk entries
+        """
+        self.memory_bytes = memory_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_bytes = disk_bytes
+        self.suffix = suffix
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_size = 0
+        self._disk_size: Optional[int] = None
+        self._inflight: Dict[str, _Flight] = {}
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+        }
+
+    @classmethod
+    def from_env(cls) -> "ConversionCache":
+        """Create a cache configured from PDF_CACHE_* environment variables."""
+        if os.environ.get("PDF_CACHE_DISABLED", "").lower() in ("1", "true", "yes"):
+            return cls(memory_bytes=0, disk_dir=None)
+        disk_dir = os.environ.get(
+            "PDF_CACHE_DIR",
+            os.path.join(tempfile.gettempdir(), "pdf-to-excel-cache"),
+        )
+        return cls(
+            memory_bytes=int(os.environ.get("PDF_CACHE_MEMORY_MB", "64")) * 1024 * 1024,
+            disk_dir=disk_dir or None,
+            disk_bytes=int(os.environ.get("PDF_CACHE_DISK_MB", "512")) * 1024 * 1024,
+        )
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Look up a cached value, promoting disk hits into memory."""
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return value
+
+        value = self._disk_get(key)
+        with self._lock:
+            if value is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+            self._memory_put(key, value)
+        return value
+
+    def contains(self, key: str) -> bool:
+        """True when key is cached in either tier (no counters, no LRU update).
+
+        For deciding how to serve a request before get_or_compute() looks
+        the key up, so a request counts as one hit or miss.
+        """
+        with self._lock:
+            if key in self._memory:
+                return True
+        return self.disk_dir is not None and self._disk_path(key).is_file()
+
+    def put(self, key: str, value: bytes) -> None:
+        """Store a value in both tiers."""
+        with self._lock:
+            self._memory_put(key, value)
+        self._disk_put(key, value)
+
+    def get_or_compute(self, key: str, compute: Callable[[], bytes]) -> bytes:
+        """Return the cached value for key, computing it at most once.
+
+        Concurrent callers asking for the same missing key wait for the
+        first caller's computation instead of starting their own.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+            self.put(key, flight.value)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.done.set()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and tier sizes."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            stats["memory_bytes"] = self._memory_size
+            stats["disk_bytes"] = self._disk_size or 0
+            stats["inflight"] = len(self._inflight)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_ratio"] = (
+            (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        )
+        return stats
+
+    def _memory_put(self, key: str, value: bytes) -> None:
+        """Insert into the LRU tier and evict down to budget (lock held)."""
+        if len(value) > self.memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_size -= len(old)
+        self._memory[key] = value
+        self._memory_size += len(value)
+        while self._memory_size > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+            self._stats["memory_evictions"] += 1
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / key[:2] / f"{key}{self.suffix}"
+
+    def _disk_get(self, key: str) -> Optional[bytes]:
+        if self.disk_dir is None:
+            return None
+        path = self._disk_path(key)
+        try:
+            value = path.read_bytes()
+            os.utime(path)  # mtime doubles as last-access time for eviction
+            return value
+        except OSError:
+            return None
+
+    def _disk_put(self, key: str, value: bytes) -> None:
+        if self.disk_dir is None or len(value) > self.disk_bytes:
+            return
+        path = self._disk_path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(value)
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+
+        with self._lock:
+            if self._disk_size is None:
+                self._disk_size = self._scan_disk_size()
+            else:
+                self._disk_size += len(value)
+            over_budget = self._disk_size > self.disk_bytes
+        if over_budget:
+            self._evict_disk()
+
+    def _disk_entries(self):
+        return [p for p in self.disk_dir.glob(f"*/*{self.suffix}") if p.is_file()]
+
+    def _scan_disk_size(self) -> int:
+        return sum(p.stat().st_size for p in self._disk_entries())
+
+    def _evict_disk(self) -> None:
+        """Delete least recently used files until the tier is at 90% of budget."""
+        entries = []
+        for path in self._disk_entries():
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        target = int(self.disk_bytes * 0.9)
+        evicted = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+
+        with self._lock:
+            self._disk_size = total
+            self._stats["disk_evictions"] += evicted
+
+
+conversion_cache = ConversionCache.from_env()
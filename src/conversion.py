@@ -0,0 +1,157 @@
+"""Conversion core shared by the HTTP entry points.
+
+``api/index.py``, ``api/convert.py`` and ``src/api.py`` all hand uploads to
+``convert_upload``. The upload (bytes, a Werkzeug ``FileStorage`` or any
+seekable binary file object) goes to the PDF parser without a fixed
+path:
+
+- uploads up to PDF_SPOOL_MAX_MB are parsed straight from memory; long
+  documents are still sharded across worker processes, which get the
+  bytes
+- larger uploads are spooled to a unique temporary file, removed after
+  the conversion, so worker processes can open it by path
+
+Every request has its own source, so concurrent requests never see each
+other's input.
+
+Large XLSX conversions can be streamed instead (``stream_upload``): the
+workbook is sent in chunks while pages are still being extracted, so the
+client gets its first bytes after the first page and neither the rows
+nor the workbook are held in memory (see src/xlsx_stream.py).
+
+Configuration (environment variables):
+    PDF_SPOOL_MAX_MB        Largest upload parsed in memory (default: 16)
+    PDF_STREAM_MIN_PAGES    Estimated page count from which the API streams
+                            XLSX responses (default: 50, 0 disables)
+"""
+
+import io
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager, nullcontext
+from typing import BinaryIO, ContextManager, Iterator, Optional, Union
+
+from loguru import logger
+
+from .sinks import get_sink
+
+SPOOL_MAX_BYTES = int(os.environ.get("PDF_SPOOL_MAX_MB", "16")) * 1024 * 1024
+STREAM_MIN_PAGES = int(os.environ.get("PDF_STREAM_MIN_PAGES", "50"))
+
+# Text outputs that hold cells as extracted; see write_plain_table
+PLAIN_TABLE_OUTPUTS = ('csv', 'jsonl')
+
+# What the extractor opens: a path or a binary file object
+PDFSource = Union[str, os.PathLike, BinaryIO]
+Upload = Union[bytes, bytearray, BinaryIO]
+
+
+@contextmanager
+def pdf_source(upload: Upload) -> Iterator[PDFSource]:
+    """Yield a source the extractor can open for an upload.
+
+    Small uploads come back as an in-memory file object, larger ones as
+    the path of a unique temporary file that is removed afterwards.
+    """
+    if isinstance(upload, (bytes, bytearray)):
+        upload = io.BytesIO(upload)
+    stream = getattr(upload, 'stream', upload)  # Werkzeug FileStorage
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+
+    if size <= SPOOL_MAX_BYTES:
+        yield stream if isinstance(stream, io.BytesIO) else io.BytesIO(stream.read())
+        return
+
+    fd, path = tempfile.mkstemp(prefix='upload-', suffix='.pdf')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            shutil.copyfileobj(stream, f, 1024 * 1024)
+        yield path
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def convert_upload(upload: Upload, output_format: str = "auto",
+                   backend: Optional[str] = None, output: str = "xlsx") -> bytes:
+    """Convert an uploaded PDF and return the output file bytes."""
+    with pdf_source(upload) as source:
+        return convert_source(source, output_format, backend, output)
+
+
+def convert_source(source: PDFSource, output_format: str = "auto",
+                   backend: Optional[str] = None, output: str = "xlsx",
+                   progress=None) -> bytes:
+    """
+    Convert a PDF (path or binary file object) and return the output file bytes.
+
+    Plain tables (CSV, JSON Lines) are written row by row without pandas;
+    other outputs go through a typed DataFrame. progress(pages_done,
+    page_count) is only reported on the DataFrame path.
+    """
+    # Imported here so that importing this module stays cheap (cold starts)
+    from .extractor import extract_dataframe, serialize_dataframe, write_plain_table
+
+    if output in PLAIN_TABLE_OUTPUTS:
+        buffer = io.BytesIO()
+        write_plain_table(source, buffer, get_sink(output), output_format, backend)
+        return buffer.getvalue()
+
+    df = extract_dataframe(source, output_format, backend, progress=progress)
+    return serialize_dataframe(df, output).getvalue()
+
+
+def should_stream(output: str, pages: int, requested: Optional[str] = None) -> bool:
+    """Whether to stream an XLSX response for an upload of about pages pages.
+
+    requested is the client's ``stream`` field: '1'/'true' forces
+    streaming and '0'/'false' turns it off; otherwise uploads from
+    STREAM_MIN_PAGES pages are streamed.
+    """
+    if output != 'xlsx':
+        return False
+    requested = (requested or '').strip().lower()
+    if requested in ('1', 'true', 'yes'):
+        return True
+    if requested in ('0', 'false', 'no'):
+        return False
+    return 0 < STREAM_MIN_PAGES <= pages
+
+
+def stream_upload(upload: Upload, output_format: str = "auto",
+                  backend: Optional[str] = None,
+                  hold: Optional[ContextManager] = None) -> Iterator[bytes]:
+    """
+    Convert an uploaded PDF to XLSX, yielding the workbook in chunks.
+
+    Rows are written as they are extracted, page by page, with cells as
+    extracted (like --stream; numbers and dates are not retyped). hold, if
+    given, is entered before the conversion starts and exited when the
+    stream ends, e.g. to keep admission capacity for the whole response.
+
+    Nothing runs until the first chunk is requested; that chunk comes
+    after the first page has been read, so callers can pull it before
+    sending response headers and still report an unreadable upload as an
+    error.
+    """
+    # Imported here so that importing this module stays cheap (cold starts)
+    from .extractor import PDFExtractor, iter_lab_report
+    from .xlsx_stream import iter_xlsx
+
+    with hold or nullcontext(), pdf_source(upload) as source:
+        if output_format == "text":
+            columns = ["Extracted Text"]
+            rows = iter([[PDFExtractor.extract_text(source, backend=backend)]])
+        else:
+            columns, rows = iter_lab_report(source, backend=backend)
+        try:
+            yield from iter_xlsx(rows, columns)
+        except Exception as e:
+            # Headers are already sent; the client sees a truncated download
+            logger.error(f"Streamed conversion failed: {str(e)}")
+            raise
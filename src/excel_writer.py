@@ -1,141 +1,326 @@
 """Excel file writer module for exporting data to Excel format."""
 
-from pathlib import Path
-from typing import Optional
+import re
+from itertools import chain, islice
+from typing import Any, BinaryIO, Iterable, List, Optional, Sequence, Union
 import pandas as pd
 from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
+from openpyxl.utils import get_column_letter
 from openpyxl.utils.dataframe import dataframe_to_rows
 from loguru import logger
+from . import profiling
+from .normalize import DATE, column_type, column_widths
+from .sinks import prepare_output
+
+# Named styles are registered once per workbook and shared by every cell,
+# instead of building new Font/Alignment/Border objects for each cell.
+HEADER_STYLE = 'pdfx_header'
+CELL_STYLE = 'pdfx_cell'
+DATE_STYLE = 'pdfx_date'
+
+# Rows per worksheet (header included); longer data spills onto more sheets.
+MAX_SHEET_ROWS = 1_048_576
+
+# Excel rejects these characters and names longer than 31 characters.
+MAX_SHEET_NAME = 31
+_INVALID_SHEET_CHARS = re.compile(r'[\[\]:*?/\\]')
+
+_END = object()
+
+# Rows buffered by write_rows() to size the columns of a streamed sheet.
+WIDTH_SAMPLE_ROWS = 1000
+
+
+def _thin_border() -> Border:
+    thin = Side(style='thin')
+    return Border(left=thin, right=thin, top=thin, bottom=thin)
+
+
+def _named_styles() -> List[NamedStyle]:
+    """Build the named styles used by auto-formatted workbooks."""
+    header = NamedStyle(name=HEADER_STYLE)
+    header.font = Font(bold=True, color="FFFFFF", size=11)
+    header.fill = PatternFill(start_color="366092", end_color="366092",
+                              fill_type="solid")
+    header.alignment = Alignment(horizontal="center", vertical="center",
+                                 wrap_text=True)
+    header.border = _thin_border()
+
+    cell = NamedStyle(name=CELL_STYLE)
+    cell.alignment = Alignment(horizontal="left", vertical="center",
+                               wrap_text=True)
+    cell.border = _thin_border()
+
+    # A named style's number format replaces the one openpyxl picks for
+    # date values, so date columns need a style of their own.
+    date = NamedStyle(name=DATE_STYLE, number_format='yyyy-mm-dd')
+    date.alignment = cell.alignment
+    date.border = _thin_border()
+    return [header, cell, date]
 
 
 class ExcelWriter:
     """Handles Excel file creation and formatting."""
 
-    def __init__(self, auto_format: bool = True):
+    def __init__(self, auto_format: bool = True, write_only: bool = False,
+                 max_rows: int = MAX_SHEET_ROWS):
         """Initialize the Excel writer.
         
         Args:
             auto_format: Whether to apply automatic formatting
+            write_only: Stream rows through openpyxl write-only worksheets
+                so memory stays flat regardless of the number of rows
+            max_rows: Rows per sheet, header included; data beyond that
+                continues on 'Data (2)', 'Data (3)', ... (always streamed)
         """
         self.auto_format = auto_format
+        self.write_only = write_only
+        self.max_rows = max_rows
 
-    def write_dataframe(self, df: pd.DataFrame, output_path: str,
+    def write_dataframe(self, df: pd.DataFrame, output_path: Union[str, BinaryIO],
                        sheet_name: str = 'Data') -> None:
         """Write a pandas DataFrame to an Excel file.
         
         Args:
             df: DataFrame to write
-            output_path: Output file path
+            output_path: Output file path, or a binary file object
             sheet_name: Name of the Excel sheet
         """
         try:
-            output_path = Path(output_path)
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            # Create workbook and sheet
-            wb = Workbook()
-            ws = wb.active
-            ws.title = sheet_name
-            
-            # Write headers
-            for col_idx, column in enumerate(df.columns, 1):
-                cell = ws.cell(row=1, column=col_idx, value=column)
-                if self.auto_format:
-                    self._style_header(cell)
-            
-            # Write data
-            for row_idx, row in enumerate(df.values, 2):
-                for col_idx, value in enumerate(row, 1):
-                    cell = ws.cell(row=row_idx, column=col_idx, value=value)
-                    if self.auto_format:
-                        self._style_cell(cell)
-            
-            # Adjust column widths
-            if self.auto_format:
-                self._auto_adjust_columns(ws, df)
-            
-            # Save workbook
-            wb.save(output_path)
+            output_path = prepare_output(output_path)
+
+            with profiling.stage(profiling.SERIALIZATION, rows=len(df)):
+                # Create workbook and sheet
+                spill = len(df) >= self.max_rows
+                wb = self._new_workbook(write_only=self.write_only or spill)
+                if self.write_only or spill:
+                    self._stream_sheets(wb, sheet_name, list(df.columns),
+                                        _frame_rows(df), self._column_widths(df),
+                                        self._column_styles(df))
+                else:
+                    ws = wb.active
+                    ws.title = sheet_name
+                    self._fill_sheet(ws, df)
+
+                # Save workbook
+                wb.save(output_path)
             logger.success(f"Excel file created: {output_path}")
             
         except Exception as e:
             logger.error(f"Error writing Excel file: {str(e)}")
             raise
 
+    def write_rows(self, rows: Iterable[Sequence[Any]], columns: List[str],
+                   output_path: Union[str, BinaryIO], sheet_name: str = 'Data') -> None:
+        """Stream rows from any iterable into a single-sheet Excel file.
+
+        Rows are consumed lazily through write-only worksheets, so the
+        iterable can be a generator over a very large extraction; rows past
+        the sheet row limit spill onto further sheets. Column widths are
+        sized from the first WIDTH_SAMPLE_ROWS rows.
+
+        Args:
+            rows: Iterable of row value sequences
+            columns: Column headers
+            output_path: Output file path, or a binary file object
+            sheet_name: Name of the Excel sheet
+        """
+        try:
+            output_path = prepare_output(output_path)
+
+            with profiling.stage(profiling.SERIALIZATION) as record:
+                rows = _counted(iter(rows), record)
+                sample = list(islice(rows, WIDTH_SAMPLE_ROWS))
+                sample_df = pd.DataFrame(sample, columns=columns)
+
+                wb = self._new_workbook(write_only=True)
+                self._stream_sheets(wb, sheet_name, columns, chain(sample, rows),
+                                    self._column_widths(sample_df),
+                                    self._column_styles(sample_df))
+                wb.save(output_path)
+            logger.success(f"Excel file created: {output_path}")
+
+        except Exception as e:
+            logger.error(f"Error writing Excel file: {str(e)}")
+            raise
+
+    def _new_workbook(self, write_only: Optional[bool] = None) -> Workbook:
+        """Create a workbook with the shared named styles registered."""
+        if write_only is None:
+            write_only = self.write_only
+        wb = Workbook(write_only=write_only)
+        if self.auto_format:
+            for style in _named_styles():
+                wb.add_named_style(style)
+        return wb
+
+    def _fill_sheet(self, ws, df: pd.DataFrame) -> None:
+        """Write a DataFrame into a regular (in-memory) worksheet."""
+        # Write headers
+        for col_idx, column in enumerate(df.columns, 1):
+            cell = ws.cell(row=1, column=col_idx, value=column)
+            if self.auto_format:
+                self._style_header(cell)
+
+        # Write data
+        styles = self._column_styles(df)
+        for row_idx, row in enumerate(_frame_rows(df), 2):
+            for col_idx, value in enumerate(row, 1):
+                cell = ws.cell(row=row_idx, column=col_idx, value=value)
+                if self.auto_format:
+                    cell.style = styles[col_idx - 1]
+
+        # Adjust column widths
+        if self.auto_format:
+            self._auto_adjust_columns(ws, df)
+
+    def _stream_sheets(self, wb: Workbook, sheet_name: str, columns: List[str],
+                       rows: Iterable[Sequence[Any]], widths: List[float],
+                       styles: List[str], taken: Sequence[str] = ()) -> int:
+        """Stream rows into as many write-only sheets as the row limit needs.
+
+        Sheet titles are kept unique against taken, the titles of sheets
+        already in the workbook.
+        """
+        rows = iter(rows)
+        taken = list(taken)
+        titles: List[str] = []
+        while True:
+            chunk = islice(rows, self.max_rows - 1)
+            first = next(chunk, _END)
+            if first is _END and titles:
+                break
+            titles = sheet_titles(taken + [sheet_name] * (len(titles) + 1))[len(taken):]
+            self._stream_sheet(wb, titles[-1], columns,
+                               () if first is _END else chain([first], chunk),
+                               widths, styles)
+        if len(titles) > 1:
+            logger.info(f"Data exceeds {self.max_rows} rows per sheet, "
+                        f"spilled over {len(titles)} sheets")
+        return len(titles)
+
+    def _stream_sheet(self, wb: Workbook, sheet_name: str, columns: List[str],
+                      rows: Iterable[Sequence[Any]], widths: List[float],
+                      styles: List[str]) -> None:
+        """Append a write-only sheet and stream rows into it."""
+        ws = wb.create_sheet(title=sheet_name)
+
+        # Column dimensions must be set before the first row is written
+        if self.auto_format:
+            for col_idx, width in enumerate(widths, 1):
+                ws.column_dimensions[get_column_letter(col_idx)].width = width
+
+        ws.append(self._write_only_row(ws, columns, [HEADER_STYLE] * len(columns)))
+        for row in rows:
+            ws.append(self._write_only_row(ws, row, styles))
+
+    def _write_only_row(self, ws, values: Sequence[Any],
+                        styles: Sequence[str]) -> List[Any]:
+        """Wrap row values in write-only cells styled per column."""
+        if not self.auto_format:
+            return list(values)
+        cells = []
+        for value, style in zip(values, styles):
+            cell = WriteOnlyCell(ws, value=value)
+            cell.style = style
+            cells.append(cell)
+        return cells
+
     def _style_header(self, cell) -> None:
         """Apply header styling to a cell."""
-        cell.font = Font(bold=True, color="FFFFFF", size=11)
-        cell.fill = PatternFill(start_color="366092", end_color="366092",
-                               fill_type="solid")
-        cell.alignment = Alignment(horizontal="center", vertical="center",
-                                  wrap_text=True)
-        cell.border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
-
-    def _style_cell(self, cell) -> None:
-        """Apply standard cell styling."""
-        cell.alignment = Alignment(horizontal="left", vertical="center",
-                                  wrap_text=True)
-        cell.border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
+        cell.style = HEADER_STYLE
+
+    def _column_styles(self, df: pd.DataFrame) -> List[str]:
+        """Named style of each column's data cells (dates get a date format)."""
+        return [DATE_STYLE if column_type(df.iloc[:, i]) == DATE else CELL_STYLE
+                for i in range(df.shape[1])]
+
+    def _column_widths(self, df: pd.DataFrame) -> List[float]:
+        """Compute display widths for each column based on content."""
+        return column_widths(df)
 
     def _auto_adjust_columns(self, worksheet, df: pd.DataFrame) -> None:
         """Auto-adjust column widths based on content."""
-        for col_idx, column in enumerate(df.columns, 1):
-            max_length = len(str(column)) + 2
-            for value in df[column]:
-                if value is not None:
-                    max_length = max(max_length, len(str(value)) + 2)
-            
-            worksheet.column_dimensions[chr(64 + col_idx)].width = min(
-                max_length, 50
-            )
+        for col_idx, width in enumerate(self._column_widths(df), 1):
+            worksheet.column_dimensions[get_column_letter(col_idx)].width = width
 
-    def write_multiple_sheets(self, data_dict: dict, output_path: str) -> None:
+    def write_multiple_sheets(self, data_dict: dict,
+                              output_path: Union[str, BinaryIO]) -> None:
         """Write multiple DataFrames to different sheets in one Excel file.
         
+        Sheet names are made valid and unique with sheet_titles(). A frame
+        longer than the sheet row limit continues on '<name> (2)', ...
+        (the workbook is then streamed, as in write_dataframe).
+
         Args:
             data_dict: Dictionary with sheet names as keys and DataFrames as values
-            output_path: Output file path
+            output_path: Output file path, or a binary file object
         """
         try:
-            output_path = Path(output_path)
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            wb = Workbook()
-            wb.remove(wb.active)  # Remove default sheet
-            
-            for sheet_name, df in data_dict.items():
-                ws = wb.create_sheet(title=sheet_name[:31])  # Excel sheet name limit
-                
-                # Write headers
-                for col_idx, column in enumerate(df.columns, 1):
-                    cell = ws.cell(row=1, column=col_idx, value=column)
-                    if self.auto_format:
-                        self._style_header(cell)
-                
-                # Write data
-                for row_idx, row in enumerate(df.values, 2):
-                    for col_idx, value in enumerate(row, 1):
-                        cell = ws.cell(row=row_idx, column=col_idx, value=value)
-                        if self.auto_format:
-                            self._style_cell(cell)
-                
-                if self.auto_format:
-                    self._auto_adjust_columns(ws, df)
-            
-            wb.save(output_path)
+            output_path = prepare_output(output_path)
+
+            rows = sum(len(df) for df in data_dict.values())
+            with profiling.stage(profiling.SERIALIZATION, rows=rows):
+                spill = any(len(df) >= self.max_rows for df in data_dict.values())
+                write_only = self.write_only or spill
+                wb = self._new_workbook(write_only=write_only)
+                if not write_only:
+                    wb.remove(wb.active)  # Remove default sheet
+
+                titles = sheet_titles(data_dict)
+                for i, (title, df) in enumerate(zip(titles, data_dict.values())):
+                    if write_only:
+                        # Spilled sheets skip the titles of the other frames
+                        self._stream_sheets(wb, title, list(df.columns),
+                                            _frame_rows(df), self._column_widths(df),
+                                            self._column_styles(df),
+                                            wb.sheetnames + titles[i + 1:])
+                    else:
+                        self._fill_sheet(wb.create_sheet(title=title), df)
+
+                wb.save(output_path)
             logger.success(f"Multi-sheet Excel file created: {output_path}")
             
         except Exception as e:
             logger.error(f"Error writing multi-sheet Excel file: {str(e)}")
             raise
+
+
+def sheet_titles(names: Iterable[str]) -> List[str]:
+    """Turn names into valid, unique Excel sheet titles, in order.
+
+    Invalid characters become '_', names are cut to 31 characters and
+    duplicates (compared case-insensitively, as Excel does) get a
+    ' (2)', ' (3)', ... suffix that fits within the limit.
+    """
+    used = set()
+    titles = []
+    for name in names:
+        base = _INVALID_SHEET_CHARS.sub('_', str(name)).strip("' ") or 'Sheet'
+        title, n = base[:MAX_SHEET_NAME], 2
+        while title.lower() in used:
+            suffix = f" ({n})"
+            title = base[:MAX_SHEET_NAME - len(suffix)].rstrip() + suffix
+            n += 1
+        used.add(title.lower())
+        titles.append(title)
+    return titles
+
+
+def _frame_rows(df: pd.DataFrame) -> Iterable[tuple]:
+    """Iterate DataFrame rows as plain tuples, missing values as None."""
+    missing = df.isna()
+    if missing.to_numpy().any():
+        # Only a copy when there are gaps (NaN/NaT would be written as text)
+        df = df.astype(object).where(~missing, None)
+    return df.itertuples(index=False, name=None)
+
+
+def _counted(rows: Iterable[Sequence[Any]], record: dict) -> Iterable[Sequence[Any]]:
+    """Yield rows through, counting them into a profiling record."""
+    record['rows'] = 0
+    for row in rows:
+        record['rows'] += 1
+        yield row
@@ -1,101 +1,489 @@
 import os
 import json
-import pandas as pd
 from pathlib import Path
 import io
-from typing import List, Dict, Tuple
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import chain, count, repeat
+from typing import TYPE_CHECKING, Any, Callable, Iterator, List, Dict, Optional, Sequence, Tuple
 
 try:
     import pdfplumber
 except ImportError:
     pdfplumber = None
 
+from . import profiling
+from .backends import DEFAULT_BACKEND, get_backend
+from .conversion import pdf_source
+from .lab_parser import RESULT_COLUMNS, lab_result_rows
+from .ocr_processor import ocr_missing_text
+from .sinks import OutputSink, get_sink
+from .tables import TableStitcher, stack_tables, stitch_tables
+from .templates import template_registry
+from .version import EXTRACTOR_VERSION
+
+# pandas is imported where frames are built, so stream_lab_report into a
+# CSV or JSON Lines sink runs without it.
+if TYPE_CHECKING:
+    import pandas as pd
+
+# progress(pages_done, page_count), called as pages finish extracting
+ProgressCallback = Callable[[int, int], None]
+
+# Page-range sharding: documents with at least PARALLEL_MIN_PAGES pages are
+# split into contiguous page slices that worker processes extract in
+# parallel. Shorter documents stay in-process, where spawning workers and
+# re-opening the file would cost more than it saves. All shards run on one
+# shared pool of SHARD_WORKERS processes, so concurrent conversions (server
+# threads, jobs) queue on it instead of each starting a pool. Batch, watch
+# and bulk workers, which already convert files in parallel, set
+# SHARD_WORKERS to 1.
+PARALLEL_MIN_PAGES = int(os.environ.get("PDF_PARALLEL_MIN_PAGES", "40"))
+SHARD_WORKERS = int(os.environ.get("PDF_SHARD_WORKERS", str(os.cpu_count() or 1)))
+MIN_SHARD_PAGES = int(os.environ.get("PDF_MIN_SHARD_PAGES", "10"))
+
+_shard_pool: Optional[ProcessPoolExecutor] = None
+_shard_pool_lock = threading.Lock()
+
 
 class PDFExtractor:
     """Extract tables and text from PDF files."""
 
     @staticmethod
-    def extract_tables(pdf_path: str) -> List[pd.DataFrame]:
-        """Extract all tables from PDF."""
+    def extract_tables(pdf_path: str, workers: Optional[int] = None,
+                       pages: Optional[Sequence[int]] = None,
+                       backend: Optional[str] = None) -> List['pd.DataFrame']:
+        """Extract all tables from PDF, stitching fragments that continue across pages."""
+        if _is_external(backend):
+            return stitch_tables(get_backend(backend).extract_tables(pdf_path, pages))
         if pdfplumber is None:
             raise ImportError("pdfplumber required: pip install pdfplumber")
 
-        tables = []
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                page_tables = page.extract_tables()
-                if page_tables:
-                    for table in page_tables:
-                        df = pd.DataFrame(table[1:], columns=table[0])
-                        tables.append(df)
-        return tables
+        return stitch_tables(PDFExtractor._map_pages(pdf_path, "tables", workers, pages))
 
     @staticmethod
-    def extract_text(pdf_path: str) -> str:
+    def extract_text(pdf_path: str, workers: Optional[int] = None,
+                     pages: Optional[Sequence[int]] = None,
+                     backend: Optional[str] = None,
+                     progress: Optional[ProgressCallback] = None) -> str:
         """Extract all text from PDF."""
-        if pdfplumber is None:
+        if not _is_external(backend) and pdfplumber is None:
             raise ImportError("pdfplumber required")
 
-        text_pages = []
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text()
-                if text:
-                    text_pages.append(text)
-        return "\n".join(text_pages)
+        with profiling.stage(profiling.EXTRACTION) as record:
+            if _is_external(backend):
+                text_pages = get_backend(backend).extract_text_pages(pdf_path, pages)
+            else:
+                text_pages = PDFExtractor._map_pages(pdf_path, "text", workers,
+                                                     pages, progress)
+            record['pages'] = len(text_pages)
+        text_pages = ocr_missing_text(pdf_path, _page_numbers(pages, len(text_pages)),
+                                      [text or "" for text in text_pages], workers)
+        return "\n".join(text for text in text_pages if text)
 
     @staticmethod
-    def extract_lab_report(pdf_path: str) -> pd.DataFrame:
+    def analyze(pdf_path: str, workers: Optional[int] = None,
+                pages: Optional[Sequence[int]] = None,
+                backend: Optional[str] = None,
+                progress: Optional[ProgressCallback] = None) -> Dict[str, object]:
+        """
+        Single pass over the document for lab report extraction.
+
+        Each page is opened once and its characters are parsed once; table
+        detection and text extraction both run on that parsed page. Text is
+        only extracted from pages without tables, which is all pages when
+        the document has no tables at all. Pages without tables or a usable
+        text layer (scans) are OCR'd when Tesseract is available (see
+        src/ocr_processor.py).
+
+        pages restricts the pass to the given 1-based page numbers, and
+        backend selects another extraction engine (see src/backends.py),
+        and progress is called as pages complete (pdfplumber engine only).
+        Returns {"tables": [[raw table rows, ...] per page], "text": str,
+        "page_count": int}.
+        """
+        if _is_external(backend):
+            return get_backend(backend).analyze(pdf_path, pages)
+        if pdfplumber is None:
+            raise ImportError("pdfplumber required: pip install pdfplumber")
+
+        page_results = PDFExtractor._map_pages(pdf_path, "analyze", workers, pages,
+                                               progress)
+        tables = [page_tables for page_tables, _ in page_results]
+        texts = ocr_missing_text(
+            pdf_path, _page_numbers(pages, len(page_results)),
+            [None if page_tables else (text or "") for page_tables, text in page_results],
+            workers)
+        text = "\n".join(text for text in texts if text)
+        return {"tables": tables, "text": text, "page_count": len(page_results)}
+
+    @staticmethod
+    def iter_pages(pdf_path: str, mode: str,
+                   pages: Optional[Sequence[int]] = None) -> Iterator[Tuple[int, Any]]:
+        """
+        Yield (page number, result) for each page, in page order, with the
+        per-page extraction of _extract_page ("tables", "text" or
+        "analyze").
+
+        Each page's parsed objects are released as soon as its result is
+        produced, so memory stays flat however long the document is.
+        """
+        if pdfplumber is None:
+            raise ImportError("pdfplumber required: pip install pdfplumber")
+        with pdfplumber.open(pdf_path, pages=pages) as pdf:
+            yield from _iter_open_pages(pdf, mode)
+
+    @staticmethod
+    def _map_pages(pdf_path: str, mode: str, workers: Optional[int] = None,
+                   pages: Optional[Sequence[int]] = None,
+                   progress: Optional[ProgressCallback] = None) -> list:
+        """
+        Run a per-page extraction over the document (or the selected
+        1-based page numbers) and return the per-page results in page
+        order. Long documents are sharded across worker processes, each
+        opening the file for its own page range (an in-memory document is
+        sent to them as bytes).
+        """
+        if workers is None:
+            workers = SHARD_WORKERS
+
+        results = []
+        with pdfplumber.open(pdf_path, pages=pages) as pdf:
+            page_numbers = [page.page_number for page in pdf.pages]
+            shards = _plan_shards(page_numbers, workers)
+            if len(shards) <= 1:
+                for _, result in _iter_open_pages(pdf, mode):
+                    results.append(result)
+                    if progress:
+                        progress(len(results), len(page_numbers))
+                return results
+
+        pool = _get_shard_pool()
+        try:
+            for shard, counters in pool.map(_extract_page_range,
+                                            repeat(_shard_source(pdf_path)),
+                                            shards, repeat(mode)):
+                results.extend(shard)
+                template_registry.merge(counters)
+                if progress:
+                    progress(len(results), len(page_numbers))
+        except BrokenProcessPool:
+            _discard_shard_pool(pool)
+            raise
+        return results
+
+    @staticmethod
+    def extract_lab_report(pdf_path: str, pages: Optional[Sequence[int]] = None,
+                           max_pages: Optional[int] = None,
+                           backend: Optional[str] = None,
+                           progress: Optional[ProgressCallback] = None,
+                           workers: Optional[int] = None) -> 'pd.DataFrame':
         """
         Extract lab report data optimized for City Pathology format.
         Handles CBC, Biochemistry, and other test reports.
+
+        The rows of lab_report_rows, as one frame.
         """
-        tables = PDFExtractor.extract_tables(pdf_path)
-        
-        if tables:
-            df = tables[0].copy()
-            return df
-        else:
-            text = PDFExtractor.extract_text(pdf_path)
-            return PDFExtractor._parse_text_report(text)
+        import pandas as pd
+
+        columns, rows = PDFExtractor.lab_report_rows(pdf_path, pages, max_pages, backend,
+                                                     progress, workers)
+        with profiling.stage(profiling.DATAFRAME, rows=len(rows)):
+            return pd.DataFrame(rows, columns=columns)
 
     @staticmethod
-    def _parse_text_report(text: str) -> pd.DataFrame:
-        """Parse text-based lab report."""
-        lines = text.split('\n')
-        data = []
-        
-        for line in lines:
-            line = line.strip()
-            if not line or len(line) < 5:
-                continue
-            data.append({"Test": line, "Value": "", "Unit": "", "Reference": ""})
-        
-        return pd.DataFrame(data) if data else pd.DataFrame({"Data": ["No data found"]})
-
-
-def process_pdf_to_excel(pdf_file, output_format="auto"):
+    def lab_report_rows(pdf_path: str, pages: Optional[Sequence[int]] = None,
+                        max_pages: Optional[int] = None,
+                        backend: Optional[str] = None,
+                        progress: Optional[ProgressCallback] = None,
+                        workers: Optional[int] = None) -> Tuple[List[str], List[list]]:
+        """
+        Extract a lab report's columns and rows, without pandas.
+
+        The document is analyzed in a single pass; pages or max_pages
+        limit which pages are parsed at all. Table fragments are stitched
+        into logical tables (see src/tables.py) and all of them are
+        returned, stacked under the union of their columns. A document
+        without tables is parsed as text (see _text_report_rows).
+        """
+        if max_pages is not None:
+            pages = list(pages or range(1, max_pages + 1))[:max_pages]
+        with profiling.stage(profiling.EXTRACTION) as record:
+            analysis = PDFExtractor.analyze(pdf_path, workers=workers, pages=pages,
+                                            backend=backend, progress=progress)
+            record['pages'] = analysis["page_count"]
+
+        with profiling.stage(profiling.PARSING) as record:
+            if any(analysis["tables"]):
+                columns, rows = stack_tables(analysis["tables"])
+            else:
+                columns, rows = _text_report_rows(analysis["text"])
+            record['rows'] = len(rows)
+        return columns, rows
+
+
+def _text_report_rows(text: str) -> Tuple[List[str], List[list]]:
+    """
+    Parse report text into RESULT_COLUMNS rows.
+
+    Text without recognisable result lines is kept line by line in the
+    Test column.
+    """
+    results = lab_result_rows(text)
+    if results:
+        return list(RESULT_COLUMNS), [list(row) for row in results]
+
+    lines = [line.strip() for line in text.split('\n')]
+    lines = [line for line in lines if len(line) >= 5]
+    if not lines:
+        return ["Data"], [["No data found"]]
+    blanks = [""] * (len(RESULT_COLUMNS) - 1)
+    return list(RESULT_COLUMNS), [[line] + blanks for line in lines]
+
+
+def _is_external(backend: Optional[str]) -> bool:
+    """True when a backend other than the built-in pdfplumber path is selected."""
+    return backend is not None and backend != DEFAULT_BACKEND
+
+
+def _page_numbers(pages: Optional[Sequence[int]], count: int) -> List[int]:
+    """1-based numbers of the pages a selection yields, in document order."""
+    return sorted(set(pages))[:count] if pages else list(range(1, count + 1))
+
+
+def _plan_shards(page_numbers: List[int], workers: int) -> List[List[int]]:
+    """Split page numbers into contiguous slices, one per worker."""
+    page_count = len(page_numbers)
+    if workers <= 1 or page_count < max(PARALLEL_MIN_PAGES, 2):
+        return [page_numbers]
+
+    shard_count = min(workers, max(1, page_count // MIN_SHARD_PAGES))
+    size, extra = divmod(page_count, shard_count)
+    shards, start = [], 0
+    for i in range(shard_count):
+        stop = start + size + (1 if i < extra else 0)
+        shards.append(page_numbers[start:stop])
+        start = stop
+    return shards
+
+
+def _extract_page(page, mode: str):
+    """
+    Extract one page's tables (as raw rows), text, or both ("analyze").
+
+    Tables come from a learned template when the page matches one (see
+    src/templates.py), otherwise from table detection.
+    """
+    if mode == "tables":
+        return template_registry.extract_tables(page)
+    if mode == "text":
+        return page.extract_text()
+    # Both results come from the same parsed page objects
+    tables = template_registry.extract_tables(page)
+    return tables, (None if tables else page.extract_text())
+
+
+def _iter_open_pages(pdf, mode: str) -> Iterator[Tuple[int, Any]]:
+    """Extract the pages of an open document one by one, releasing each."""
+    for page in pdf.pages:
+        try:
+            yield page.page_number, _extract_page(page, mode)
+        finally:
+            page.close()
+
+
+def _get_shard_pool() -> ProcessPoolExecutor:
+    """The process pool shared by every sharded extraction, started on first use."""
+    global _shard_pool
+    with _shard_pool_lock:
+        if _shard_pool is None:
+            _shard_pool = ProcessPoolExecutor(max_workers=max(1, SHARD_WORKERS))
+        return _shard_pool
+
+
+def _discard_shard_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a broken shared pool so the next extraction starts a new one."""
+    global _shard_pool
+    with _shard_pool_lock:
+        if _shard_pool is pool:
+            _shard_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _shard_source(pdf_path):
+    """What worker processes open: the path, or the bytes of an in-memory PDF."""
+    if isinstance(pdf_path, (str, os.PathLike)):
+        return pdf_path
+    pdf_path.seek(0)
+    return pdf_path.read()
+
+
+def _extract_page_range(pdf_path, page_numbers: List[int],
+                        mode: str) -> Tuple[list, Dict[str, Any]]:
+    """
+    Worker entry point: open the PDF (path or bytes) and extract the given pages.
+
+    Returns the per-page results and this shard's template counters.
+    """
+    if isinstance(pdf_path, bytes):
+        pdf_path = io.BytesIO(pdf_path)
+    template_registry.reset_stats()
+    with pdfplumber.open(pdf_path, pages=page_numbers) as pdf:
+        results = [result for _, result in _iter_open_pages(pdf, mode)]
+    return results, template_registry.counters()
+
+
+def extract_dataframe(pdf_path: str, output_format: str = "auto",
+                      backend: Optional[str] = None,
+                      workers: Optional[int] = None,
+                      progress: Optional[ProgressCallback] = None) -> 'pd.DataFrame':
+    """
+    Extract the frame written for an output format, with typed columns.
+    output_format: 'auto' or 'table' (lab report rows), 'text' (one cell)
+    """
+    import pandas as pd
+    from .normalize import normalize_frame
+
+    if output_format == "text":
+        text = PDFExtractor.extract_text(pdf_path, workers=workers, backend=backend,
+                                         progress=progress)
+        return pd.DataFrame({"Extracted Text": [text]})
+    df = PDFExtractor.extract_lab_report(pdf_path, backend=backend,
+                                         progress=progress, workers=workers)
+    with profiling.stage(profiling.NORMALIZATION, rows=len(df)):
+        return normalize_frame(df)
+
+
+def stream_lab_report(pdf_path: str, output, sink: Optional[OutputSink] = None,
+                      pages: Optional[Sequence[int]] = None,
+                      backend: Optional[str] = None) -> Tuple[int, int]:
+    """
+    Extract a lab report page by page straight into a sink's write_rows.
+
+    Nothing is accumulated: each page is parsed, its rows are written and
+    the page is released before the next one is read, so memory stays flat
+    for any page count. Table fragments are stitched as they arrive. The
+    output columns are those of the first rows found (RESULT_COLUMNS for
+    text pages); rows of a later table with a different header are mapped
+    onto them by column name. Unlike extract_dataframe, cells are written
+    as extracted (no column typing, which needs whole columns), text pages
+    are parsed even when other pages have tables, and text without result
+    lines is not kept line by line. write_plain_table matches
+    extract_dataframe instead.
+
+    Returns:
+        (pages read, rows written)
+    """
+    sink = sink or get_sink()
+    counts = {"pages": 0, "rows": 0}
+    with profiling.stage(profiling.EXTRACTION) as record:
+        columns, rows = iter_lab_report(pdf_path, pages, backend, counts)
+        sink.write_rows(rows, columns, output)
+        record['pages'] = counts["pages"]
+    return counts["pages"], counts["rows"]
+
+
+def iter_lab_report(pdf_path: str, pages: Optional[Sequence[int]] = None,
+                    backend: Optional[str] = None,
+                    counts: Optional[Dict[str, int]] = None
+                    ) -> Tuple[List[str], Iterator[list]]:
+    """
+    Return a lab report's columns and a lazy iterator over its rows.
+
+    The first page is read to find the columns; every later page is read
+    only as the rows are consumed (see stream_lab_report). counts, when
+    given, has its "pages" and "rows" entries incremented as they are read.
+    """
+    counts = counts if counts is not None else {"pages": 0, "rows": 0}
+    counts.setdefault("pages", 0)
+    counts.setdefault("rows", 0)
+    batches = _lab_row_batches(pdf_path, pages, backend, counts)
+    first = next(batches, (RESULT_COLUMNS, []))
+    columns = first[0]
+
+    def rows():
+        for batch_columns, batch_rows in chain([first], batches):
+            if batch_columns != columns:
+                positions = [batch_columns.index(c) if c in batch_columns else None
+                             for c in columns]
+                batch_rows = [[row[p] if p is not None else "" for p in positions]
+                              for row in batch_rows]
+            counts["rows"] += len(batch_rows)
+            yield from batch_rows
+
+    return columns, rows()
+
+
+def write_plain_table(pdf_path: str, output, sink: Optional[OutputSink] = None,
+                      output_format: str = "auto",
+                      backend: Optional[str] = None) -> int:
+    """
+    Write a report's rows as extracted, without pandas.
+
+    The plain-table counterpart of extract_dataframe for text sinks (CSV,
+    JSON Lines): 'text' writes the document text as one cell, other formats
+    the rows of PDFExtractor.lab_report_rows, so the rows and columns are
+    those extract_dataframe finds. Cells stay strings (no column typing).
+
+    Returns:
+        Rows written
+    """
+    sink = sink or get_sink()
+    if output_format == "text":
+        text = PDFExtractor.extract_text(pdf_path, backend=backend)
+        sink.write_rows([[text]], ["Extracted Text"], output)
+        return 1
+    columns, rows = PDFExtractor.lab_report_rows(pdf_path, backend=backend)
+    sink.write_rows(rows, columns, output)
+    return len(rows)
+
+
+def _lab_row_batches(pdf_path: str, pages: Optional[Sequence[int]],
+                     backend: Optional[str], counts: Dict[str, int]
+                     ) -> Iterator[Tuple[List[str], List[list]]]:
+    """Yield (columns, rows) for each table fragment or text page, page by page."""
+    if _is_external(backend):
+        numbers = iter(sorted(set(pages))) if pages else count(1)
+        for number, text in zip(numbers, get_backend(backend).iter_text_pages(pdf_path,
+                                                                              pages)):
+            counts["pages"] += 1
+            text = ocr_missing_text(pdf_path, [number], [text], workers=1)[0]
+            yield RESULT_COLUMNS, lab_result_rows(text)
+        return
+
+    stitcher = TableStitcher()
+    for number, (tables, text) in PDFExtractor.iter_pages(pdf_path, "analyze", pages):
+        counts["pages"] += 1
+        stitcher.new_page()
+        for table in tables:
+            index, rows = stitcher.add(table)
+            if index is not None:
+                yield stitcher.headers[index], rows
+        if not tables:
+            text = ocr_missing_text(pdf_path, [number], [text or ""], workers=1)[0]
+            yield RESULT_COLUMNS, lab_result_rows(text)
+
+
+def serialize_dataframe(df: 'pd.DataFrame', output: str = "xlsx") -> io.BytesIO:
+    """Write a DataFrame with an output sink (see src/sinks.py) into memory, rewound."""
+    buffer = io.BytesIO()
+    get_sink(output).write_dataframe(df, buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def process_pdf_to_excel(pdf_file, output_format="auto", backend=None, output="xlsx"):
     """
     Convert PDF to Excel format.
+    pdf_file: uploaded PDF (bytes or binary file object, e.g. a FileStorage)
     output_format: 'auto', 'table', 'text'
+    backend: extraction engine name (default: pdfplumber)
+    output: output sink name: 'xlsx', 'csv', 'jsonl', 'parquet'
+
+    The upload is read in memory or spooled to a unique temporary file
+    (see src/conversion.py), so concurrent calls are safe.
     """
-    pdf_path = "/tmp/temp_upload.pdf"
-    pdf_file.save(pdf_path)
-    
-    try:
-        if output_format == "table":
-            df = PDFExtractor.extract_lab_report(pdf_path)
-        elif output_format == "text":
-            text = PDFExtractor.extract_text(pdf_path)
-            df = pd.DataFrame({"Extracted Text": [text]})
-        else:
-            df = PDFExtractor.extract_lab_report(pdf_path)
-        
-        excel_buffer = io.BytesIO()
-        df.to_excel(excel_buffer, index=False, sheet_name="Data")
-        excel_buffer.seek(0)
-        
-        return excel_buffer, df
-    finally:
-        if os.path.exists(pdf_path):
-            os.remove(pdf_path)
+    with pdf_source(pdf_file) as source:
+        df = extract_dataframe(source, output_format, backend)
+    return serialize_dataframe(df, output), df
@@ -0,0 +1,220 @@
+"""Asynchronous conversion jobs processed by a local worker pool.
+
+Uploads are written to a per-job directory and queued; a bounded pool of
+worker threads converts them in the background while clients poll for
+status. Finished results are kept for a configurable TTL and then removed
+by a janitor thread. Everything runs in-process, with no external broker.
+"""
+
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, Optional
+from loguru import logger
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+# convert(input_path, result_path, options, progress) writes the result file;
+# progress(fraction) reports completion between 0 and 1.
+ConvertFunc = Callable[[str, str, Dict[str, str], Callable[[float], None]], None]
+
+
+class QueueFull(Exception):
+    """The job queue is at capacity."""
+
+
+class Job:
+    """State of one conversion job."""
+
+    def __init__(self, job_id: str, filename: str, options: Dict[str, str],
+                 directory: Path):
+        self.id = job_id
+        self.filename = filename
+        self.options = options
+        self.directory = directory
+        self.input_path = directory / 'input.pdf'
+        self.result_path = directory / 'result'
+        self.status = QUEUED
+        self.progress = 0.0
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.expires_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'status': self.status,
+            'progress': round(self.progress, 3),
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'expires_at': self.expires_at,
+        }
+
+
+class JobManager:
+    """Queue and bounded worker pool for conversion jobs."""
+
+    def __init__(self, convert: ConvertFunc, workers: int = 2,
+                 max_queue: int = 64, result_ttl: float = 3600,
+                 work_dir: Optional[str] = None):
+        """Initialize the job manager (workers start on first submit).
+
+        Args:
+            convert: Function converting a job's input file into its result file
+            workers: Number of worker threads
+            max_queue: Maximum number of jobs waiting to run
+            result_ttl: Seconds finished jobs and their results are kept
+            work_dir: Directory holding job inputs and results
+        """
+        self.convert = convert
+        self.workers = workers
+        self.result_ttl = result_ttl
+        self.work_dir = Path(work_dir or os.path.join(tempfile.gettempdir(),
+                                                      'pdf-to-excel-jobs'))
+        self._queue: "queue.Queue[Job]" = queue.Queue(maxsize=max_queue)
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._started = False
+
+    @classmethod
+    def from_env(cls, convert: ConvertFunc) -> "JobManager":
+        """Create a job manager configured from PDF_JOB_* environment variables."""
+        return cls(
+            convert,
+            workers=int(os.environ.get('PDF_JOB_WORKERS', '2')),
+            max_queue=int(os.environ.get('PDF_JOB_QUEUE', '64')),
+            result_ttl=float(os.environ.get('PDF_JOB_RESULT_TTL', '3600')),
+            work_dir=os.environ.get('PDF_JOB_DIR') or None,
+        )
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        for i in range(self.workers):
+            threading.Thread(target=self._worker, name=f'pdfx-job-worker-{i}',
+                             daemon=True).start()
+        threading.Thread(target=self._janitor, name='pdfx-job-janitor',
+                         daemon=True).start()
+
+    def submit(self, save_input: Callable[[str], None], filename: str,
+               options: Dict[str, str]) -> Job:
+        """Create a job, store its input and queue it.
+
+        Args:
+            save_input: Writes the uploaded PDF to the given path
+            filename: Original upload filename
+            options: Conversion options passed to the convert function
+
+        Returns:
+            The queued job
+
+        Raises:
+            QueueFull: If the queue is at capacity
+        """
+        self._ensure_started()
+        if self._queue.full():
+            raise QueueFull("Job queue is full, retry later")
+
+        job_id = uuid.uuid4().hex
+        directory = self.work_dir / job_id
+        directory.mkdir(parents=True)
+        job = Job(job_id, filename, options, directory)
+        try:
+            save_input(str(job.input_path))
+            with self._lock:
+                self._jobs[job_id] = job
+            self._queue.put_nowait(job)
+        except queue.Full:
+            self._discard(job)
+            raise QueueFull("Job queue is full, retry later") from None
+        except BaseException:
+            self._discard(job)
+            raise
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Return a job by id, or None if unknown or expired."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of jobs per status and the queue depth."""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        counts = {status: 0 for status in (QUEUED, RUNNING, DONE, FAILED)}
+        for job in jobs:
+            counts[job.status] += 1
+        counts['queue_depth'] = self._queue.qsize()
+        counts['workers'] = self.workers
+        return counts
+
+    def _worker(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                self._run(job)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job: Job) -> None:
+        job.status = RUNNING
+        job.started_at = time.time()
+
+        def progress(fraction: float) -> None:
+            job.progress = min(max(fraction, job.progress), 1.0)
+
+        try:
+            self.convert(str(job.input_path), str(job.result_path),
+                         job.options, progress)
+            job.progress = 1.0
+            job.status = DONE
+        except Exception as e:
+            logger.error(f"Job {job.id} ({job.filename}) failed: {str(e)}")
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+            job.expires_at = job.finished_at + self.result_ttl
+            try:
+                job.input_path.unlink()
+            except OSError:
+                pass
+
+    def _janitor(self) -> None:
+        interval = max(1.0, min(self.result_ttl / 2, 60.0))
+        while True:
+            time.sleep(interval)
+            self.cleanup_expired()
+
+    def cleanup_expired(self, now: Optional[float] = None) -> int:
+        """Remove finished jobs whose TTL has passed; returns how many."""
+        now = time.time() if now is None else now
+        with self._lock:
+            expired = [job for job in self._jobs.values()
+                       if job.expires_at is not None and job.expires_at <= now]
+        for job in expired:
+            self._discard(job)
+        if expired:
+            logger.info(f"Removed {len(expired)} expired jobs")
+        return len(expired)
+
+    def _discard(self, job: Job) -> None:
+        with self._lock:
+            self._jobs.pop(job.id, None)
+        shutil.rmtree(job.directory, ignore_errors=True)
@@ -0,0 +1,101 @@
+"""Structured parsing of lab results from the text layer of a report.
+
+A result line looks like::
+
+    Haemoglobin 17.7 g/dL H 13.0 - 17.0
+    Total Cholesterol: 180 mg/dL < 200
+    HBsAg Non Reactive
+
+and is split into Test, Value, Unit, Flag and Reference. The result
+pattern is compiled once and run over the whole text in a single
+``findall`` (multiline mode), so no Python code runs per line; filtering
+happens column-wise in pandas. ``lab_result_rows`` applies the same
+filter to plain tuples, for callers that write rows without pandas.
+"""
+
+import re
+from typing import TYPE_CHECKING, Dict, Iterable, List, Tuple, Union
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+RESULT_COLUMNS = ['Test', 'Value', 'Unit', 'Flag', 'Reference']
+
+# Only [ \t] is used for spacing: with re.MULTILINE, \s would let a match
+# run on into the next line.
+_NUMBER = r'-?\d[\d,]*(?:\.\d+)?'
+_FLAG = r'(?:HH|LL|H|L|HIGH|LOW|High|Low|Critical|\*)'
+_QUALITATIVE = (r'(?:Non[ \t-]?Reactive|Reactive|Negative|Positive|Nil|Absent|'
+                r'Present|Normal|Abnormal|Trace|Detected|Not[ \t]Detected)')
+
+RESULT_PATTERN = re.compile(rf"""
+    ^[ \t]*
+    ([A-Za-z(][^\s:]*                           # test name: words, none
+        (?:[ \t]+[^\s\d:<>][^\s:]*)*?)           # starting with a digit
+    (?:[ \t]*:[ \t]*|[ \t]+)
+    ([<>]?[ \t]?{_NUMBER}|{_QUALITATIVE})       # value
+    (?:[ \t]+(?!{_FLAG}(?:[ \t]|$))             # unit, unless it is a flag
+        (10\^\d+/\S+|[^\s\d<>≤≥]\S*))?
+    (?:[ \t]+({_FLAG}))?                        # flag
+    (?:[ \t]+(                                  # reference range
+        {_NUMBER}[ \t]*(?:-|–|to)[ \t]*{_NUMBER}
+        |[<>≤≥]=?[ \t]*{_NUMBER}
+    ))?
+    [ \t]*$
+""", re.MULTILINE | re.VERBOSE)
+
+_QUALITATIVE_VALUE = re.compile('[A-Za-z]')
+
+_PATIENT_NAME = re.compile(
+    r'Patient[ \t]*Name[ \t]*:[ \t]*(.+?)'
+    r'(?=[ \t]+(?:Patient[ \t]*ID|Age|Sex|Gender|Report|Date|Ref)\b|[ \t]*$)',
+    re.MULTILINE | re.IGNORECASE)
+_PATIENT_ID = re.compile(r'Patient[ \t]*ID[ \t]*:[ \t]*(\S+)', re.IGNORECASE)
+_REPORT_DATE = re.compile(
+    r'(?:Report|Collection|Sample|Test)?[ \t]*Date[ \t]*:[ \t]*'
+    r'(\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4})', re.IGNORECASE)
+
+
+def parse_lab_results(text: Union[str, Iterable[str]]) -> 'pd.DataFrame':
+    """Extract result rows from report text.
+
+    Args:
+        text: Report text, or an iterable of its lines
+
+    Returns:
+        DataFrame with RESULT_COLUMNS, one row per recognised result line
+        (empty strings where a part is absent)
+    """
+    import pandas as pd
+
+    if not isinstance(text, str):
+        text = '\n'.join(text)
+    df = pd.DataFrame.from_records(RESULT_PATTERN.findall(text),
+                                   columns=RESULT_COLUMNS)
+    if df.empty:
+        return df
+
+    # A name followed by a bare number ("Page 1") is not a result: keep
+    # rows with a unit or reference range, or a qualitative value.
+    qualitative = df['Value'].str.contains(_QUALITATIVE_VALUE.pattern, regex=True)
+    keep = (df['Unit'] != '') | (df['Reference'] != '') | qualitative
+    return df[keep].reset_index(drop=True)
+
+
+def lab_result_rows(text: Union[str, Iterable[str]]) -> List[Tuple[str, ...]]:
+    """Result rows as plain tuples in RESULT_COLUMNS order (parse_lab_results without pandas)."""
+    if not isinstance(text, str):
+        text = '\n'.join(text)
+    return [row for row in RESULT_PATTERN.findall(text)
+            if row[2] or row[4] or _QUALITATIVE_VALUE.search(row[1])]
+
+
+def parse_report_header(text: str) -> Dict[str, str]:
+    """Extract patient name, patient ID and report date ('' when missing)."""
+    fields = {'patient_name': _PATIENT_NAME, 'patient_id': _PATIENT_ID,
+              'report_date': _REPORT_DATE}
+    header = {}
+    for field, pattern in fields.items():
+        match = pattern.search(text)
+        header[field] = match.group(1).strip() if match else ''
+    return header
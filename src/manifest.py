@@ -0,0 +1,160 @@
+"""Conversion manifest for incremental, resumable batch runs."""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Optional
+from loguru import logger
+
+MANIFEST_NAME = '.conversion_manifest.json'
+MANIFEST_VERSION = 1
+
+
+def file_sha256(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """Compute the SHA-256 of a file without loading it into memory."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ConversionManifest:
+    """Records the outcome of every batch input in the output directory.
+
+    Each entry holds the input's size, mtime and content hash, the output
+    path, the format used and whether the conversion succeeded. The file is
+    rewritten atomically (temp file + fsync + rename), so a killed run
+    leaves either the previous or the new manifest, never a torn one.
+    """
+
+    def __init__(self, output_dir: str, flush_interval: float = 2.0):
+        """Load the manifest of an output directory, if there is one.
+
+        Args:
+            output_dir: Batch output directory holding the manifest
+            flush_interval: Minimum seconds between manifest rewrites while
+                recording results
+        """
+        self.path = Path(output_dir) / MANIFEST_NAME
+        self.flush_interval = flush_interval
+        self.entries: Dict[str, Dict] = {}
+        self._dirty = False
+        self._last_flush = time.monotonic()
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.entries = data.get('entries', {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable manifest {self.path}: {e}")
+
+    def is_up_to_date(self, key: str, input_pdf: Path, output_excel: Path,
+                      format_type: str) -> bool:
+        """Check whether an input was already converted and is unchanged.
+
+        Size and mtime are compared first; the content hash is only
+        computed when they differ (e.g. a file that was touched or copied).
+
+        Args:
+            key: Manifest key of the input (its path relative to the input dir)
+            input_pdf: Path to the input PDF
+            output_excel: Path of the expected output file
+            format_type: Conversion options the run uses (format and backend)
+
+        Returns:
+            True if the input can be skipped
+        """
+        entry = self.entries.get(key)
+        if (entry is None or entry.get('status') != 'ok'
+                or entry.get('format') != format_type
+                or entry.get('output') != str(output_excel)
+                or not output_excel.exists()):
+            return False
+
+        stat = input_pdf.stat()
+        if stat.st_size == entry['size'] and stat.st_mtime_ns == entry['mtime_ns']:
+            return True
+        if stat.st_size != entry['size'] or file_sha256(input_pdf) != entry['sha256']:
+            return False
+
+        # Same content with a new mtime: refresh the stat fields
+        entry['mtime_ns'] = stat.st_mtime_ns
+        self._dirty = True
+        return True
+
+    def record(self, key: str, input_pdf: Path, output_excel: Path,
+               format_type: str, error: Optional[str] = None) -> None:
+        """Record the outcome of converting one input.
+
+        Args:
+            key: Manifest key of the input
+            input_pdf: Path to the input PDF
+            output_excel: Path of the output file
+            format_type: Conversion options used (format and backend)
+            error: Error message if the conversion failed
+        """
+        try:
+            stat = input_pdf.stat()
+            size, mtime_ns, sha256 = stat.st_size, stat.st_mtime_ns, file_sha256(input_pdf)
+        except OSError:
+            size, mtime_ns, sha256 = None, None, None
+
+        self.entries[key] = {
+            'size': size,
+            'mtime_ns': mtime_ns,
+            'sha256': sha256,
+            'output': str(output_excel),
+            'format': format_type,
+            'status': 'ok' if error is None else 'failed',
+            'error': error,
+            'converted_at': time.time(),
+        }
+        self._dirty = True
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """Atomically write the manifest if anything changed."""
+        if not self._dirty:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent,
+                                        prefix=f"{MANIFEST_NAME}.",
+                                        suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'version': MANIFEST_VERSION, 'entries': self.entries}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        _fsync_dir(self.path.parent)
+
+        self._dirty = False
+        self._last_flush = time.monotonic()
+
+
+def _fsync_dir(directory: Path) -> None:
+    """Persist a rename by syncing its directory (not supported everywhere)."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
@@ -0,0 +1,214 @@
+"""Incremental multipart/form-data parser for raw HTTP request bodies.
+
+The body is read from the socket in fixed-size chunks and file parts are
+streamed into spooled temporary files, so memory stays bounded by the chunk
+and spool sizes instead of growing with the upload. The size limit is
+enforced while reading, before the rest of an oversized body is consumed.
+"""
+
+import io
+import tempfile
+from typing import BinaryIO, Dict, Optional, Tuple
+
+CHUNK_SIZE = 64 * 1024
+SPOOL_SIZE = 1024 * 1024
+MAX_HEADER_SIZE = 16 * 1024
+MAX_FIELD_SIZE = 64 * 1024
+
+
+class MultipartError(ValueError):
+    """The request body is not valid multipart/form-data."""
+
+
+class RequestTooLarge(MultipartError):
+    """The request body exceeds the configured size limit."""
+
+
+class MultipartPart:
+    """One part of a multipart body; file parts keep their data spooled."""
+
+    def __init__(self, name: str, filename: Optional[str],
+                 content_type: Optional[str], spool_size: int):
+        self.name = name
+        self.filename = filename
+        self.content_type = content_type
+        self.size = 0
+        if filename is None:
+            self.file: BinaryIO = io.BytesIO()
+        else:
+            self.file = tempfile.SpooledTemporaryFile(max_size=spool_size)
+
+    def write(self, data) -> None:
+        if self.filename is None and self.size + len(data) > MAX_FIELD_SIZE:
+            raise RequestTooLarge(f"Form field '{self.name}' is too large")
+        self.file.write(data)
+        self.size += len(data)
+
+    def value(self) -> str:
+        """Decoded value of a plain form field."""
+        return self.file.getvalue().decode('utf-8', errors='replace')
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def boundary_from_content_type(content_type: str) -> bytes:
+    """Extract the boundary parameter from a multipart Content-Type header."""
+    for param in content_type.split(';')[1:]:
+        key, _, value = param.strip().partition('=')
+        if key.lower() == 'boundary' and value:
+            return value.strip('"').encode('latin-1')
+    raise MultipartError("Missing multipart boundary")
+
+
+def _parse_part_headers(block: bytes) -> Tuple[str, Optional[str], Optional[str]]:
+    """Return (name, filename, content_type) from a part's header block."""
+    name = filename = content_type = None
+    for line in block.decode('utf-8', errors='replace').split('\r\n'):
+        key, _, value = line.partition(':')
+        key = key.strip().lower()
+        if key == 'content-disposition':
+            for param in value.split(';')[1:]:
+                pkey, _, pvalue = param.strip().partition('=')
+                pvalue = pvalue.strip().strip('"')
+                if pkey.lower() == 'name':
+                    name = pvalue
+                elif pkey.lower() == 'filename':
+                    filename = pvalue
+        elif key == 'content-type':
+            content_type = value.strip()
+    if name is None:
+        raise MultipartError("Part without a Content-Disposition name")
+    return name, filename, content_type
+
+
+class MultipartParser:
+    """Parse a multipart/form-data body incrementally from a stream."""
+
+    def __init__(self, stream: BinaryIO, boundary: bytes,
+                 content_length: Optional[int], max_size: int,
+                 chunk_size: int = CHUNK_SIZE, spool_size: int = SPOOL_SIZE):
+        """Initialize the parser.
+
+        Args:
+            stream: Readable request body (e.g. BaseHTTPRequestHandler.rfile)
+            boundary: Multipart boundary from the Content-Type header
+            content_length: Declared body length (None reads until EOF)
+            max_size: Maximum accepted body size in bytes
+            chunk_size: Bytes read from the stream at a time
+            spool_size: File parts larger than this spill to disk
+        """
+        self.stream = stream
+        self.delimiter = b'\r\n--' + boundary
+        self.content_length = content_length
+        self.max_size = max_size
+        self.chunk_size = chunk_size
+        self.spool_size = spool_size
+        self.bytes_read = 0
+
+    def _read(self) -> bytes:
+        if self.content_length is None:
+            size = self.chunk_size
+        else:
+            size = min(self.chunk_size, self.content_length - self.bytes_read)
+            if size <= 0:
+                return b''
+        chunk = self.stream.read(size)
+        self.bytes_read += len(chunk)
+        if self.bytes_read > self.max_size:
+            raise RequestTooLarge(f"Request body exceeds {self.max_size} bytes")
+        return chunk
+
+    def parse(self) -> Tuple[Dict[str, str], Dict[str, MultipartPart]]:
+        """Read the whole body, returning (form fields, file parts by name).
+
+        File parts are rewound and ready to read; the caller owns them and
+        should close() them when done.
+        """
+        if self.content_length is not None and self.content_length > self.max_size:
+            raise RequestTooLarge(f"Request body exceeds {self.max_size} bytes")
+
+        fields: Dict[str, str] = {}
+        files: Dict[str, MultipartPart] = {}
+        delimiter = self.delimiter
+        keep = len(delimiter) - 1
+
+        # A leading CRLF lets the first boundary match the same delimiter
+        # as every later one.
+        buf = bytearray(b'\r\n')
+        state = 'preamble'
+        part: Optional[MultipartPart] = None
+        eof = False
+
+        try:
+            while True:
+                if state == 'preamble':
+                    idx = buf.find(delimiter)
+                    if idx < 0:
+                        del buf[:max(0, len(buf) - keep)]
+                    else:
+                        del buf[:idx + len(delimiter)]
+                        state = 'after_delimiter'
+                        continue
+
+                elif state == 'after_delimiter':
+                    if len(buf) >= 2:
+                        if buf[:2] == b'--':
+                            return fields, files
+                        end = buf.find(b'\r\n')
+                        if end < 0:
+                            if len(buf) > MAX_HEADER_SIZE:
+                                raise MultipartError("Malformed boundary line")
+                        else:
+                            # Ignore transport padding after the boundary
+                            del buf[:end + 2]
+                            state = 'headers'
+                            continue
+
+                elif state == 'headers':
+                    end = buf.find(b'\r\n\r\n')
+                    if end >= 0:
+                        name, filename, content_type = _parse_part_headers(bytes(buf[:end]))
+                        del buf[:end + 4]
+                        part = MultipartPart(name, filename, content_type,
+                                             self.spool_size)
+                        state = 'body'
+                        continue
+                    if len(buf) > MAX_HEADER_SIZE:
+                        raise MultipartError("Part headers too large")
+
+                elif state == 'body':
+                    idx = buf.find(delimiter)
+                    if idx >= 0:
+                        part.write(buf[:idx])
+                        del buf[:idx + len(delimiter)]
+                        if part.filename is None:
+                            fields[part.name] = part.value()
+                            part.close()
+                        else:
+                            part.file.seek(0)
+                            old = files.pop(part.name, None)
+                            if old is not None:
+                                old.close()
+                            files[part.name] = part
+                        part = None
+                        state = 'after_delimiter'
+                        continue
+                    # Everything except a possible partial delimiter at the
+                    # end of the buffer is part data.
+                    if len(buf) > keep:
+                        part.write(buf[:len(buf) - keep])
+                        del buf[:len(buf) - keep]
+
+                if eof:
+                    raise MultipartError("Unexpected end of multipart body")
+                chunk = self._read()
+                if not chunk:
+                    eof = True
+                buf += chunk
+        except BaseException:
+            if part is not None:
+                part.close()
+            for open_part in files.values():
+                open_part.close()
+            raise
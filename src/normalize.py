@@ -0,0 +1,118 @@
+"""Column typing and display widths for extracted tables.
+
+Extraction yields every cell as a string. ``normalize_frame`` gives each
+column a type before writing: a column whose non-empty cells are all
+numbers becomes numeric, one whose cells are all dates (in a single
+format) becomes dates, and anything else stays text. Every test runs over
+the whole column with pandas string methods, never cell by cell in Python.
+
+Values that look numeric but would be damaged as numbers stay text:
+leading zeros ("007") and numbers longer than Excel's 15 significant
+digits (barcodes, long IDs).
+"""
+
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+NUMERIC = 'numeric'
+DATE = 'date'
+TEXT = 'text'
+
+_NUMBER = r'[-+]?(?:\d+|\d{1,3}(?:,\d{3})+)(?:\.\d+)?'
+_LEADING_ZERO = r'[-+]?0\d'
+_MAX_DIGITS = 15
+
+# Day-first formats, as printed on Indian lab reports; ISO first
+DATE_FORMATS = [
+    (r'\d{4}-\d{1,2}-\d{1,2}', '%Y-%m-%d'),
+    (r'\d{1,2}/\d{1,2}/\d{4}', '%d/%m/%Y'),
+    (r'\d{1,2}-\d{1,2}-\d{4}', '%d-%m-%Y'),
+    (r'\d{1,2}\.\d{1,2}\.\d{4}', '%d.%m.%Y'),
+]
+
+# Column widths are measured on at most this many rows
+WIDTH_SAMPLE_ROWS = 10000
+MAX_COLUMN_WIDTH = 50
+
+
+def normalize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Return a copy of df with numeric and date columns converted.
+
+    Numeric columns become int64 (or float64 when there are decimals or
+    blanks); date columns hold ``datetime.date`` objects; blank cells in
+    converted columns become missing values.
+    """
+    out = df.copy()
+    for position in range(out.shape[1]):
+        converted = _convert_column(out.iloc[:, position])
+        if converted is not None:
+            out.isetitem(position, converted)
+    return out
+
+
+def column_type(values: pd.Series) -> str:
+    """Classify a column as NUMERIC, DATE or TEXT."""
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return NUMERIC
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return DATE
+    inferred = pd.api.types.infer_dtype(values, skipna=True)
+    if inferred in ('integer', 'floating', 'mixed-integer-float', 'decimal'):
+        return NUMERIC
+    if inferred in ('date', 'datetime'):
+        return DATE
+    return TEXT
+
+
+def _convert_column(values: pd.Series) -> Optional[pd.Series]:
+    """Typed version of a text column, or None to keep it as it is."""
+    if not pd.api.types.is_string_dtype(values):
+        return None
+    text = values.astype('string').str.strip()
+    present = text.notna() & (text != '')
+    if not present.any():
+        return None
+    cells = text[present]
+
+    if (cells.str.fullmatch(_NUMBER).all()
+            and not cells.str.match(_LEADING_ZERO).any()
+            and cells.str.count(r'\d').max() <= _MAX_DIGITS):
+        numbers = pd.to_numeric(cells.str.replace(',', '', regex=False).astype(object))
+        if present.all():
+            return numbers
+        result = pd.Series(np.nan, index=values.index, dtype='float64')
+        result[present] = numbers.astype('float64')
+        return result
+
+    for pattern, date_format in DATE_FORMATS:
+        if cells.str.fullmatch(pattern).all():
+            dates = pd.to_datetime(cells.astype(object), format=date_format,
+                                   errors='coerce')
+            if dates.isna().any():
+                return None
+            result = pd.Series(None, index=values.index, dtype=object)
+            result[present] = dates.dt.date
+            return result
+    return None
+
+
+def column_widths(df: pd.DataFrame, sample_rows: int = WIDTH_SAMPLE_ROWS,
+                  max_width: int = MAX_COLUMN_WIDTH) -> List[float]:
+    """Display width of every column: longest value or header, plus padding.
+
+    Frames longer than sample_rows are measured on a fixed random sample
+    of rows (plus the first rows), which is enough to size columns.
+    """
+    if len(df) > sample_rows:
+        head = df.iloc[:sample_rows // 10]
+        df = pd.concat([head, df.iloc[sample_rows // 10:].sample(
+            n=sample_rows - len(head), random_state=0)])
+    widths = []
+    for position, column in enumerate(df.columns):
+        values = df.iloc[:, position]
+        lengths = values[values.notna()].astype(str).str.len()
+        longest = max(len(str(column)), int(lengths.max()) if len(lengths) else 0)
+        widths.append(min(longest + 2, max_width))
+    return widths
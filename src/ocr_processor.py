@@ -0,0 +1,336 @@
+"""OCR for scanned pages.
+
+Only pages without a usable text layer are OCR'd (fewer than
+OCR_MIN_CHARS non-blank characters of native text); everything else keeps
+native extraction. For those pages:
+
+1. Rasterize and preprocess in parallel worker processes: render with
+   pdfium (grayscale, OCR_DPI), stretch contrast, median-filter noise and
+   binarize with an Otsu threshold. Each worker returns the page as a
+   bitmap (PBM, cheaper to encode than PNG and read natively by
+   Tesseract) together with the hash of the image.
+2. Run Tesseract (the ``tesseract`` command line tool, CPU only) on a
+   thread pool; each call is its own single-threaded process, so threads
+   are enough to keep all cores busy.
+   Both pools are started on first use and shared by every document the
+   processor OCRs, so concurrent conversions queue on them instead of
+   each starting processes.
+3. Cache the recognised words per page-image hash (plus language, page
+   segmentation mode and Tesseract version), so the same scan is never
+   OCR'd twice.
+
+Recognised words are grouped into lines by position and handed back as
+page text, which goes through the same lab-result parser as a native text
+layer.
+
+Configuration (environment variables):
+    PDF_OCR                 'auto' (default: OCR when tesseract is found) or 'off'
+    PDF_TESSERACT_CMD       Tesseract executable (default: tesseract on PATH)
+    PDF_OCR_LANG            Tesseract language(s) (default: eng)
+    PDF_OCR_DPI             Rasterization resolution (default: 300)
+    PDF_OCR_PSM             Tesseract page segmentation mode (default: 6)
+    PDF_OCR_WORKERS         Rasterization processes and OCR threads (default: CPU count)
+    PDF_OCR_MIN_CHARS       Native characters for a page to count as text (default: 20)
+    PDF_OCR_CACHE_DIR       On-disk OCR cache ('' disables it)
+"""
+
+import importlib.util
+import io
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from itertools import repeat
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+from . import profiling
+from .cache import ConversionCache, cache_key
+
+# Bump when preprocessing changes; cached OCR results are keyed on it.
+OCR_VERSION = "1"
+
+OCR_MODE = os.environ.get("PDF_OCR", "auto").lower()
+TESSERACT_CMD = os.environ.get("PDF_TESSERACT_CMD", "tesseract")
+OCR_LANG = os.environ.get("PDF_OCR_LANG", "eng")
+OCR_DPI = int(os.environ.get("PDF_OCR_DPI", "300"))
+OCR_PSM = os.environ.get("PDF_OCR_PSM", "6")
+OCR_WORKERS = int(os.environ.get("PDF_OCR_WORKERS", str(os.cpu_count() or 1)))
+OCR_MIN_CHARS = int(os.environ.get("PDF_OCR_MIN_CHARS", "20"))
+OCR_TIMEOUT = int(os.environ.get("PDF_OCR_TIMEOUT", "120"))
+
+# (text, left, top, width, height, confidence)
+Word = Tuple[str, int, int, int, int, float]
+
+# pdfium is not thread-safe: pages rasterized in this process (one worker,
+# or several server threads OCR'ing at once) take turns
+_PDFIUM_LOCK = threading.Lock()
+
+
+def has_text_layer(text: Optional[str]) -> bool:
+    """True when natively extracted page text is enough to skip OCR."""
+    return bool(text) and sum(not ch.isspace() for ch in text) >= OCR_MIN_CHARS
+
+
+class OCRProcessor:
+    """Rasterize, preprocess and OCR selected pages of a PDF."""
+
+    def __init__(self, lang: str = OCR_LANG, dpi: int = OCR_DPI, psm: str = OCR_PSM,
+                 workers: int = OCR_WORKERS, tesseract_cmd: str = TESSERACT_CMD,
+                 cache: Optional[ConversionCache] = None):
+        """
+        Initialize the processor.
+
+        Args:
+            lang: Tesseract language(s), e.g. 'eng' or 'eng+hin'
+            dpi: Rasterization resolution
+            psm: Tesseract page segmentation mode
+            workers: Rasterization processes and concurrent Tesseract calls
+            tesseract_cmd: Tesseract executable
+            cache: Cache of recognised words per page image (None disables it)
+        """
+        self.lang = lang
+        self.dpi = dpi
+        self.psm = psm
+        self.workers = workers
+        self.tesseract_cmd = tesseract_cmd
+        self.cache = cache
+        self._pools: Optional[Tuple[ProcessPoolExecutor, ThreadPoolExecutor]] = None
+        self._pools_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "OCRProcessor":
+        """Create a processor configured from PDF_OCR_* environment variables."""
+        cache_dir = os.environ.get(
+            "PDF_OCR_CACHE_DIR", os.path.join(tempfile.gettempdir(), "pdf-to-excel-ocr"))
+        cache = ConversionCache(memory_bytes=16 * 1024 * 1024, disk_dir=cache_dir or None,
+                                disk_bytes=256 * 1024 * 1024, suffix=".json")
+        return cls(cache=cache)
+
+    def available(self) -> bool:
+        """True when OCR is enabled and Tesseract and the imaging libraries exist."""
+        return (OCR_MODE != "off" and _imaging_available()
+                and shutil.which(self.tesseract_cmd) is not None)
+
+    def ocr_pages(self, pdf_path: str, page_numbers: Sequence[int],
+                  workers: Optional[int] = None) -> Dict[int, str]:
+        """
+        OCR the given 1-based pages.
+
+        Returns:
+            Page number -> recognised text, one line per text line
+        """
+        words = self.ocr_words(pdf_path, page_numbers, workers)
+        return {number: "\n".join(words_to_lines(page_words))
+                for number, page_words in words.items()}
+
+    def ocr_words(self, pdf_path: str, page_numbers: Sequence[int],
+                  workers: Optional[int] = None) -> Dict[int, List[Word]]:
+        """OCR the given 1-based pages and return the recognised words per page."""
+        if not _imaging_available():
+            raise ImportError("pypdfium2 and Pillow required for OCR: pip install pdfplumber")
+        workers = max(1, min(workers or self.workers, len(page_numbers)))
+        options = {"lang": self.lang, "psm": self.psm, "dpi": str(self.dpi),
+                   "engine": _tesseract_version(self.tesseract_cmd)}
+
+        # An in-memory document is rasterized from a copy of its bytes, so
+        # the caller's buffer is never read concurrently
+        source = _raster_source(pdf_path)
+        with profiling.stage(profiling.OCR, pages=len(page_numbers)):
+            if workers <= 1:
+                images = [_rasterize_page(source, number, self.dpi, options)
+                          for number in page_numbers]
+                return {number: self._recognize(key, image)
+                        for number, (key, image) in zip(page_numbers, images)}
+
+            # Pages are OCR'd as soon as they are rasterized
+            pools = self._get_pools()
+            processes, threads = pools
+            try:
+                images = processes.map(_rasterize_page, repeat(source), page_numbers,
+                                       repeat(self.dpi), repeat(options))
+                futures = [threads.submit(self._recognize, key, image)
+                           for key, image in images]
+            except BrokenProcessPool:
+                self._discard_pools(pools)
+                raise
+            return {number: future.result()
+                    for number, future in zip(page_numbers, futures)}
+
+    def _get_pools(self) -> Tuple[ProcessPoolExecutor, ThreadPoolExecutor]:
+        """The rasterization processes and Tesseract threads, started on first use."""
+        with self._pools_lock:
+            if self._pools is None:
+                workers = max(1, self.workers)
+                self._pools = (ProcessPoolExecutor(max_workers=workers),
+                               ThreadPoolExecutor(max_workers=workers))
+            return self._pools
+
+    def _discard_pools(self, pools: Tuple[ProcessPoolExecutor, ThreadPoolExecutor]) -> None:
+        """Drop a broken process pool so the next document starts new pools."""
+        with self._pools_lock:
+            if self._pools is pools:
+                self._pools = None
+        processes, threads = pools
+        processes.shutdown(wait=False, cancel_futures=True)
+        threads.shutdown(wait=False)
+
+    def _recognize(self, key: str, image: bytes) -> List[Word]:
+        """Words on one page image, from the cache or from Tesseract."""
+        if self.cache is None:
+            return self._run_tesseract(image)
+        data = self.cache.get_or_compute(
+            key, lambda: json.dumps(self._run_tesseract(image)).encode())
+        return [tuple(word) for word in json.loads(data)]
+
+    def _run_tesseract(self, image: bytes) -> List[Word]:
+        """Run Tesseract on an encoded page image and parse its TSV word boxes."""
+        command = [self.tesseract_cmd, "stdin", "stdout", "-l", self.lang,
+                   "--dpi", str(self.dpi), "--psm", str(self.psm), "tsv"]
+        # One thread per Tesseract process; parallelism comes from the pool
+        env = dict(os.environ, OMP_THREAD_LIMIT="1")
+        try:
+            result = subprocess.run(command, input=image, capture_output=True, env=env,
+                                    timeout=OCR_TIMEOUT, check=True)
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(
+                f"tesseract failed: {e.stderr.decode(errors='replace').strip()}") from None
+        return parse_tsv(result.stdout.decode("utf-8", errors="replace"))
+
+
+def ocr_missing_text(pdf_path: str, page_numbers: Sequence[int],
+                     texts: Sequence[Optional[str]],
+                     workers: Optional[int] = None) -> List[Optional[str]]:
+    """
+    Fill in OCR text for pages without a usable text layer.
+
+    texts holds the native text of each page in page_numbers (None for
+    pages that need no text, e.g. pages whose tables were extracted).
+    Returns texts with scanned pages replaced by their OCR text; when OCR
+    is unavailable they are left as they are.
+    """
+    scanned = [number for number, text in zip(page_numbers, texts)
+               if text is not None and not has_text_layer(text)]
+    if not scanned:
+        return list(texts)
+    if not ocr_processor.available():
+        if OCR_MODE != "off":
+            logger.warning(f"{len(scanned)} page(s) of {pdf_path} have no text layer; "
+                           "install tesseract to OCR them")
+        return list(texts)
+    recognized = ocr_processor.ocr_pages(pdf_path, scanned, workers)
+    return [recognized.get(number, text) for number, text in zip(page_numbers, texts)]
+
+
+def parse_tsv(tsv: str) -> List[Word]:
+    """Parse Tesseract TSV output into (text, left, top, width, height, conf) words."""
+    words = []
+    for line in tsv.splitlines()[1:]:
+        fields = line.split("\t")
+        # level 5 rows are words; empty text marks layout-only boxes
+        if len(fields) < 12 or fields[0] != "5" or not fields[11].strip():
+            continue
+        left, top, width, height = (int(v) for v in fields[6:10])
+        words.append((fields[11].strip(), left, top, width, height, float(fields[10])))
+    return words
+
+
+def words_to_lines(words: Sequence[Word]) -> List[str]:
+    """
+    Group words into text lines by vertical position, left to right.
+
+    A word joins the current line while its vertical centre lies within
+    half a word height of the line's; table cells on the same row end up
+    on the same line, as in native text extraction.
+    """
+    lines: List[List[Word]] = []
+    centre = tolerance = 0.0
+    for word in sorted(words, key=lambda w: w[2] + w[4] / 2):
+        word_centre = word[2] + word[4] / 2
+        if lines and abs(word_centre - centre) <= tolerance:
+            lines[-1].append(word)
+        else:
+            lines.append([word])
+            centre, tolerance = word_centre, max(word[4] / 2, 1)
+    return [" ".join(w[0] for w in sorted(line, key=lambda w: w[1])) for line in lines]
+
+
+def _raster_source(pdf_path):
+    """What pdfium opens: the path, or the bytes of an in-memory PDF."""
+    if isinstance(pdf_path, (str, os.PathLike)):
+        return pdf_path
+    if hasattr(pdf_path, "getvalue"):
+        return pdf_path.getvalue()
+    pdf_path.seek(0)
+    return pdf_path.read()
+
+
+def _rasterize_page(pdf_path, page_number: int, dpi: int,
+                    options: Dict[str, str]) -> Tuple[str, bytes]:
+    """Worker entry point: render and preprocess one page (path or bytes).
+
+    Returns the cache key of the preprocessed image and the image as PBM.
+    """
+    import pypdfium2 as pdfium
+    from PIL import ImageFilter, ImageOps
+
+    with _PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(pdf_path)
+        try:
+            bitmap = pdf[page_number - 1].render(scale=dpi / 72, grayscale=True)
+            image = bitmap.to_pil().convert("L")
+        finally:
+            pdf.close()
+
+    image = ImageOps.autocontrast(image)
+    image = image.filter(ImageFilter.MedianFilter(3))
+    threshold = _otsu_threshold(image.histogram())
+    binary = image.point(lambda value: 255 if value > threshold else 0, mode="1")
+
+    buffer = io.BytesIO()
+    binary.save(buffer, format="PPM")
+    data = buffer.getvalue()
+    return cache_key(data, OCR_VERSION, **options), data
+
+
+def _otsu_threshold(histogram: Sequence[int]) -> int:
+    """Grey level that best separates ink from paper (Otsu's method)."""
+    import numpy as np
+
+    histogram = np.asarray(histogram, dtype=np.float64)
+    levels = np.arange(256)
+    weight = np.cumsum(histogram)
+    total = weight[-1]
+    mean = np.cumsum(histogram * levels)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = (mean[-1] * weight - mean * total) ** 2 / (weight * (total - weight))
+    # A blank page has a single grey level and no separation at all
+    return int(np.argmax(np.nan_to_num(between[:-1])))
+
+
+@lru_cache(maxsize=None)
+def _imaging_available() -> bool:
+    """True when numpy, pypdfium2 and Pillow are installed (without importing them)."""
+    return all(importlib.util.find_spec(name) is not None
+               for name in ("numpy", "pypdfium2", "PIL"))
+
+
+@lru_cache(maxsize=None)
+def _tesseract_version(tesseract_cmd: str) -> str:
+    """First line of `tesseract --version` (part of the OCR cache key)."""
+    try:
+        result = subprocess.run([tesseract_cmd, "--version"], capture_output=True,
+                                timeout=30)
+    except OSError:
+        return "unknown"
+    output = (result.stdout or result.stderr).decode(errors="replace").strip()
+    return output.splitlines()[0] if output else "unknown"
+
+
+ocr_processor = OCRProcessor.from_env()
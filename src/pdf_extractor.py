@@ -1,43 +1,96 @@
 """PDF extraction module for converting PDFs to structured data."""
 
 import os
+import shutil
+import signal
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import List, Dict, Optional
-import PyPDF2
+from typing import Callable, Iterator, List, Dict, Optional, Tuple
 import pandas as pd
 from loguru import logger
+from . import extractor, profiling
+from .backends import get_backend
 from .excel_writer import ExcelWriter
+from .extractor import stream_lab_report
+from .lab_parser import parse_lab_results, parse_report_header
+from .manifest import ConversionManifest
+from .normalize import normalize_frame
+from .ocr_processor import ocr_missing_text, ocr_processor
+from .results_store import Report, ResultsStore, build_report
+from .sinks import get_sink, sink_for_path
+from .watcher import DirectoryMonitor
 
 
 class PDFtoExcelConverter:
     """Main converter class for PDF to Excel operations."""
 
-    def __init__(self, format_type: str = 'generic'):
+    def __init__(self, format_type: str = 'generic', backend: str = 'pypdf'):
         """Initialize the converter.
         
         Args:
             format_type: Type of document format (generic, medical, invoice)
+            backend: Extraction engine (see src/backends.py); the default
+                'pypdf' is the fast plain-text engine
         """
         self.format_type = format_type
+        self.backend = backend
         self.excel_writer = ExcelWriter()
+        # Lab results of the last convert_pdf(collect=True), for the results store
+        self.last_report: Optional[Report] = None
 
-    def extract_text_from_pdf(self, pdf_path: str) -> str:
+    def extract_text_from_pdf(self, pdf_path: str,
+                              backend: Optional[str] = None) -> str:
         """Extract all text from a PDF file.
         
         Args:
             pdf_path: Path to the PDF file
+            backend: Extraction engine for this call (default: the converter's)
             
         Returns:
-            Extracted text content
+            Extracted text content, pages separated by newlines
+        """
+        return "\n".join(self.iter_text_pages(pdf_path, backend))
+
+    def iter_text_pages(self, pdf_path: str,
+                        backend: Optional[str] = None) -> Iterator[str]:
+        """Yield the text of each page as it is extracted, in page order.
+        
+        Only one page is held at a time, so this suits very large files.
+        Pages without a text layer are OCR'd (see src/ocr_processor.py).
+        
+        Args:
+            pdf_path: Path to the PDF file
+            backend: Extraction engine for this call (default: the converter's)
         """
         try:
-            text = ""
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page_num in range(len(pdf_reader.pages)):
-                    page = pdf_reader.pages[page_num]
-                    text += page.extract_text()
-            return text
+            engine = get_backend(backend or self.backend)
+            for number, text in enumerate(engine.iter_text_pages(pdf_path), start=1):
+                yield ocr_missing_text(pdf_path, [number], [text], workers=1)[0]
+        except Exception as e:
+            logger.error(f"Error extracting text from {pdf_path}: {str(e)}")
+            raise
+
+    def _extract_pages(self, pdf_path: str,
+                       backend: Optional[str] = None) -> List[str]:
+        """Extract the text of each page of a PDF file.
+        
+        Args:
+            pdf_path: Path to the PDF file
+            backend: Extraction engine for this call (default: the converter's)
+            
+        Pages without a text layer (scans) are OCR'd when Tesseract is
+        available (see src/ocr_processor.py).
+        
+        Returns:
+            List with the extracted text of every page, in page order
+        """
+        try:
+            engine = get_backend(backend or self.backend)
+            pages = engine.extract_text_pages(pdf_path)
+            return ocr_missing_text(pdf_path, list(range(1, len(pages) + 1)), pages)
         except Exception as e:
             logger.error(f"Error extracting text from {pdf_path}: {str(e)}")
             raise
@@ -52,7 +105,7 @@ class PDFtoExcelConverter:
             Dictionary of parsed data
         """
         data = {}
-        lines = text.split('\\n')
+        lines = text.split('\n')
         
         if self.format_type == 'medical':
             data = self._parse_medical_format(lines)
@@ -64,13 +117,19 @@ class PDFtoExcelConverter:
         return data
 
     def _parse_medical_format(self, lines: List[str]) -> Dict[str, str]:
-        """Parse medical document format."""
+        """Parse medical document format.
+        
+        Returns the report header fields and, under 'test_results', a
+        DataFrame of Test/Value/Unit/Flag/Reference rows.
+        """
+        text = '\n'.join(lines)
+        header = parse_report_header(text)
         data = {
-            'patient_name': '',
-            'test_date': '',
-            'test_results': []
+            'patient_name': header['patient_name'],
+            'patient_id': header['patient_id'],
+            'test_date': header['report_date'],
+            'test_results': parse_lab_results(text)
         }
-        # Implement medical parsing logic
         return data
 
     def _parse_invoice_format(self, lines: List[str]) -> Dict[str, str]:
@@ -93,36 +152,129 @@ class PDFtoExcelConverter:
                 data[key.strip()] = value.strip()
         return data
 
-    def convert_pdf(self, input_pdf: str, output_excel: str) -> None:
+    def _to_dataframe(self, data: Dict[str, object]) -> pd.DataFrame:
+        """Build the output frame: one row per test result, or one row of fields."""
+        results = data.get('test_results')
+        if not isinstance(results, pd.DataFrame):
+            return pd.DataFrame([data])
+        df = results.copy()
+        fields = {'Patient Name': data['patient_name'],
+                  'Patient ID': data['patient_id'],
+                  'Report Date': data['test_date']}
+        for position, (column, value) in enumerate(fields.items()):
+            df.insert(position, column, value)
+        return df
+
+    def convert_pdf(self, input_pdf: str, output_excel: str,
+                    backend: Optional[str] = None, collect: bool = False) -> int:
         """Convert a single PDF to Excel.
         
+        The output format follows the output file's extension: .xlsx, or
+        .csv, .jsonl and .parquet (see src/sinks.py).
+        
         Args:
             input_pdf: Path to input PDF
             output_excel: Path to output Excel file
+            backend: Extraction engine for this call (default: the converter's)
+            collect: Also parse the report's lab results into last_report
+                (for the results store), whatever the document format
+            
+        Returns:
+            Number of pages processed
         """
         logger.info(f"Converting {input_pdf}...")
+        self.last_report = None
+        sink = sink_for_path(output_excel, self.excel_writer)
         
         # Extract text
-        text = self.extract_text_from_pdf(input_pdf)
+        with profiling.stage(profiling.EXTRACTION) as record:
+            pages = self._extract_pages(input_pdf, backend)
+            text = "\n".join(pages)
+            record['pages'] = len(pages)
         
         # Parse data
-        data = self.parse_extracted_data(text)
+        with profiling.stage(profiling.PARSING, pages=len(pages)):
+            data = self.parse_extracted_data(text)
         
         # Create DataFrame
-        df = pd.DataFrame([data])
+        with profiling.stage(profiling.DATAFRAME) as record:
+            df = self._to_dataframe(data)
+            record['rows'] = len(df)
         
-        # Write to Excel
-        self.excel_writer.write_dataframe(df, output_excel)
+        # Type numeric and date columns
+        with profiling.stage(profiling.NORMALIZATION, rows=len(df)):
+            df = normalize_frame(df)
+        
+        # Write to Excel (or the sink chosen by extension)
+        sink.write_dataframe(df, output_excel)
         logger.success(f"Created {output_excel}")
+        
+        if collect:
+            with profiling.stage(profiling.PARSING, pages=len(pages)) as record:
+                self.last_report = build_report(input_pdf, text, len(pages))
+                record['rows'] = len(self.last_report['rows'])
+        return len(pages)
+
+    def stream_pdf(self, input_pdf: str, output_excel: str,
+                   backend: Optional[str] = None) -> int:
+        """Stream the lab results of a PDF into a file, page by page.
+        
+        For very large PDFs: pages are extracted, parsed and written one at
+        a time (see extractor.stream_lab_report), so memory does not grow
+        with the page count. Cells are written as extracted, untyped.
+        
+        Args:
+            input_pdf: Path to input PDF
+            output_excel: Output file; the extension picks the sink
+            backend: Extraction engine for this call (default: the converter's)
+            
+        Returns:
+            Number of pages processed
+        """
+        logger.info(f"Streaming {input_pdf}...")
+        sink = sink_for_path(output_excel, self.excel_writer)
+        pages, rows = stream_lab_report(input_pdf, output_excel, sink,
+                                        backend=backend or self.backend)
+        logger.success(f"Created {output_excel} ({rows} rows from {pages} pages)")
+        return pages
 
     def batch_convert(self, input_dir: str, output_dir: str, 
-                     pattern: str = '*.pdf') -> None:
+                     pattern: str = '*.pdf',
+                     workers: int = 1,
+                     resume: bool = True,
+                     sink: str = 'xlsx',
+                     store: Optional[ResultsStore] = None) -> Dict[str, float]:
         """Convert multiple PDFs in a directory.
         
+        With more than one worker the files are spread over a pool of
+        long-lived worker processes, largest files first so that a single
+        big report does not hold up the end of the run.
+        
+        When called inside ``profiling.profile()``, the stage records of
+        every conversion (including those run in worker processes) are
+        collected by the active profiler.
+        
+        Progress is kept in a manifest in the output directory. When
+        resuming, inputs that are unchanged since they were last converted
+        successfully (and whose output still exists) are skipped, while
+        failed and new inputs are converted, so an interrupted run picks
+        up where it stopped.
+        
+        With a results store, the lab results of every converted file are
+        loaded into it as well. Unchanged files are only skipped if the
+        store already holds them.
+        
         Args:
             input_dir: Input directory containing PDFs
             output_dir: Output directory for Excel files
             pattern: File pattern to match
+            workers: Number of worker processes (1 converts in-process)
+            resume: Skip inputs the manifest shows as already converted
+            sink: Output format: xlsx, csv, jsonl or parquet
+            store: Results store to load the extracted rows into
+            
+        Returns:
+            Run summary with file, page and throughput counts
         """
         input_path = Path(input_dir)
         output_path = Path(output_dir)
@@ -131,12 +283,317 @@ class PDFtoExcelConverter:
         pdf_files = list(input_path.glob(pattern))
         logger.info(f"Found {len(pdf_files)} PDF files")
         
+        extension = get_sink(sink).extensions[0]
+        manifest = ConversionManifest(output_path)
+        options = f"{self.format_type}/{self.backend}"
+        targets = {}
+        skipped = 0
         for pdf_file in pdf_files:
-            try:
-                excel_file = output_path / f"{pdf_file.stem}.xlsx"
-                self.convert_pdf(str(pdf_file), str(excel_file))
-            except Exception as e:
-                logger.error(f"Failed to convert {pdf_file}: {str(e)}")
+            key = pdf_file.relative_to(input_path).as_posix()
+            excel_file = output_path / f"{pdf_file.stem}{extension}"
+            if (resume and manifest.is_up_to_date(key, pdf_file, excel_file, options)
+                    and (store is None or store.has_report(manifest.entries[key]['sha256']))):
+                skipped += 1
                 continue
+            targets[str(pdf_file)] = (key, excel_file)
+        if skipped:
+            logger.info(f"Skipping {skipped} unchanged files already converted")
         
+        jobs = [(pdf_file, str(excel_file))
+                for pdf_file, (_, excel_file) in targets.items()]
+        
+        collect = store is not None
+        started = time.perf_counter()
+        if workers > 1 and len(jobs) > 1:
+            results = self._convert_parallel(jobs, workers, collect)
+        else:
+            results = (self._convert_one(*job, collect=collect) for job in jobs)
+        
+        converted = failed = pages = 0
+        try:
+            for pdf_file, page_count, error, report in results:
+                if error is None:
+                    converted += 1
+                    pages += page_count
+                    if report is not None:
+                        store.add_report(report)
+                else:
+                    failed += 1
+                    logger.error(f"Failed to convert {pdf_file}: {error}")
+                key, excel_file = targets[pdf_file]
+                manifest.record(key, Path(pdf_file), excel_file,
+                                options, error)
+        finally:
+            manifest.flush()
+            if store is not None:
+                store.flush()
+        elapsed = time.perf_counter() - started
+        
+        summary = {
+            'files': len(pdf_files),
+            'skipped': skipped,
+            'converted': converted,
+            'failed': failed,
+            'pages': pages,
+            'elapsed': elapsed,
+            'files_per_sec': converted / elapsed if elapsed > 0 else 0.0,
+            'pages_per_sec': pages / elapsed if elapsed > 0 else 0.0,
+        }
         logger.info(f"Batch conversion completed. Output saved to {output_dir}")
+        logger.info(
+            f"Converted {converted}/{len(jobs)} files ({pages} pages, "
+            f"{skipped} skipped) in "
+            f"{elapsed:.2f}s: {summary['files_per_sec']:.2f} files/s, "
+            f"{summary['pages_per_sec']:.2f} pages/s"
+        )
+        return summary
+
+    def watch_folder(self, input_dir: str, output_dir: str,
+                     archive_dir: Optional[str] = None,
+                     error_dir: Optional[str] = None,
+                     pattern: str = '*.pdf',
+                     workers: int = 2,
+                     sink: str = 'xlsx',
+                     settle: float = 2.0,
+                     poll_interval: float = 1.0,
+                     use_inotify: bool = True,
+                     store: Optional[ResultsStore] = None,
+                     stop: Optional[threading.Event] = None,
+                     on_result: Optional[Callable[[Dict[str, object]], None]] = None
+                     ) -> Dict[str, int]:
+        """Convert PDFs as they are dropped into a folder, until stopped.
+        
+        New files are detected with inotify (or by polling, see
+        src/watcher.py) and picked up once they have stopped being
+        written. They are converted on a pool of at most ``workers``
+        long-lived processes; further ready files wait in a queue. After
+        conversion each input is moved to the archive folder, or to the
+        error folder (next to a ``.error.txt`` with the reason) when it
+        failed. Files already in the folder at start are converted too.
+        When stop is set, conversions in progress are finished and
+        archived before returning; queued files stay in the folder.
+        
+        Args:
+            input_dir: Folder to watch (only files directly inside it)
+            output_dir: Output directory for converted files
+            archive_dir: Where converted inputs go (default: input_dir/processed)
+            error_dir: Where failed inputs go (default: input_dir/failed)
+            pattern: File pattern to match
+            workers: Number of worker processes
+            sink: Output format: xlsx, csv, jsonl or parquet
+            settle: Seconds a file must stay unchanged before it is picked up
+            poll_interval: Seconds between directory scans when polling
+            use_inotify: False forces polling (e.g. for network shares)
+            store: Results store to load the extracted rows into; they are
+                written whenever no conversion is running
+            stop: Event that ends the watch (default: run until interrupted)
+            on_result: Called with a status dict after each file and
+                whenever the queue depth changes
+            
+        Returns:
+            Counts of converted and failed files
+        """
+        input_path = Path(input_dir)
+        output_path = Path(output_dir)
+        archive_path = Path(archive_dir) if archive_dir else input_path / 'processed'
+        error_path = Path(error_dir) if error_dir else input_path / 'failed'
+        for directory in (output_path, archive_path, error_path):
+            directory.mkdir(parents=True, exist_ok=True)
+        
+        extension = get_sink(sink).extensions[0]
+        stop = stop or threading.Event()
+        queued: List[Path] = []
+        running: Dict[object, Path] = {}
+        counts = {'converted': 0, 'failed': 0}
+        last_status = None
+        
+        def new_pool() -> ProcessPoolExecutor:
+            return ProcessPoolExecutor(max_workers=workers,
+                                       initializer=_init_watch_worker,
+                                       initargs=(self.format_type, self.backend,
+                                                 store is not None))
+        
+        def finish(pdf_file: Path, page_count: int, error: Optional[str],
+                   report: Optional[Report] = None) -> None:
+            if error is None:
+                counts['converted'] += 1
+                if report is not None:
+                    store.add_report(report)
+                destination = _move_unique(pdf_file, archive_path)
+                logger.success(f"Converted {pdf_file.name} ({page_count} pages)")
+            else:
+                counts['failed'] += 1
+                destination = _move_unique(pdf_file, error_path)
+                destination.with_name(destination.name + '.error.txt').write_text(
+                    error + '\n', encoding='utf-8')
+                logger.error(f"Failed to convert {pdf_file.name}: {error}")
+            monitor.release(pdf_file)
+            if on_result:
+                on_result({'file': pdf_file.name, 'pages': page_count, 'error': error,
+                           'moved_to': str(destination)})
+        
+        with DirectoryMonitor(input_dir, pattern, settle, poll_interval,
+                              use_inotify) as monitor:
+            logger.info(f"Watching {input_dir} ({monitor.mode}) with {workers} workers")
+            pool = new_pool()
+            try:
+                while not stop.is_set() or running:
+                    if not stop.is_set():
+                        queued.extend(monitor.poll(0.5 if not running else 0))
+                    
+                    if running:
+                        done, _ = wait(running, timeout=0.5, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            pdf_file = running.pop(future)
+                            try:
+                                (_, page_count, error, report), _ = future.result()
+                            except BrokenProcessPool as e:
+                                # A worker died hard (e.g. the OOM killer): files
+                                # whose conversion had already completed keep their
+                                # result, the rest of the pool's files are failed
+                                finish(pdf_file, 0, f"worker process died: {e}")
+                                for other, other_file in list(running.items()):
+                                    if (other.done() and not other.cancelled()
+                                            and other.exception() is None):
+                                        (_, page_count, error, report), _ = other.result()
+                                        finish(other_file, page_count, error, report)
+                                    else:
+                                        finish(other_file, 0, f"worker process died: {e}")
+                                running.clear()
+                                pool.shutdown(wait=False, cancel_futures=True)
+                                pool = new_pool()
+                                break
+                            finish(pdf_file, page_count, error, report)
+                        if store is not None and not running:
+                            store.flush()
+                    
+                    while queued and len(running) < workers and not stop.is_set():
+                        pdf_file = queued.pop(0)
+                        output_file = output_path / f"{pdf_file.stem}{extension}"
+                        running[pool.submit(_convert_in_worker, str(pdf_file),
+                                            str(output_file))] = pdf_file
+                    
+                    status = (monitor.settling, len(queued), len(running))
+                    if status != last_status:
+                        last_status = status
+                        logger.info(f"Queue: {status[0]} settling, {status[1]} waiting, "
+                                    f"{status[2]} converting")
+                        if on_result:
+                            on_result({'settling': status[0], 'queued': status[1],
+                                       'running': status[2]})
+            finally:
+                pool.shutdown(wait=True, cancel_futures=True)
+                if store is not None:
+                    store.flush()
+        return counts
+
+    def _convert_one(self, input_pdf: str, output_excel: str, collect: bool = False
+                     ) -> Tuple[str, int, Optional[str], Optional[Report]]:
+        """Convert one file, capturing any failure instead of raising.
+        
+        Returns (input, pages, error, report); report holds the lab results
+        when collect is set (see convert_pdf).
+        """
+        try:
+            pages = self.convert_pdf(input_pdf, output_excel, collect=collect)
+            return input_pdf, pages, None, self.last_report
+        except Exception as e:
+            return input_pdf, 0, str(e), None
+
+    def _convert_parallel(self, jobs: List[Tuple[str, str]], workers: int,
+                          collect: bool = False):
+        """Convert jobs on a process pool, yielding results as they finish."""
+        # Largest first: the pool hands out work in submission order.
+        jobs = sorted(jobs, key=lambda job: _file_size(job[0]), reverse=True)
+        workers = min(workers, len(jobs))
+        logger.info(f"Converting with {workers} worker processes")
+        
+        profiler = profiling.active()
+        trace_memory = profiler.trace_memory if profiler else None
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_init_worker,
+                                 initargs=(self.format_type, self.backend,
+                                           trace_memory, collect)) as pool:
+            futures = {pool.submit(_convert_in_worker, *job): job[0]
+                       for job in jobs}
+            for future in as_completed(futures):
+                try:
+                    result, records = future.result()
+                    profiling.collect(records)
+                    yield result
+                except BrokenProcessPool as e:
+                    # A worker died hard (e.g. killed by the OOM killer);
+                    # the files it was holding are reported as failed.
+                    yield futures[future], 0, f"worker process died: {e}", None
+
+
+# Per-process converter, created once by the pool initializer so every
+# worker keeps its imported modules and writer between files.
+_worker_converter: Optional[PDFtoExcelConverter] = None
+# None when the parent is not profiling, else whether to trace memory.
+_worker_trace_memory: Optional[bool] = None
+# Whether results are sent back for the parent's results store.
+_worker_collect = False
+
+
+def _init_worker(format_type: str, backend: str,
+                 trace_memory: Optional[bool] = None,
+                 collect: bool = False) -> None:
+    """Initialize a batch (or watch) worker process.
+    
+    The pool already converts files in parallel, so a long document is
+    not sharded (or OCR'd) again over another pool per worker.
+    """
+    global _worker_converter, _worker_trace_memory, _worker_collect
+    extractor.SHARD_WORKERS = 1
+    ocr_processor.workers = 1
+    _worker_converter = PDFtoExcelConverter(format_type=format_type,
+                                            backend=backend)
+    _worker_trace_memory = trace_memory
+    _worker_collect = collect
+
+
+def _init_watch_worker(format_type: str, backend: str, collect: bool = False) -> None:
+    """Initialize a watch worker process.
+    
+    Ctrl+C is left to the parent, which lets running conversions finish.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _init_worker(format_type, backend, collect=collect)
+
+
+def _convert_in_worker(input_pdf: str, output_excel: str
+                       ) -> Tuple[Tuple[str, int, Optional[str], Optional[Report]], List[Dict]]:
+    """Convert one file inside a batch worker process.
+    
+    Returns the conversion result (with the lab results when the parent
+    keeps a results store) and, when the parent is profiling, the stage
+    records of this conversion.
+    """
+    if _worker_trace_memory is None:
+        return _worker_converter._convert_one(input_pdf, output_excel, _worker_collect), []
+    with profiling.profile(trace_memory=_worker_trace_memory) as profiler:
+        result = _worker_converter._convert_one(input_pdf, output_excel, _worker_collect)
+    return result, profiler.records
+
+
+def _move_unique(path: Path, directory: Path) -> Path:
+    """Move a file into a directory without overwriting an earlier one there."""
+    destination = directory / path.name
+    if destination.exists():
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        destination = directory / f"{path.stem}.{stamp}-{os.getpid()}{path.suffix}"
+        counter = 1
+        while destination.exists():
+            destination = directory / f"{path.stem}.{stamp}-{counter}{path.suffix}"
+            counter += 1
+    shutil.move(str(path), str(destination))
+    return destination
+
+
+def _file_size(path: str) -> int:
+    """Return the size of a file, or 0 if it cannot be read."""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
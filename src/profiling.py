@@ -0,0 +1,251 @@
+"""Per-stage instrumentation of the conversion pipeline.
+
+Conversion code wraps its stages in ``stage(name)``::
+
+    with stage(EXTRACTION) as record:
+        pages = extract(...)
+        record['pages'] = len(pages)
+
+Every stage records wall time, CPU time, page and row counts into the
+process-wide ``METRICS`` histograms (served as Prometheus text by the API).
+Inside ``profile()`` the records are also collected for a per-stage
+breakdown, and peak Python memory per stage is traced with tracemalloc.
+Memory tracing is costly, so outside ``profile()`` it is only enabled when
+PDF_PROFILE_MEMORY=1.
+
+Stages nest (OCR runs inside extraction, and a streamed conversion
+serializes inside extraction). A stage's times include its nested
+stages; each record names its enclosing stage in ``parent``, and the
+breakdown leaves nested stages out of the total. CPU time is that of the
+calling thread, so concurrent requests in a threaded server do not count
+each other's work (nor that of worker processes or threads it starts).
+"""
+
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence
+
+EXTRACTION = 'extraction'
+OCR = 'ocr'
+PARSING = 'parsing'
+DATAFRAME = 'dataframe'
+NORMALIZATION = 'normalization'
+SERIALIZATION = 'serialization'
+STAGES = (EXTRACTION, OCR, PARSING, DATAFRAME, NORMALIZATION, SERIALIZATION)
+
+TRACE_MEMORY = os.environ.get('PDF_PROFILE_MEMORY', '').lower() in ('1', 'true', 'yes')
+
+_profiler: ContextVar[Optional['Profiler']] = ContextVar('pdfx_profiler', default=None)
+_memory_stack: ContextVar[tuple] = ContextVar('pdfx_memory_stack', default=())
+_stage_stack: ContextVar[tuple] = ContextVar('pdfx_stage_stack', default=())
+
+
+class Histogram:
+    """Cumulative Prometheus-style histogram with labelled series."""
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float]):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label: str, value: float) -> None:
+        with self._lock:
+            series = self._series.get(label)
+            if series is None:
+                # bucket counts..., +Inf count, sum
+                series = self._series[label] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}",
+                 f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((label, list(series)) for label, series in self._series.items())
+        for label, series in items:
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{stage="{label}",le="{bound:g}"}} {count:g}')
+            lines.append(f'{self.name}_bucket{{stage="{label}",le="+Inf"}} {series[-2]:g}')
+            lines.append(f'{self.name}_sum{{stage="{label}"}} {series[-1]:g}')
+            lines.append(f'{self.name}_count{{stage="{label}"}} {series[-2]:g}')
+        return lines
+
+
+class MetricsRegistry:
+    """Process-wide stage histograms."""
+
+    def __init__(self):
+        seconds = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+        counts = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000, 10000, 100000)
+        self.wall = Histogram('pdfx_stage_seconds',
+                              'Wall time per conversion stage', seconds)
+        self.cpu = Histogram('pdfx_stage_cpu_seconds',
+                             'CPU time of the calling thread per conversion stage', seconds)
+        self.pages = Histogram('pdfx_stage_pages',
+                               'Pages handled per conversion stage', counts)
+        self.rows = Histogram('pdfx_stage_rows',
+                              'Rows handled per conversion stage', counts)
+        self.memory = Histogram('pdfx_stage_peak_memory_bytes',
+                                'Peak traced Python memory per conversion stage',
+                                tuple(2 ** n * 1024 * 1024 for n in range(0, 13)))
+
+    def observe(self, record: Dict[str, object]) -> None:
+        name = record['stage']
+        self.wall.observe(name, record['wall'])
+        self.cpu.observe(name, record['cpu'])
+        if record['pages'] is not None:
+            self.pages.observe(name, record['pages'])
+        if record['rows'] is not None:
+            self.rows.observe(name, record['rows'])
+        if record['peak_memory'] is not None:
+            self.memory.observe(name, record['peak_memory'])
+
+    def render_prometheus(self) -> str:
+        lines = []
+        for histogram in (self.wall, self.cpu, self.pages, self.rows, self.memory):
+            lines.extend(histogram.render())
+        return '\n'.join(lines) + '\n'
+
+
+METRICS = MetricsRegistry()
+
+
+class Profiler:
+    """Collects stage records while active (see profile())."""
+
+    def __init__(self, trace_memory: bool = True):
+        self.trace_memory = trace_memory
+        self.records: List[Dict[str, object]] = []
+
+    def add(self, record: Dict[str, object]) -> None:
+        self.records.append(record)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Aggregate records per stage: calls, times, max peak memory, counts."""
+        summary: Dict[str, Dict[str, float]] = {}
+        for record in self.records:
+            entry = summary.setdefault(record['stage'], {
+                'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'peak_memory': None,
+                'pages': 0, 'rows': 0, 'nested': False,
+            })
+            entry['calls'] += 1
+            entry['nested'] = entry['nested'] or record.get('parent') is not None
+            entry['wall'] += record['wall']
+            entry['cpu'] += record['cpu']
+            entry['pages'] += record['pages'] or 0
+            entry['rows'] += record['rows'] or 0
+            if record['peak_memory'] is not None:
+                entry['peak_memory'] = max(entry['peak_memory'] or 0, record['peak_memory'])
+        return summary
+
+    def report(self) -> str:
+        """Human-readable per-stage breakdown.
+
+        Percentages are of the time spent in top-level stages; a nested
+        stage (marked *) is also counted in the stage enclosing it.
+        """
+        summary = self.summary()
+        total_wall = sum(record['wall'] for record in self.records
+                         if record.get('parent') is None) or 1.0
+        lines = [f"{'Stage':<16} {'Calls':>6} {'Wall (s)':>10} {'%':>6} "
+                 f"{'CPU (s)':>10} {'Peak MB':>9} {'Pages':>7} {'Rows':>9}"]
+        ordered = [s for s in STAGES if s in summary] + \
+                  sorted(s for s in summary if s not in STAGES)
+        for name in ordered:
+            entry = summary[name]
+            peak = ('-' if entry['peak_memory'] is None
+                    else f"{entry['peak_memory'] / 1024 / 1024:.1f}")
+            label = f"{name} *" if entry['nested'] else name
+            lines.append(
+                f"{label:<16} {entry['calls']:>6} {entry['wall']:>10.3f} "
+                f"{entry['wall'] / total_wall * 100:>5.1f}% {entry['cpu']:>10.3f} "
+                f"{peak:>9} {entry['pages'] or '-':>7} {entry['rows'] or '-':>9}"
+            )
+        if any(entry['nested'] for entry in summary.values()):
+            lines.append("* runs inside another stage, whose time includes it")
+        return '\n'.join(lines)
+
+
+@contextmanager
+def profile(trace_memory: bool = True) -> Iterator[Profiler]:
+    """Collect the stage records of everything run inside the block."""
+    profiler = Profiler(trace_memory)
+    token = _profiler.set(profiler)
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    try:
+        yield profiler
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+        _profiler.reset(token)
+
+
+def active() -> Optional[Profiler]:
+    """Return the profiler collecting records in this context, if any."""
+    return _profiler.get()
+
+
+def collect(records: Sequence[Dict[str, object]]) -> None:
+    """Add records produced elsewhere (e.g. a worker process) to the active profiler."""
+    profiler = _profiler.get()
+    if profiler is not None:
+        for record in records:
+            profiler.add(record)
+
+
+@contextmanager
+def stage(name: str, pages: Optional[int] = None,
+          rows: Optional[int] = None) -> Iterator[Dict[str, object]]:
+    """Measure one pipeline stage; set record['pages'] / ['rows'] inside."""
+    stages = _stage_stack.get()
+    record: Dict[str, object] = {'stage': name, 'wall': 0.0, 'cpu': 0.0,
+                                 'peak_memory': None, 'pages': pages, 'rows': rows,
+                                 'parent': stages[-1] if stages else None}
+    profiler = _profiler.get()
+    trace = tracemalloc.is_tracing() and (TRACE_MEMORY or
+                                          (profiler is not None and profiler.trace_memory))
+    if TRACE_MEMORY and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        trace = True
+
+    token = None
+    if trace:
+        # Peaks are tracked per nesting level: an inner stage resets the
+        # tracemalloc peak, so it hands its peak back to the enclosing stage.
+        stack = _memory_stack.get()
+        if stack:
+            stack[-1][1] = max(stack[-1][1], tracemalloc.get_traced_memory()[1])
+        start_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        frame = [start_memory, start_memory]
+        token = _memory_stack.set(stack + (frame,))
+
+    stage_token = _stage_stack.set(stages + (name,))
+    wall_start, cpu_start = time.perf_counter(), time.thread_time()
+    try:
+        yield record
+    finally:
+        record['wall'] = time.perf_counter() - wall_start
+        record['cpu'] = time.thread_time() - cpu_start
+        _stage_stack.reset(stage_token)
+        if token is not None:
+            peak = max(frame[1], tracemalloc.get_traced_memory()[1])
+            _memory_stack.reset(token)
+            stack = _memory_stack.get()
+            if stack:
+                stack[-1][1] = max(stack[-1][1], peak)
+            record['peak_memory'] = max(0, peak - frame[0])
+        METRICS.observe(record)
+        if profiler is not None:
+            profiler.add(record)
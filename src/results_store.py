@@ -0,0 +1,280 @@
+"""Embedded SQLite store of extracted lab results.
+
+Conversions can also load their rows into a local SQLite database, so
+historical questions (all HbA1c values last month, one patient's
+results over time) are answered from the store instead of by reopening
+workbooks or re-parsing PDFs.
+
+Each report is keyed on the SHA-256 of its source PDF; loading the same
+file again replaces its rows. The report date (day-first dates, as
+printed on the reports, are stored as ISO ``YYYY-MM-DD``), patient ID
+and test name are indexed for the slices ``query`` selects. Rows are
+buffered and written with ``executemany`` in large transactions, in WAL
+mode, so loading keeps up with batch conversions.
+
+The store is written by one process: in parallel batch runs, workers
+send their reports back to the parent, which loads them.
+
+Configuration (environment variables):
+    PDF_RESULTS_STORE       Store used by the query and export commands
+                            (default: results.db)
+"""
+
+import os
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from loguru import logger
+
+from .lab_parser import lab_result_rows, parse_report_header
+from .manifest import file_sha256
+
+STORE_PATH = os.environ.get('PDF_RESULTS_STORE', 'results.db')
+SCHEMA_VERSION = 1
+
+# Rows buffered before they are written in one transaction
+BATCH_ROWS = 50000
+
+# Columns of query results and exports
+QUERY_COLUMNS = ['Patient Name', 'Patient ID', 'Report Date', 'Test', 'Value',
+                 'Unit', 'Flag', 'Reference', 'Source']
+
+# Report dates as printed (day-first), tried in order
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y', '%d/%m/%y', '%d-%m-%y')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY,
+    sha256 TEXT NOT NULL UNIQUE,
+    source TEXT NOT NULL,
+    patient_name TEXT NOT NULL DEFAULT '',
+    patient_id TEXT NOT NULL DEFAULT '',
+    report_date TEXT NOT NULL DEFAULT '',
+    pages INTEGER,
+    loaded_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    report_id INTEGER NOT NULL REFERENCES reports(id),
+    position INTEGER NOT NULL,
+    test TEXT NOT NULL COLLATE NOCASE,
+    value TEXT NOT NULL,
+    value_num REAL,
+    unit TEXT NOT NULL DEFAULT '',
+    flag TEXT NOT NULL DEFAULT '',
+    reference TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS reports_date ON reports (report_date);
+CREATE INDEX IF NOT EXISTS reports_patient ON reports (patient_id, report_date);
+CREATE INDEX IF NOT EXISTS results_test ON results (test, report_id);
+CREATE INDEX IF NOT EXISTS results_report ON results (report_id, position);
+"""
+
+# A report as loaded: source, sha256, patient_name, patient_id,
+# report_date, pages and rows (Test, Value, Unit, Flag, Reference tuples)
+Report = Dict[str, Any]
+
+
+def build_report(pdf_path: Union[str, Path], text: str,
+                 pages: Optional[int] = None) -> Report:
+    """Parse a report's extracted text into a record for the store."""
+    header = parse_report_header(text)
+    return {
+        'source': str(pdf_path),
+        'sha256': file_sha256(Path(pdf_path)),
+        'patient_name': header['patient_name'],
+        'patient_id': header['patient_id'],
+        'report_date': iso_date(header['report_date']),
+        'pages': pages,
+        'rows': lab_result_rows(text),
+    }
+
+
+def iso_date(value: str) -> str:
+    """A printed report date as YYYY-MM-DD, or unchanged if it cannot be read."""
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date().isoformat()
+        except ValueError:
+            continue
+    return value
+
+
+def _number(value: str) -> Optional[float]:
+    """Numeric value of a result ('< 0.5' -> 0.5, '1,200' -> 1200), if any."""
+    try:
+        return float(value.lstrip('<>≤≥ \t').replace(',', ''))
+    except ValueError:
+        return None
+
+
+class ResultsStore:
+    """Indexed SQLite database of lab results, loaded in bulk."""
+
+    def __init__(self, path: Union[str, Path] = STORE_PATH,
+                 batch_rows: int = BATCH_ROWS):
+        """Open (and create if needed) a results store.
+
+        Args:
+            path: Database file
+            batch_rows: Rows buffered by add_report before a transaction
+                writes them
+        """
+        self.path = Path(path)
+        self.batch_rows = batch_rows
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(_SCHEMA)
+        self._db.execute(f'PRAGMA user_version={SCHEMA_VERSION}')
+        self._pending: List[Report] = []
+        self._pending_rows = 0
+
+    def __enter__(self) -> "ResultsStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def add_report(self, report: Report) -> None:
+        """Queue a report for loading; written once enough rows are buffered."""
+        self._pending.append(report)
+        self._pending_rows += len(report['rows'])
+        if self._pending_rows >= self.batch_rows:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write the queued reports in one transaction; return how many."""
+        if not self._pending:
+            return 0
+        reports, self._pending, self._pending_rows = self._pending, [], 0
+        now = time.time()
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            for report in reports:
+                # Loading a file again replaces what it loaded before
+                db.execute('DELETE FROM results WHERE report_id IN '
+                           '(SELECT id FROM reports WHERE sha256 = ?)', (report['sha256'],))
+                db.execute('DELETE FROM reports WHERE sha256 = ?', (report['sha256'],))
+                report_id = db.execute(
+                    'INSERT INTO reports (sha256, source, patient_name, patient_id, '
+                    'report_date, pages, loaded_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (report['sha256'], report['source'], report['patient_name'],
+                     report['patient_id'], report['report_date'], report['pages'], now)
+                ).lastrowid
+                db.executemany(
+                    'INSERT INTO results (report_id, position, test, value, value_num, '
+                    'unit, flag, reference) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    ((report_id, position, test, value, _number(value), unit, flag, reference)
+                     for position, (test, value, unit, flag, reference)
+                     in enumerate(report['rows'])))
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        rows = sum(len(report['rows']) for report in reports)
+        logger.info(f"Loaded {len(reports)} reports ({rows} results) into {self.path}")
+        return len(reports)
+
+    def has_report(self, sha256: Optional[str]) -> bool:
+        """Whether a source file (by content hash) is in the store or queued."""
+        if not sha256:
+            return False
+        if any(report['sha256'] == sha256 for report in self._pending):
+            return True
+        return self._db.execute('SELECT 1 FROM reports WHERE sha256 = ?',
+                                (sha256,)).fetchone() is not None
+
+    def query(self, tests: Sequence[str] = (), patient_id: Optional[str] = None,
+              date_from: Optional[str] = None, date_to: Optional[str] = None,
+              sha256: Optional[str] = None, flagged: bool = False,
+              limit: Optional[int] = None) -> Iterator[Tuple]:
+        """Yield result rows (QUERY_COLUMNS order) of a slice of the store.
+
+        Args:
+            tests: Test names, matched case-insensitively; '%' and '_'
+                are wildcards
+            patient_id: Only this patient
+            date_from: First report date (YYYY-MM-DD), inclusive
+            date_to: Last report date (YYYY-MM-DD), inclusive
+            sha256: Only the report of this source file hash
+            flagged: Only results with a flag (H, L, ...)
+            limit: At most this many rows
+
+        Rows are ordered by report date, patient and position in the
+        report, and fetched from the cursor as they are consumed.
+        """
+        where, params = self._filters(tests, patient_id, date_from, date_to,
+                                      sha256, flagged)
+        sql = ('SELECT r.patient_name, r.patient_id, r.report_date, t.test, t.value, '
+               't.unit, t.flag, t.reference, r.source '
+               'FROM results t JOIN reports r ON r.id = t.report_id'
+               + where + ' ORDER BY r.report_date, r.patient_id, r.id, t.position')
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        cursor = self._db.execute(sql, params)
+        while True:
+            batch = cursor.fetchmany(1000)
+            if not batch:
+                return
+            yield from batch
+
+    def count(self, tests: Sequence[str] = (), patient_id: Optional[str] = None,
+              date_from: Optional[str] = None, date_to: Optional[str] = None,
+              sha256: Optional[str] = None, flagged: bool = False) -> int:
+        """Number of result rows in a slice (same filters as query)."""
+        where, params = self._filters(tests, patient_id, date_from, date_to,
+                                      sha256, flagged)
+        return self._db.execute('SELECT COUNT(*) FROM results t JOIN reports r '
+                                'ON r.id = t.report_id' + where, params).fetchone()[0]
+
+    def stats(self) -> Dict[str, object]:
+        """Report and result counts and the range of report dates."""
+        reports, patients, first, last = self._db.execute(
+            "SELECT COUNT(*), COUNT(DISTINCT NULLIF(patient_id, '')), "
+            "MIN(NULLIF(report_date, '')), MAX(NULLIF(report_date, '')) FROM reports"
+        ).fetchone()
+        results = self._db.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+        return {'reports': reports, 'results': results, 'patients': patients,
+                'first_date': first, 'last_date': last}
+
+    def close(self) -> None:
+        """Write queued reports and close the database."""
+        try:
+            self.flush()
+        finally:
+            self._db.close()
+
+    @staticmethod
+    def _filters(tests: Sequence[str], patient_id: Optional[str],
+                 date_from: Optional[str], date_to: Optional[str],
+                 sha256: Optional[str], flagged: bool) -> Tuple[str, List[Any]]:
+        clauses: List[str] = []
+        params: List[Any] = []
+        if tests:
+            matches = []
+            for test in tests:
+                operator = 'LIKE' if '%' in test or '_' in test else '='
+                matches.append(f't.test {operator} ?')
+                params.append(test)
+            clauses.append('(' + ' OR '.join(matches) + ')')
+        if patient_id:
+            clauses.append('r.patient_id = ?')
+            params.append(patient_id)
+        if date_from:
+            clauses.append('r.report_date >= ?')
+            params.append(date_from)
+        if date_to:
+            clauses.append('r.report_date <= ?')
+            params.append(date_to)
+        if sha256:
+            clauses.append('r.sha256 = ?')
+            params.append(sha256.lower())
+        if flagged:
+            clauses.append("t.flag != ''")
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
@@ -0,0 +1,269 @@
+"""Output sinks: where extracted rows are written.
+
+A sink writes a DataFrame, or rows streamed from any iterable, to a path
+or binary file object. Four sinks are built in:
+
+- ``xlsx``: styled workbook through ``ExcelWriter``; data beyond Excel's
+  row limit spills onto extra sheets
+- ``csv``: UTF-8 CSV, lines ended with CRLF as the csv module does
+- ``jsonl``: JSON Lines, one object per row
+- ``parquet``: Apache Parquet (needs pyarrow), written in row groups
+
+The non-XLSX sinks skip openpyxl entirely and are much faster for large
+extractions. Sinks are selected by name or by output file extension;
+additional sinks can be added with ``register_sink``.
+
+pandas, openpyxl and pyarrow are imported only when a sink first needs
+them: looking sinks up (names, MIME types, extensions) is free, and the
+CSV and JSON Lines ``write_rows`` paths never load them at all.
+"""
+
+import csv
+import io
+import json
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import Path
+from typing import (TYPE_CHECKING, Any, BinaryIO, Dict, Iterable, Iterator, List,
+                    Optional, Sequence, TextIO, Type, Union)
+
+from . import profiling
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from .excel_writer import ExcelWriter
+
+DEFAULT_SINK = 'xlsx'
+
+# Both CSV paths end lines alike, so a report's CSV bytes do not depend
+# on which path wrote it
+CSV_LINE_TERMINATOR = '\r\n'
+
+# Rows per streamed Parquet row group
+PARQUET_BATCH_ROWS = 65536
+
+Output = Union[str, Path, BinaryIO]
+
+
+class OutputSink:
+    """Base class for output formats."""
+
+    name: str = ""
+    extensions: Sequence[str] = ()
+    mimetype: str = 'application/octet-stream'
+
+    def write_dataframe(self, df: 'pd.DataFrame', output: Output) -> None:
+        """Write a whole DataFrame."""
+        from .excel_writer import _frame_rows
+        self.write_rows(_frame_rows(df), list(df.columns), output)
+
+    def write_rows(self, rows: Iterable[Sequence[Any]], columns: List[str],
+                   output: Output) -> None:
+        """Stream rows from any iterable."""
+        raise NotImplementedError
+
+
+class XLSXSink(OutputSink):
+    """Styled Excel workbook, spilling over extra sheets past the row limit."""
+
+    name = 'xlsx'
+    extensions = ('.xlsx',)
+    mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+    def __init__(self, writer: Optional['ExcelWriter'] = None):
+        if writer is None:
+            from .excel_writer import ExcelWriter
+            writer = ExcelWriter()
+        self.writer = writer
+
+    def write_dataframe(self, df, output):
+        self.writer.write_dataframe(df, output)
+
+    def write_rows(self, rows, columns, output):
+        self.writer.write_rows(rows, columns, output)
+
+
+class CSVSink(OutputSink):
+    """UTF-8 CSV with a header row."""
+
+    name = 'csv'
+    extensions = ('.csv',)
+    mimetype = 'text/csv'
+
+    def write_dataframe(self, df, output):
+        with profiling.stage(profiling.SERIALIZATION, rows=len(df)), \
+                _text_output(output) as f:
+            df.to_csv(f, index=False, lineterminator=CSV_LINE_TERMINATOR)
+
+    def write_rows(self, rows, columns, output):
+        with profiling.stage(profiling.SERIALIZATION) as record, \
+                _text_output(output) as f:
+            writer = csv.writer(f, lineterminator=CSV_LINE_TERMINATOR)
+            writer.writerow(columns)
+            record['rows'] = 0
+            for batch in _batches(rows, 1024):
+                writer.writerows(batch)
+                record['rows'] += len(batch)
+
+
+class JSONLinesSink(OutputSink):
+    """JSON Lines: one object per row, keyed by column."""
+
+    name = 'jsonl'
+    extensions = ('.jsonl', '.ndjson')
+    mimetype = 'application/x-ndjson'
+
+    def write_dataframe(self, df, output):
+        with profiling.stage(profiling.SERIALIZATION, rows=len(df)), \
+                _text_output(output) as f:
+            if len(df):
+                df.to_json(f, orient='records', lines=True, force_ascii=False,
+                           date_format='iso')
+
+    def write_rows(self, rows, columns, output):
+        with profiling.stage(profiling.SERIALIZATION) as record, \
+                _text_output(output) as f:
+            record['rows'] = 0
+            for row in rows:
+                f.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False,
+                                   default=str))
+                f.write('\n')
+                record['rows'] += 1
+
+
+class ParquetSink(OutputSink):
+    """Apache Parquet via pyarrow."""
+
+    name = 'parquet'
+    extensions = ('.parquet',)
+    mimetype = 'application/vnd.apache.parquet'
+
+    def write_dataframe(self, df, output):
+        pyarrow, pq = _require_pyarrow()
+        with profiling.stage(profiling.SERIALIZATION, rows=len(df)):
+            table = pyarrow.Table.from_pandas(df, preserve_index=False)
+            pq.write_table(table, _binary_target(output))
+
+    def write_rows(self, rows, columns, output):
+        pyarrow, pq = _require_pyarrow()
+        import pandas as pd
+        with profiling.stage(profiling.SERIALIZATION) as record:
+            record['rows'] = 0
+            writer = None
+            try:
+                for batch in _batches(rows, PARQUET_BATCH_ROWS):
+                    frame = pd.DataFrame(batch, columns=columns)
+                    if writer is None:
+                        table = pyarrow.Table.from_pandas(frame, preserve_index=False)
+                        writer = pq.ParquetWriter(_binary_target(output), table.schema)
+                    else:
+                        # Later batches take the types inferred from the first
+                        table = pyarrow.Table.from_pandas(frame, schema=writer.schema,
+                                                          preserve_index=False)
+                    writer.write_table(table)
+                    record['rows'] += len(batch)
+                if writer is None:
+                    empty = pd.DataFrame(columns=columns)
+                    pq.write_table(pyarrow.Table.from_pandas(empty, preserve_index=False),
+                                   _binary_target(output))
+            finally:
+                if writer is not None:
+                    writer.close()
+
+
+_SINKS: Dict[str, Type[OutputSink]] = {}
+
+
+def register_sink(sink_cls: Type[OutputSink]) -> Type[OutputSink]:
+    """Register a sink class under its name (usable as a decorator)."""
+    _SINKS[sink_cls.name] = sink_cls
+    return sink_cls
+
+
+def available_sinks() -> List[str]:
+    """Names of all registered sinks."""
+    return list(_SINKS)
+
+
+def get_sink(name: Optional[str] = None,
+             writer: Optional['ExcelWriter'] = None) -> OutputSink:
+    """Instantiate a sink by name (None selects xlsx).
+
+    writer configures the xlsx sink and is ignored by the others.
+    """
+    name = name or DEFAULT_SINK
+    try:
+        sink_cls = _SINKS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown output format '{name}'. Available: {', '.join(_SINKS)}"
+        ) from None
+    return sink_cls(writer) if sink_cls is XLSXSink else sink_cls()
+
+
+def sink_for_path(path: Union[str, Path],
+                  writer: Optional['ExcelWriter'] = None) -> OutputSink:
+    """Pick the sink matching an output file's extension."""
+    suffix = Path(path).suffix.lower()
+    for name, sink_cls in _SINKS.items():
+        if suffix in sink_cls.extensions:
+            return get_sink(name, writer)
+    extensions = ', '.join(ext for cls in _SINKS.values() for ext in cls.extensions)
+    raise ValueError(f"Unsupported output extension '{suffix}'. Use one of: {extensions}")
+
+
+register_sink(XLSXSink)
+register_sink(CSVSink)
+register_sink(JSONLinesSink)
+register_sink(ParquetSink)
+
+
+def _require_pyarrow():
+    """Import pyarrow and pyarrow.parquet on first use."""
+    try:
+        import pyarrow
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("pyarrow required for Parquet output: pip install pyarrow") from None
+    return pyarrow, pq
+
+
+def prepare_output(output: Output) -> Union[Path, BinaryIO]:
+    """Create the parent directory of an output path; file objects pass through."""
+    if hasattr(output, 'write'):
+        return output
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    return output
+
+
+def _binary_target(output: Output):
+    target = prepare_output(output)
+    return target if hasattr(target, 'write') else str(target)
+
+
+@contextmanager
+def _text_output(output: Output) -> Iterator[TextIO]:
+    """Open an output path, or wrap a binary file object, for UTF-8 text."""
+    output = prepare_output(output)
+    if not hasattr(output, 'write'):
+        with open(output, 'w', encoding='utf-8', newline='') as f:
+            yield f
+        return
+    f = io.TextIOWrapper(output, encoding='utf-8', newline='')
+    try:
+        yield f
+    finally:
+        # Leave the caller's file object open
+        f.flush()
+        f.detach()
+
+
+def _batches(rows: Iterable[Sequence[Any]], size: int) -> Iterable[List[Sequence[Any]]]:
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
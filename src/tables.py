@@ -0,0 +1,151 @@
+"""Stitching of table fragments into logical tables.
+
+Table detection works page by page, so a results table that runs over
+several pages comes back as several fragments. Tables are therefore
+passed per page (one list of tables for each page, in page order). The
+first table on a page continues the last table of the previous page when:
+
+- its first row is the same header (same cells, same column count),
+  as when the header is repeated at the top of every page, or
+- it has no header row of its own (its first row holds numbers) and the
+  same column count.
+
+Every other table starts a logical table of its own, even when its header
+matches an earlier one (panels of the same layout on one page stay apart).
+
+Rows are collected into plain lists as fragments arrive; each logical
+table becomes a DataFrame once, at the end. ``TableStitcher`` does the
+same incrementally, for callers that stream rows instead of building
+frames, and ``stack_tables`` returns the stacked rows of
+``combine_tables(stitch_tables(...))`` as plain lists; neither needs
+pandas.
+"""
+
+from typing import TYPE_CHECKING, Any, Iterable, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+RawTable = Sequence[Sequence[Optional[str]]]
+
+
+class TableStitcher:
+    """Incremental stitching: call new_page() before each page's fragments."""
+
+    def __init__(self):
+        self.headers: List[List[str]] = []
+        self._keys: List[Tuple[str, ...]] = []
+        # Last logical table of the previous page, until this page's first
+        # fragment has been added; last logical table of this page
+        self._previous: Optional[int] = None
+        self._last: Optional[int] = None
+
+    def new_page(self) -> None:
+        """Start the next page."""
+        self._previous, self._last = self._last, None
+
+    def add(self, table: RawTable) -> Tuple[Optional[int], List[List[Any]]]:
+        """Add the next fragment of the current page.
+
+        Returns:
+            (index of the logical table it belongs to, its data rows); the
+            index is None for an empty fragment
+        """
+        if not table:
+            return None, []
+        first = list(table[0])
+        key = _header_key(first)
+        previous, self._previous = self._previous, None
+        if previous is not None and key == self._keys[previous]:
+            self._last = previous
+            return previous, [list(row) for row in table[1:]]
+        if (previous is not None and len(first) == len(self.headers[previous])
+                and not _looks_like_header(first)):
+            self._last = previous
+            return previous, [list(row) for row in table]
+        self._last = len(self.headers)
+        self._keys.append(key)
+        self.headers.append(_column_names(first))
+        return self._last, [list(row) for row in table[1:]]
+
+
+def stitch_tables(pages: Iterable[Sequence[RawTable]]) -> List['pd.DataFrame']:
+    """Merge raw tables (lists of rows, header first), given per page in page order.
+
+    Returns:
+        One DataFrame per logical table, in order of first appearance
+    """
+    import pandas as pd
+
+    return [pd.DataFrame(body, columns=header) for header, body in _stitch(pages)]
+
+
+def stack_tables(pages: Iterable[Sequence[RawTable]]) -> Tuple[List[str], List[List[Any]]]:
+    """Stitch raw tables and stack the logical tables, without pandas.
+
+    Returns:
+        (columns, rows) as combine_tables(stitch_tables(pages)) holds them:
+        the union of the headers in order of appearance, and None in the
+        cells of columns a row's own table does not have
+    """
+    logical = _stitch(pages)
+    columns = list(dict.fromkeys(name for header, _ in logical for name in header))
+    stacked: List[List[Any]] = []
+    for header, body in logical:
+        if header == columns:
+            stacked.extend(body)
+            continue
+        positions = [header.index(name) if name in header else None for name in columns]
+        stacked.extend([row[p] if p is not None and p < len(row) else None
+                        for p in positions] for row in body)
+    return columns, stacked
+
+
+def combine_tables(frames: Sequence['pd.DataFrame']) -> 'pd.DataFrame':
+    """Stack logical tables into one frame (union of columns, in order)."""
+    import pandas as pd
+
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True, sort=False)
+
+
+def _stitch(pages: Iterable[Sequence[RawTable]]) -> List[Tuple[List[str], List[List[Any]]]]:
+    """(header, data rows) of each logical table, in order of first appearance."""
+    stitcher = TableStitcher()
+    bodies: List[List[List[Any]]] = []
+    for tables in pages:
+        stitcher.new_page()
+        for table in tables:
+            index, rows = stitcher.add(table)
+            if index is None:
+                continue
+            if index == len(bodies):
+                bodies.append([])
+            bodies[index].extend(rows)
+    return list(zip(stitcher.headers, bodies))
+
+
+def _header_key(row: Sequence[Optional[str]]) -> Tuple[str, ...]:
+    """Header cells with whitespace collapsed, so wrapped headers still match."""
+    return tuple(' '.join(str(cell).split()) if cell is not None else '' for cell in row)
+
+
+def _looks_like_header(row: Sequence[Optional[str]]) -> bool:
+    """A header row has text cells and no numbers; result rows have numbers."""
+    cells = [str(cell) for cell in row if cell not in (None, '')]
+    return bool(cells) and not any(ch.isdigit() for cell in cells for ch in cell)
+
+
+def _column_names(row: Sequence[Optional[str]]) -> List[str]:
+    """Unique column names: blanks become 'Column N', repeats get a suffix."""
+    names, seen = [], set()
+    for position, key in enumerate(_header_key(row), start=1):
+        name = key or f"Column {position}"
+        base, suffix = name, 2
+        while name in seen:
+            name = f"{base} ({suffix})"
+            suffix += 1
+        seen.add(name)
+        names.append(name)
+    return names
@@ -0,0 +1,441 @@
+"""Learned page templates for fixed report layouts.
+
+Most reports come in a handful of fixed layouts, yet table detection
+(ruling-line edges, intersections, cells) runs on every page. A template
+records what detection found on sample pages of one layout, so matching
+pages skip it:
+
+- a fingerprint: page size and the positions of the vertical ruling
+  lines, both available as soon as the page is parsed
+- anchors: text lines (digits masked) found at the same position on
+  every sample page, e.g. the letterhead, panel titles and table headers
+- per table, its crop box and column edges
+
+A page uses the template whose fingerprint it shares, whose anchors it
+all contains and whose table boxes hold every ruling line that touches
+them (the one with most anchors when several do). The fingerprint says
+where rulings start, not where they end, so a table with more rows than
+the samples' fails the last check and gets detection. Its tables are
+then read straight off the parsed characters: characters are bucketed
+into the stored columns and into rows between the horizontal rulings
+inside the crop box (text lines when a table has none). Pages that match
+no template, or where a template finds no rows, get generic detection.
+
+Templates are learned with ``python main.py learn-template`` and kept in
+a JSON file; hit rate and detection time saved are in ``stats()``.
+
+Configuration (environment variables):
+    PDF_TEMPLATES           Template file (default: templates.json in the
+                            project root; '' disables templates)
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from bisect import bisect_right
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+TEMPLATES_PATH = os.environ.get(
+    "PDF_TEMPLATES", str(Path(__file__).resolve().parent.parent / "templates.json"))
+
+TEMPLATE_FORMAT = 1
+
+# Gap (points) between characters that starts a new word, and distance
+# between character tops within one text line (pdfplumber's defaults)
+X_TOLERANCE = 3
+Y_TOLERANCE = 3
+# How far an anchor line may move and still match
+ANCHOR_TOLERANCE = 2
+# How far a ruling line may reach past a learned table box
+BBOX_TOLERANCE = 2
+
+RawTable = List[List[Optional[str]]]
+Fingerprint = Tuple[Any, ...]
+
+
+class PageTemplate:
+    """One learned layout."""
+
+    def __init__(self, name: str, page_size: Sequence[float], rulings: Iterable[Sequence[float]],
+                 anchors: Iterable[Sequence[Any]], tables: Iterable[Dict[str, Any]],
+                 detect_seconds: float = 0.0, samples: int = 0):
+        """
+        Initialize a template.
+
+        Args:
+            name: Template name
+            page_size: (width, height) in points
+            rulings: (x, top) of each vertical ruling line, rounded
+            anchors: (text, top) of the text lines every sample page shares
+            tables: {"bbox": [x0, top, x1, bottom], "columns": [x edges]} per table
+            detect_seconds: Mean time generic detection took on a sample page
+            samples: Number of sample pages it was learned from
+        """
+        self.name = name
+        self.page_size = tuple(round(v) for v in page_size)
+        self.rulings = tuple(sorted(tuple(r) for r in rulings))
+        self.anchors = [(text, float(top)) for text, top in anchors]
+        self.tables = [{"bbox": list(t["bbox"]), "columns": sorted(t["columns"])}
+                       for t in tables]
+        self.detect_seconds = detect_seconds
+        self.samples = samples
+
+    @property
+    def fingerprint(self) -> Fingerprint:
+        return self.page_size + self.rulings
+
+    def matches(self, lines: Dict[str, List[float]]) -> bool:
+        """True when every anchor is among the page's text lines, near its position."""
+        return all(any(abs(top - anchor_top) <= ANCHOR_TOLERANCE
+                       for top in lines.get(text, ()))
+                   for text, anchor_top in self.anchors)
+
+    def fits(self, page) -> bool:
+        """True when every ruling line touching a table box lies inside it."""
+        t = BBOX_TOLERANCE
+        for x0, top, x1, bottom in (table["bbox"] for table in self.tables):
+            for e in page.edges:
+                touches = (e["x0"] <= x1 + t and e["x1"] >= x0 - t
+                           and e["top"] <= bottom + t and e["bottom"] >= top - t)
+                if touches and (e["x0"] < x0 - t or e["x1"] > x1 + t
+                                or e["top"] < top - t or e["bottom"] > bottom + t):
+                    return False
+        return True
+
+    def extract_tables(self, page) -> List[RawTable]:
+        """Read the template's tables off a page's characters, header row first."""
+        horizontal = page.horizontal_edges if self.tables else []
+        tables = []
+        for table in self.tables:
+            x0, top, x1, bottom = table["bbox"]
+            chars = [c for c in page.chars
+                     if x0 <= (c["x0"] + c["x1"]) / 2 <= x1
+                     and top <= (c["top"] + c["bottom"]) / 2 <= bottom]
+            rulings = _merge_positions(
+                e["top"] for e in horizontal
+                if top - 1 <= e["top"] <= bottom + 1 and e["x0"] < x1 and e["x1"] > x0)
+            rows = _cells(chars, table["columns"], rulings)
+            if rows:
+                tables.append(rows)
+        return tables
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "page_size": list(self.page_size),
+                "rulings": [list(r) for r in self.rulings],
+                "anchors": [list(a) for a in self.anchors], "tables": self.tables,
+                "detect_seconds": self.detect_seconds, "samples": self.samples}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PageTemplate":
+        return cls(**data)
+
+
+class TemplateRegistry:
+    """Templates indexed by fingerprint, with hit and time-saved counters."""
+
+    def __init__(self, templates: Iterable[PageTemplate] = ()):
+        self._by_fingerprint: Dict[Fingerprint, List[PageTemplate]] = defaultdict(list)
+        self._lock = threading.Lock()
+        self.reset_stats()
+        for template in templates:
+            self.add(template)
+
+    @classmethod
+    def from_file(cls, path: str) -> "TemplateRegistry":
+        """Load templates from a JSON file (an empty registry when it does not exist)."""
+        if not path or not os.path.exists(path):
+            return cls()
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            return cls(PageTemplate.from_dict(t) for t in data.get("templates", []))
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            logger.warning(f"Ignoring template file {path}: {e}")
+            return cls()
+
+    @classmethod
+    def from_env(cls) -> "TemplateRegistry":
+        """Load the templates named by PDF_TEMPLATES."""
+        return cls.from_file(TEMPLATES_PATH)
+
+    @property
+    def templates(self) -> List[PageTemplate]:
+        return [t for group in self._by_fingerprint.values() for t in group]
+
+    def add(self, template: PageTemplate) -> None:
+        """Add a template, replacing one with the same name."""
+        self.remove(template.name)
+        group = self._by_fingerprint[template.fingerprint]
+        group.append(template)
+        # The most specific layout wins when several match
+        group.sort(key=lambda t: -len(t.anchors))
+
+    def remove(self, name: str) -> bool:
+        for fingerprint, group in list(self._by_fingerprint.items()):
+            kept = [t for t in group if t.name != name]
+            if len(kept) != len(group):
+                if kept:
+                    self._by_fingerprint[fingerprint] = kept
+                else:
+                    del self._by_fingerprint[fingerprint]
+                return True
+        return False
+
+    def save(self, path: str) -> None:
+        """Write all templates to a JSON file (atomically)."""
+        data = {"format": TEMPLATE_FORMAT,
+                "templates": [t.to_dict() for t in self.templates]}
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def match(self, page) -> Optional[PageTemplate]:
+        """The template for a parsed pdfplumber page, or None."""
+        candidates = self._by_fingerprint.get(page_fingerprint(page))
+        if not candidates:
+            return None
+        lines = _text_lines(page.chars)
+        return next((t for t in candidates if t.matches(lines) and t.fits(page)), None)
+
+    def extract_tables(self, page) -> List[RawTable]:
+        """Tables of a page: from its template when one matches, else by detection."""
+        if not self._by_fingerprint:
+            return page.extract_tables() or []
+        page.chars  # parsing is needed either way; time only what detection would do
+        start = time.perf_counter()
+        template = self.match(page)
+        if template is not None:
+            tables = template.extract_tables(page)
+            if tables or not template.tables:
+                self._count(template, time.perf_counter() - start)
+                return tables
+        tables = page.extract_tables() or []
+        self._count(None, 0.0)
+        return tables
+
+    def _count(self, template: Optional[PageTemplate], seconds: float) -> None:
+        with self._lock:
+            self._stats["pages"] += 1
+            if template is None:
+                return
+            self._stats["hits"] += 1
+            self._stats["template_seconds"] += seconds
+            self._stats["seconds_saved"] += template.detect_seconds - seconds
+            self._stats["by_template"][template.name] += 1
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats = {"pages": 0, "hits": 0, "template_seconds": 0.0,
+                           "seconds_saved": 0.0, "by_template": defaultdict(int)}
+
+    def counters(self) -> Dict[str, Any]:
+        """Raw counters (picklable, for merging results from worker processes)."""
+        with self._lock:
+            return {**self._stats, "by_template": dict(self._stats["by_template"])}
+
+    def merge(self, counters: Dict[str, Any]) -> None:
+        """Add counters collected in another process."""
+        with self._lock:
+            for key in ("pages", "hits", "template_seconds", "seconds_saved"):
+                self._stats[key] += counters[key]
+            for name, hits in counters["by_template"].items():
+                self._stats["by_template"][name] += hits
+
+    def stats(self) -> Dict[str, Any]:
+        """Template count, pages seen, hit rate and estimated detection time saved."""
+        counters = self.counters()
+        pages = counters["pages"]
+        return {
+            "templates": len(self.templates),
+            "pages": pages,
+            "hits": counters["hits"],
+            "hit_rate": counters["hits"] / pages if pages else 0.0,
+            "seconds_saved": round(counters["seconds_saved"], 3),
+            "by_template": counters["by_template"],
+        }
+
+    def summary(self) -> str:
+        """One-line human-readable form of stats()."""
+        stats = self.stats()
+        return (f"Templates: {stats['hits']}/{stats['pages']} pages matched "
+                f"({stats['hit_rate']:.0%}), ~{stats['seconds_saved']:.2f}s of "
+                f"table detection saved")
+
+
+def page_fingerprint(page) -> Fingerprint:
+    """Page size and the (x, top) of its vertical ruling lines, rounded."""
+    size = (round(page.width), round(page.height))
+    rulings = {(round(e["x0"]), round(e["top"])) for e in page.vertical_edges}
+    return size + tuple(sorted(rulings))
+
+
+def learn_templates(name: str, pdf_paths: Sequence[str]) -> List[Tuple[PageTemplate, float]]:
+    """
+    Learn templates from sample PDFs.
+
+    Sample pages are grouped by fingerprint, one template per layout (the
+    first is called name, further ones name-2, name-3, ...). Every group
+    must have the same tables and columns on all of its pages.
+
+    Returns:
+        (template, share of its sample pages where the template reproduces
+        generic detection exactly) per layout
+    """
+    import pdfplumber
+
+    groups: Dict[Fingerprint, List[Dict[str, Any]]] = {}
+    for pdf_path in pdf_paths:
+        with pdfplumber.open(pdf_path) as pdf:
+            for page in pdf.pages:
+                page.chars  # parse first: only detection is timed
+                start = time.perf_counter()
+                found = page.find_tables()
+                tables = [t.extract() for t in found]
+                seconds = time.perf_counter() - start
+                groups.setdefault(page_fingerprint(page), []).append({
+                    "file": str(pdf_path), "page": page.page_number, "seconds": seconds,
+                    "lines": _text_lines(page.chars), "boxes": [t.bbox for t in found],
+                    "columns": [_column_edges(t) for t in found], "tables": tables,
+                })
+                page.close()
+    if not groups:
+        raise ValueError("No sample pages to learn from")
+
+    learned = []
+    for number, (fingerprint, samples) in enumerate(groups.items(), start=1):
+        label = name if number == 1 else f"{name}-{number}"
+        template = _template_from_samples(label, fingerprint, samples)
+        if len({s["file"] for s in samples}) < 2:
+            logger.warning(f"Template '{label}' was learned from a single report; "
+                           "learn from two or more so patient details are not anchors")
+        learned.append((template, _agreement(template, samples)))
+    return learned
+
+
+def _template_from_samples(name: str, fingerprint: Fingerprint,
+                           samples: List[Dict[str, Any]]) -> PageTemplate:
+    first = samples[0]
+    for sample in samples[1:]:
+        if sample["columns"] != first["columns"]:
+            raise ValueError(
+                f"Page {sample['page']} of {sample['file']} has different tables than page "
+                f"{first['page']} of {first['file']}; learn these layouts separately")
+
+    anchors = []
+    for text, tops in first["lines"].items():
+        for top in tops:
+            if all(any(abs(t - top) <= ANCHOR_TOLERANCE for t in s["lines"].get(text, ()))
+                   for s in samples[1:]):
+                anchors.append((text, round(top, 1)))
+
+    tables = []
+    for index, columns in enumerate(first["columns"]):
+        boxes = [s["boxes"][index] for s in samples]
+        bbox = [min(b[0] for b in boxes), min(b[1] for b in boxes),
+                max(b[2] for b in boxes), max(b[3] for b in boxes)]
+        tables.append({"bbox": [round(v, 1) for v in bbox], "columns": columns})
+
+    size, rulings = fingerprint[:2], fingerprint[2:]
+    detect_seconds = sum(s["seconds"] for s in samples) / len(samples)
+    return PageTemplate(name, size, rulings, sorted(anchors, key=lambda a: a[1]), tables,
+                        detect_seconds=round(detect_seconds, 6), samples=len(samples))
+
+
+def _agreement(template: PageTemplate, samples: List[Dict[str, Any]]) -> float:
+    """Share of sample pages where the template reproduces generic detection."""
+    import pdfplumber
+
+    same = 0
+    for sample in samples:
+        with pdfplumber.open(sample["file"], pages=[sample["page"]]) as pdf:
+            page = pdf.pages[0]
+            if template.matches(_text_lines(page.chars)) and template.fits(page) and \
+                    template.extract_tables(page) == sample["tables"]:
+                same += 1
+    return same / len(samples)
+
+
+def _column_edges(table) -> List[float]:
+    """Distinct x positions of a detected table's cell boundaries."""
+    edges = {round(cell[0], 1) for cell in table.cells} | \
+            {round(cell[2], 1) for cell in table.cells}
+    return sorted(edges)
+
+
+def _merge_positions(positions: Iterable[float], tolerance: float = Y_TOLERANCE) -> List[float]:
+    """Sorted positions with near-duplicates (double rulings) merged."""
+    merged: List[float] = []
+    for position in sorted(positions):
+        if not merged or position - merged[-1] > tolerance:
+            merged.append(position)
+    return merged
+
+
+def _group_lines(chars: Sequence[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Group characters into text lines by top, each line left to right."""
+    lines: List[List[Dict[str, Any]]] = []
+    for char in sorted(chars, key=lambda c: (c["top"], c["x0"])):
+        if lines and char["top"] - lines[-1][0]["top"] <= Y_TOLERANCE:
+            lines[-1].append(char)
+        else:
+            lines.append([char])
+    return [sorted(line, key=lambda c: c["x0"]) for line in lines]
+
+
+def _join(line: Sequence[Dict[str, Any]]) -> str:
+    """Text of one line of characters, with spaces at word gaps."""
+    parts, previous = [], None
+    for char in line:
+        if previous is not None and char["x0"] - previous["x1"] > X_TOLERANCE:
+            parts.append(" ")
+        parts.append(char["text"])
+        previous = char
+    return " ".join("".join(parts).split())
+
+
+def _text_lines(chars: Sequence[Dict[str, Any]]) -> Dict[str, List[float]]:
+    """Text of each line with digits masked -> tops of the lines with that text."""
+    lines: Dict[str, List[float]] = defaultdict(list)
+    for line in _group_lines(chars):
+        text = re.sub(r"\d+", "#", _join(line))
+        if text:
+            lines[text].append(line[0]["top"])
+    return lines
+
+
+def _cells(chars: Sequence[Dict[str, Any]], columns: Sequence[float],
+           rulings: Sequence[float]) -> RawTable:
+    """Bucket a table's characters into rows and columns and join each cell's text."""
+    width = len(columns) - 1
+    if rulings and len(rulings) > 1:
+        # Rows lie between consecutive horizontal rulings
+        row_count = len(rulings) - 1
+        buckets: List[List[List[Dict[str, Any]]]] = [[[] for _ in range(width)]
+                                                     for _ in range(row_count)]
+        for char in chars:
+            row = bisect_right(rulings, (char["top"] + char["bottom"]) / 2) - 1
+            column = bisect_right(columns, (char["x0"] + char["x1"]) / 2) - 1
+            if 0 <= row < row_count and 0 <= column < width:
+                buckets[row][column].append(char)
+    else:
+        # No rulings: each text line is a row
+        buckets = []
+        for line in _group_lines(chars):
+            cells: List[List[Dict[str, Any]]] = [[] for _ in range(width)]
+            for char in line:
+                column = bisect_right(columns, (char["x0"] + char["x1"]) / 2) - 1
+                if 0 <= column < width:
+                    cells[column].append(char)
+            buckets.append(cells)
+    return [["\n".join(_join(line) for line in _group_lines(cell)) for cell in row]
+            for row in buckets]
+
+
+template_registry = TemplateRegistry.from_env()
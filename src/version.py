@@ -0,0 +1,8 @@
+"""Extractor version, kept apart from the extraction code so it is cheap to import.
+
+Cached conversions are keyed on it (see src/cache.py); the web API needs
+it for cache lookups before anything has to be extracted.
+"""
+
+# Bump whenever extraction output changes; cached conversions are keyed on it.
+EXTRACTOR_VERSION = "1.7.0"
@@ -0,0 +1,190 @@
+"""Change detection for watch-folder ingestion.
+
+``DirectoryMonitor`` reports files dropped into a directory once they
+have stopped being written: a file is handed out when its size and mtime
+have not changed for ``settle`` seconds. Changes are picked up with Linux
+inotify (through ctypes, no extra dependency); where inotify is not
+available (other platforms, exhausted watch limits) the directory is
+polled instead. Network shares often deliver no inotify events for writes
+made on other machines, so polling can also be forced.
+
+Only files directly inside the directory are watched, so archive folders
+below it are ignored.
+"""
+
+import ctypes
+import ctypes.util
+import fnmatch
+import os
+import select
+import struct
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from loguru import logger
+
+# inotify event masks (<sys/inotify.h>)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+_WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+_EVENT = struct.Struct('iIII')
+
+
+class _Inotify:
+    """Minimal inotify binding for a single directory."""
+
+    def __init__(self, directory: str):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), _WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f'inotify_add_watch failed for {directory}')
+
+    def read(self, timeout: float) -> Tuple[Set[str], bool]:
+        """Wait up to timeout for events.
+
+        Returns:
+            (names of changed entries, whether the event queue overflowed)
+        """
+        names, overflow = set(), False
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return names, overflow
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return names, overflow
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            _, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+            elif name:
+                names.add(os.fsdecode(name))
+        return names, overflow
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class DirectoryMonitor:
+    """Report files in a directory once they have finished being written."""
+
+    def __init__(self, directory: str, pattern: str = '*.pdf', settle: float = 2.0,
+                 poll_interval: float = 1.0, use_inotify: bool = True):
+        """
+        Initialize the monitor (files already present are reported too).
+
+        Args:
+            directory: Directory to watch (not recursive)
+            pattern: Glob pattern of file names to pick up
+            settle: Seconds a file's size and mtime must stay unchanged
+            poll_interval: Seconds between directory scans when polling
+            use_inotify: Use inotify when available; False forces polling
+        """
+        self.directory = Path(directory)
+        self.pattern = pattern
+        self.settle = settle
+        self.poll_interval = poll_interval
+        # path -> (size, mtime_ns, time the file was last seen changing)
+        self._pending: Dict[Path, Tuple[int, int, float]] = {}
+        self._claimed: Set[Path] = set()
+        self._last_scan = 0.0
+        self._inotify: Optional[_Inotify] = None
+        if use_inotify:
+            try:
+                self._inotify = _Inotify(str(self.directory))
+            except (OSError, AttributeError) as e:
+                logger.warning(f"inotify unavailable ({e}); polling {directory}")
+        self._scan()
+
+    @property
+    def mode(self) -> str:
+        return 'inotify' if self._inotify else 'polling'
+
+    @property
+    def settling(self) -> int:
+        """Number of files seen but still being written (or not settled yet)."""
+        return len(self._pending)
+
+    def poll(self, timeout: float = 0.5) -> List[Path]:
+        """Wait up to timeout for changes; return files that have settled.
+
+        Returned files are not reported again until ``release`` is called
+        (normally after the caller has moved them out of the directory).
+        """
+        if self._inotify:
+            names, overflow = self._inotify.read(timeout)
+            if overflow:
+                logger.warning(f"inotify queue overflowed; rescanning {self.directory}")
+                self._scan()
+            for name in names:
+                self._observe(self.directory / name)
+        else:
+            time.sleep(timeout)
+            if time.monotonic() - self._last_scan >= self.poll_interval:
+                self._scan()
+
+        now = time.monotonic()
+        ready = []
+        for path in list(self._pending):
+            self._observe(path, now)
+            entry = self._pending.get(path)
+            if entry and entry[0] > 0 and now - entry[2] >= self.settle:
+                del self._pending[path]
+                self._claimed.add(path)
+                ready.append(path)
+        return sorted(ready)
+
+    def release(self, path: Path) -> None:
+        """Allow a handed-out path to be reported again if it reappears."""
+        self._claimed.discard(path)
+
+    def close(self) -> None:
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None
+
+    def __enter__(self) -> 'DirectoryMonitor':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _scan(self) -> None:
+        """Look at every matching file in the directory."""
+        self._last_scan = time.monotonic()
+        try:
+            entries = list(os.scandir(self.directory))
+        except OSError as e:
+            logger.error(f"Cannot scan {self.directory}: {e}")
+            return
+        for entry in entries:
+            self._observe(Path(entry.path))
+
+    def _observe(self, path: Path, now: Optional[float] = None) -> None:
+        """Record a file's current size and mtime, restarting its settle timer on change."""
+        if path in self._claimed or not fnmatch.fnmatch(path.name, self.pattern):
+            return
+        try:
+            st = path.stat()
+        except OSError:
+            self._pending.pop(path, None)
+            return
+        if not path.is_file():
+            return
+        now = time.monotonic() if now is None else now
+        previous = self._pending.get(path)
+        if previous is None or previous[:2] != (st.st_size, st.st_mtime_ns):
+            self._pending[path] = (st.st_size, st.st_mtime_ns, now)
@@ -0,0 +1,237 @@
+"""XLSX workbooks produced as a stream of byte chunks.
+
+``iter_xlsx`` turns an iterable of rows into the bytes of an XLSX file,
+yielded in chunks of about PDF_STREAM_CHUNK_KB while the rows are still
+being consumed. The worksheet XML is deflated straight into the zip
+container, which is written without seeking (entries carry data
+descriptors), so nothing but the current chunk is held in memory: peak
+memory grows with the chunk size, not with the workbook.
+
+The styling matches ``ExcelWriter.write_rows`` (header and cell styles,
+columns sized from the first rows, spill onto 'Data (2)', ... past the
+row limit) and, like it, cells are written as they are: strings stay
+strings, and missing values (None, NaN) are empty cells. Neither pandas
+nor openpyxl is needed.
+
+Configuration (environment variables):
+    PDF_STREAM_CHUNK_KB     Size of the chunks yielded (default: 64)
+"""
+
+import math
+import os
+import re
+import zipfile
+from itertools import chain, islice
+from typing import Any, Iterable, Iterator, List, Sequence
+from xml.sax.saxutils import escape, quoteattr
+
+CHUNK_SIZE = int(os.environ.get("PDF_STREAM_CHUNK_KB", "64")) * 1024
+
+# Same limits as excel_writer (which imports pandas and openpyxl)
+MAX_SHEET_ROWS = 1_048_576
+WIDTH_SAMPLE_ROWS = 1000
+MAX_COLUMN_WIDTH = 50
+
+MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# XML 1.0 rejects these control characters
+_ILLEGAL_XML = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+# Style indexes in _STYLES: 0 default, 1 header, 2 data cell
+_HEADER, _CELL = 1, 2
+
+_XML = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+_MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_PKG_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+_ROOT_RELS = (
+    _XML + f'<Relationships xmlns="{_PKG_REL_NS}">'
+    f'<Relationship Id="rId1" Type="{_REL_NS}/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_STYLES = (
+    _XML + f'<styleSheet xmlns="{_MAIN_NS}">'
+    '<fonts count="2">'
+    '<font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><color rgb="FFFFFFFF"/><name val="Calibri"/></font>'
+    '</fonts>'
+    '<fills count="3">'
+    '<fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill>'
+    '<fill><patternFill patternType="solid"><fgColor rgb="FF366092"/>'
+    '<bgColor rgb="FF366092"/></patternFill></fill>'
+    '</fills>'
+    '<borders count="2">'
+    '<border><left/><right/><top/><bottom/><diagonal/></border>'
+    '<border><left style="thin"/><right style="thin"/><top style="thin"/>'
+    '<bottom style="thin"/><diagonal/></border>'
+    '</borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="2" borderId="1" xfId="0" applyFont="1" '
+    'applyFill="1" applyBorder="1" applyAlignment="1">'
+    '<alignment horizontal="center" vertical="center" wrapText="1"/></xf>'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="1" xfId="0" applyBorder="1" '
+    'applyAlignment="1"><alignment horizontal="left" vertical="center" wrapText="1"/></xf>'
+    '</cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+
+class _ChunkBuffer:
+    """Write-only, unseekable file object collecting what the zip writes."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.size = 0
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        self.size = 0
+        return data
+
+
+def iter_xlsx(rows: Iterable[Sequence[Any]], columns: List[str],
+              sheet_name: str = 'Data', chunk_size: int = CHUNK_SIZE,
+              max_rows: int = MAX_SHEET_ROWS) -> Iterator[bytes]:
+    """Yield the bytes of a styled XLSX workbook holding columns and rows.
+
+    The first chunk (the package parts that do not depend on the rows) is
+    yielded before any row is read. Rows are consumed lazily, so rows can
+    be a generator over a very large extraction.
+
+    Args:
+        rows: Iterable of row value sequences
+        columns: Column headers
+        sheet_name: Name of the first sheet; spilled sheets get ' (2)', ...
+        chunk_size: Approximate size of the chunks yielded
+        max_rows: Rows per sheet, header included
+    """
+    buffer = _ChunkBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('_rels/.rels', _ROOT_RELS)
+        archive.writestr('xl/styles.xml', _STYLES)
+        yield buffer.drain()
+
+        rows = iter(rows)
+        sample = list(islice(rows, WIDTH_SAMPLE_ROWS))
+        cols = _cols_xml(columns, sample)
+        rows = chain(sample, rows)
+
+        titles: List[str] = []
+        while True:
+            sheet_rows = islice(rows, max_rows - 1)
+            first = next(sheet_rows, None)
+            if first is None and titles:
+                break
+            n = len(titles) + 1
+            titles.append(sheet_name if n == 1 else f"{sheet_name} ({n})")
+            sheet_rows = () if first is None else chain([first], sheet_rows)
+            with archive.open(f'xl/worksheets/sheet{n}.xml', 'w') as f:
+                yield from _write_sheet(f, buffer, columns, sheet_rows, cols, chunk_size)
+
+        archive.writestr('xl/workbook.xml', _workbook_xml(titles))
+        archive.writestr('xl/_rels/workbook.xml.rels', _workbook_rels(len(titles)))
+        archive.writestr('[Content_Types].xml', _content_types(len(titles)))
+    yield buffer.drain()
+
+
+def write_xlsx(rows: Iterable[Sequence[Any]], columns: List[str], output,
+               sheet_name: str = 'Data', chunk_size: int = CHUNK_SIZE) -> None:
+    """Write a streamed workbook (see iter_xlsx) to a binary file object."""
+    for chunk in iter_xlsx(rows, columns, sheet_name, chunk_size):
+        output.write(chunk)
+
+
+def _write_sheet(f, buffer: _ChunkBuffer, columns: List[str],
+                 rows: Iterable[Sequence[Any]], cols: str,
+                 chunk_size: int) -> Iterator[bytes]:
+    """Write one worksheet part, yielding the buffer each time it fills up."""
+    parts = [_XML, f'<worksheet xmlns="{_MAIN_NS}">', cols, '<sheetData>',
+             _row_xml(1, columns, _HEADER)]
+    pending = sum(len(part) for part in parts)
+    for number, row in enumerate(rows, 2):
+        xml = _row_xml(number, row, _CELL)
+        parts.append(xml)
+        pending += len(xml)
+        # Feed the compressor in batches; it emits output as its window fills
+        if pending >= chunk_size:
+            f.write(''.join(parts).encode('utf-8'))
+            parts.clear()
+            pending = 0
+            if buffer.size >= chunk_size:
+                yield buffer.drain()
+    parts.append('</sheetData></worksheet>')
+    f.write(''.join(parts).encode('utf-8'))
+
+
+def _row_xml(number: int, values: Sequence[Any], style: int) -> str:
+    cells = []
+    for value in values:
+        if value is None or value == '' or (isinstance(value, float)
+                                            and not math.isfinite(value)):
+            # NaN and infinities have no valid <v> form; written empty, as gaps
+            cells.append(f'<c s="{style}"/>')
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            cells.append(f'<c s="{style}"><v>{value!r}</v></c>')
+        else:
+            text = escape(_ILLEGAL_XML.sub('', str(value)))
+            space = ' xml:space="preserve"' if text[:1].isspace() or text[-1:].isspace() else ''
+            cells.append(f'<c s="{style}" t="inlineStr"><is><t{space}>{text}</t></is></c>')
+    return f'<row r="{number}">{"".join(cells)}</row>'
+
+
+def _cols_xml(columns: List[str], sample: List[Sequence[Any]]) -> str:
+    """Column widths from the header and sample rows (as normalize.column_widths)."""
+    widths = []
+    for position, column in enumerate(columns):
+        longest = max([len(str(column))] + [len(str(row[position])) for row in sample
+                                            if position < len(row) and row[position] is not None])
+        widths.append(min(longest + 2, MAX_COLUMN_WIDTH))
+    if not widths:
+        return ''
+    return '<cols>' + ''.join(f'<col min="{i}" max="{i}" width="{width}" customWidth="1"/>'
+                              for i, width in enumerate(widths, 1)) + '</cols>'
+
+
+def _workbook_xml(titles: List[str]) -> str:
+    sheets = ''.join(f'<sheet name={quoteattr(title)} sheetId="{i}" r:id="rId{i}"/>'
+                     for i, title in enumerate(titles, 1))
+    return (_XML + f'<workbook xmlns="{_MAIN_NS}" xmlns:r="{_REL_NS}">'
+            f'<sheets>{sheets}</sheets></workbook>')
+
+
+def _workbook_rels(sheets: int) -> str:
+    relations = ''.join(f'<Relationship Id="rId{i}" Type="{_REL_NS}/worksheet" '
+                        f'Target="worksheets/sheet{i}.xml"/>' for i in range(1, sheets + 1))
+    return (_XML + f'<Relationships xmlns="{_PKG_REL_NS}">{relations}'
+            f'<Relationship Id="rId{sheets + 1}" Type="{_REL_NS}/styles" '
+            'Target="styles.xml"/></Relationships>')
+
+
+def _content_types(sheets: int) -> str:
+    sheet_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml'
+    overrides = ''.join(f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+                        f'ContentType="{sheet_type}"/>' for i in range(1, sheets + 1))
+    return (_XML + '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" '
+            'ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" ContentType="application/'
+            'vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/styles.xml" ContentType="application/'
+            'vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            f'{overrides}</Types>')
@@ -0,0 +1,31 @@
+"""Shared fixtures: the repository root on sys.path and small generated reports."""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Read when the modules are imported. Synthetic reports have a text layer,
+# so OCR would only slow the checks down; with the cache off every request
+# really converts.
+os.environ.setdefault('PDF_OCR', 'off')
+os.environ.setdefault('PDF_CACHE_DISABLED', '1')
+
+
+@pytest.fixture(scope='session')
+def report_pdf():
+    """Build a synthetic lab report (see benchmarks/corpus.py) as PDF bytes."""
+    from benchmarks.corpus import build_pdf
+
+    cache = {}
+
+    def build(kind: str = 'single_table', pages: int = 3, seed: int = 0) -> bytes:
+        key = (kind, pages, seed)
+        if key not in cache:
+            cache[key] = build_pdf(kind, pages, seed)
+        return cache[key]
+
+    return build
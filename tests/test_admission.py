@@ -0,0 +1,128 @@
+"""Admission control: client addresses, rate limits and capacity."""
+
+import io
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src import admission as admission_module
+from src.admission import (QUEUE_FULL, WAIT_TIMEOUT, AdmissionController, RateLimited,
+                           Rejected, TokenBucket, client_address, estimate_pages,
+                           upload_cost)
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A fake monotonic clock for src.admission, advanced by hand."""
+    now = [1000.0]
+    monkeypatch.setattr(admission_module, 'time', SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_token_bucket_refills_at_its_rate(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+    assert [bucket.take() for _ in range(3)] == [0, 0, 0]
+    assert bucket.take() == pytest.approx(0.5)
+
+    clock[0] += 0.5
+    assert bucket.take() == 0
+    # Idle time refills no more than the burst
+    clock[0] += 60
+    assert [bucket.take() for _ in range(3)] == [0, 0, 0]
+    assert bucket.take() == pytest.approx(0.5)
+
+
+def test_throttle_is_per_client(clock):
+    controller = AdmissionController(client_rate=1, client_burst=1)
+    controller.throttle('a')
+    controller.throttle('b')
+    with pytest.raises(RateLimited) as refused:
+        controller.throttle('a')
+    assert (refused.value.status, refused.value.retry_after) == (429, 1)
+
+    clock[0] += 1
+    controller.throttle('a')
+    assert controller.stats()['rate_limited'] == 1
+
+
+def test_requests_wait_in_line_for_capacity():
+    controller = AdmissionController(capacity=10, max_queue=2, max_wait=5, client_rate=0)
+    order = []
+
+    def convert(name, cost):
+        with controller.admit(cost):
+            order.append(name)
+
+    with controller.admit(8):
+        waiters = [threading.Thread(target=convert, args=('big', 5)),
+                   threading.Thread(target=convert, args=('small', 1))]
+        for queued, waiter in enumerate(waiters, 1):
+            waiter.start()
+            wait_until(lambda: controller.stats()['waiting'] == queued)
+        # The small request would fit now, but the big one is ahead of it
+        with pytest.raises(Rejected) as refused:
+            controller.check('client')
+        assert refused.value.reason == QUEUE_FULL
+    for waiter in waiters:
+        waiter.join()
+
+    assert order == ['big', 'small']
+    stats = controller.stats()
+    assert (stats['admitted'], stats['completed'], stats['in_use'], stats[QUEUE_FULL]) == (3, 3, 0, 1)
+
+
+def test_request_that_waits_too_long_is_refused():
+    controller = AdmissionController(capacity=2, max_wait=0.05, client_rate=0)
+    with controller.admit(2):
+        with pytest.raises(Rejected) as refused:
+            with controller.admit(1):
+                pass
+    assert refused.value.reason == WAIT_TIMEOUT and refused.value.retry_after >= 1
+    assert controller.stats()['waiting'] == 0
+
+
+def test_oversized_request_runs_alone():
+    controller = AdmissionController(capacity=5, client_rate=0)
+    with controller.admit(500):
+        assert controller.stats()['in_use'] == 5
+
+
+def test_upload_cost_counts_pages_and_megabytes(report_pdf):
+    pdf = report_pdf('text', 3)
+    assert estimate_pages(io.BytesIO(pdf)) == 3
+    assert upload_cost(pdf) == 1 + 3
+    assert upload_cost(b'x' * (2 * 1024 * 1024), pages=4) == 1 + 4 + 2
+
+
+
+@pytest.mark.parametrize('forwarded, trusted, expected', [
+    ([], 0, '10.0.0.9'),
+    (['1.1.1.1'], 0, '10.0.0.9'),
+    (['6.6.6.6, 203.0.113.7'], 1, '203.0.113.7'),
+    (['6.6.6.6', '203.0.113.7, 10.0.0.2'], 2, '203.0.113.7'),
+    (['203.0.113.7'], 2, '10.0.0.9'),
+])
+def test_client_address_trusts_only_proxy_hops(forwarded, trusted, expected):
+    assert client_address('10.0.0.9', forwarded, trusted) == expected
+
+
+def test_forged_forwarded_for_does_not_escape_the_rate_limit(monkeypatch):
+    pytest.importorskip('flask')
+    from api.index import app
+
+    monkeypatch.setattr('api.index.admission',
+                        AdmissionController(capacity=0, client_rate=0.001, client_burst=2))
+    client = app.test_client()
+    statuses = [client.post('/api/convert', headers={'X-Forwarded-For': f'192.0.2.{i}'}).status_code
+                for i in range(4)]
+    # The first two are let through (and refused for having no file)
+    assert statuses == [400, 400, 429, 429]
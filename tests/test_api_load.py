@@ -0,0 +1,88 @@
+"""Concurrent conversions through the HTTP entry points stay correct.
+
+Each entry point gets REQUESTS uploads of several distinct reports at
+once. Every response must be the output of converting that report on its
+own, or a request shed by admission control (429/503 with Retry-After);
+a request answered with another request's input fails the check.
+benchmarks/load_test.py runs the same check at scale and reports latency.
+"""
+
+import io
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('pdfplumber')
+
+from benchmarks.corpus import KINDS  # noqa: E402
+from benchmarks.load_test import (SHED, expected_outputs, multipart_body,  # noqa: E402
+                                  post, same_output, start_server)
+
+REPORTS = 4
+REQUESTS = 16
+CONCURRENCY = 8
+# Concurrent requests may take this many times as long as converting the
+# same reports one after another in-process
+MAX_SLOWDOWN = 3.0
+
+
+def send_flask(app):
+    client = app.test_client()
+
+    def send(pdf: bytes, output: str):
+        response = client.post('/api/convert', content_type='multipart/form-data', data={
+            'file': (io.BytesIO(pdf), 'report.pdf'),
+            'output': output,
+        })
+        return response.status_code, response.get_data(), response.headers.get('Retry-After')
+    return send
+
+
+@pytest.fixture(params=['index', 'app', 'convert'])
+def send(request):
+    """Send one upload to an entry point; return (status, body, Retry-After)."""
+    if request.param == 'index':
+        from api.index import app
+        yield send_flask(app)
+    elif request.param == 'app':
+        from src.api import app
+        yield send_flask(app)
+    else:
+        server = start_server('convert')
+        port = server.server_address[1]
+
+        def send_http(pdf: bytes, output: str):
+            # post() reports a shed response without Retry-After as status 0
+            status, body, _ = post(port, multipart_body(pdf, output))
+            return status, body, 'post' if status in SHED else None
+        yield send_http
+        server.shutdown()
+
+
+@pytest.mark.parametrize('output', ['csv', 'xlsx'])
+def test_concurrent_conversions(send, output, report_pdf):
+    reports = [report_pdf(KINDS[i % len(KINDS)], 2, seed=i) for i in range(REPORTS)]
+    started = time.perf_counter()
+    expected = expected_outputs(reports, output)
+    sequential = time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        results = list(pool.map(lambda i: (i % REPORTS, send(reports[i % REPORTS], output)),
+                                range(REQUESTS)))
+    elapsed = time.perf_counter() - started
+
+    converted = 0
+    for index, (status, body, retry_after) in results:
+        if status in SHED:
+            assert retry_after, "shed response without Retry-After"
+            assert 'error' in json.loads(body)
+            continue
+        assert status == 200, body[:200]
+        assert same_output(body, expected[index], output), f"report {index} mismatched"
+        converted += 1
+    assert converted > 0
+    assert elapsed < MAX_SLOWDOWN * sequential * converted / REPORTS + 1.0
@@ -0,0 +1,40 @@
+"""The stage benchmarks profile the real conversion paths."""
+
+import pytest
+
+pytest.importorskip('pdfplumber')
+pytest.importorskip('openpyxl')
+
+from benchmarks.run import compare, stage_changes  # noqa: E402
+from benchmarks.stages import PATHS, best_of  # noqa: E402
+
+CONVERSION_STAGES = ['extraction', 'parsing', 'dataframe', 'normalization', 'serialization']
+
+
+@pytest.mark.parametrize('path', sorted(PATHS))
+def test_paths_report_the_instrumented_stages(path, report_pdf, tmp_path):
+    pdf = tmp_path / 'report.pdf'
+    pdf.write_bytes(report_pdf('single_table', 2))
+
+    summary = best_of(PATHS[path], str(pdf), 2)
+
+    assert [stage for stage in summary if stage in CONVERSION_STAGES] == CONVERSION_STAGES
+    assert summary['extraction']['pages'] == 2
+    top_level = sum(entry['wall'] for stage, entry in summary.items()
+                    if stage != 'total' and not entry['nested'])
+    assert top_level <= summary['total']['wall']
+
+
+def results(**stages):
+    return {'cases': {'text_1p': {'paths': {'api': {
+        stage: {'wall': wall, 'nested': False} for stage, wall in stages.items()}}}}}
+
+
+def test_baseline_comparison_uses_the_stage_records():
+    baseline = results(extraction=0.1, normalization=0.02, serialization=0.001)
+    current = results(extraction=0.11, normalization=0.05, ocr=0.5, serialization=0.01)
+
+    regressions = compare(current, baseline, threshold=0.25, min_seconds=0.005)
+
+    assert [(r['stage'], round(r['ratio'], 2)) for r in regressions] == [('normalization', 2.5)]
+    assert stage_changes(current, baseline) == ['text_1p api ocr (added)']
@@ -0,0 +1,43 @@
+"""Bulk conversions share one process pool and read uploads like /api/convert."""
+
+import io
+
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('pdfplumber')
+openpyxl = pytest.importorskip('openpyxl')
+
+from src import bulk  # noqa: E402
+
+
+def test_bulk_conversions_share_one_pool(report_pdf):
+    reports = [io.BytesIO(report_pdf('single_table', 1, seed=i)) for i in range(2)]
+
+    first = bulk.extract_reports(reports, workers=2)
+    pool = bulk._bulk_pool
+    second = bulk.extract_reports(reports, workers=2)
+
+    assert pool is not None and bulk._bulk_pool is pool
+    assert [error for _, error in first + second] == [None] * 4
+    assert [len(df) for df, _ in first] == [len(df) for df, _ in second] == [38, 38]
+
+
+def test_bulk_route_converts_uploads_without_saving_them(report_pdf, monkeypatch):
+    from api.index import app
+
+    saved = []
+    monkeypatch.setattr('werkzeug.datastructures.FileStorage.save',
+                        lambda self, *args: saved.append(self.filename))
+    response = app.test_client().post('/api/convert/bulk', content_type='multipart/form-data',
+                                      data={'files': [
+                                          (io.BytesIO(report_pdf('text', 1)), 'a.pdf'),
+                                          (io.BytesIO(report_pdf('single_table', 1)), 'b.pdf'),
+                                      ]})
+
+    assert response.status_code == 200, response.get_data()[:200]
+    assert saved == []
+    workbook = openpyxl.load_workbook(io.BytesIO(response.get_data()), read_only=True)
+    assert workbook.sheetnames == ['Summary', 'a', 'b']
+    summary = list(workbook['Summary'].values)
+    assert [row[2] for row in summary[1:]] == ['ok', 'ok']
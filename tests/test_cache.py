@@ -0,0 +1,148 @@
+"""The two-tier conversion cache."""
+
+import io
+import os
+import threading
+import time
+
+import pytest
+
+from src.cache import ConversionCache, cache_key
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = ConversionCache(memory_bytes=10)
+    cache.put('a', b'aaaa')
+    cache.put('b', b'bbbb')
+    cache.get('a')
+    cache.put('c', b'cccc')
+
+    assert (cache.get('a'), cache.get('b'), cache.get('c')) == (b'aaaa', None, b'cccc')
+    stats = cache.stats()
+    assert (stats['memory_evictions'], stats['memory_bytes']) == (1, 8)
+
+
+def test_disk_hits_are_promoted_into_memory(tmp_path):
+    ConversionCache(memory_bytes=0, disk_dir=str(tmp_path)).put('ab12', b'value')
+    cache = ConversionCache(memory_bytes=1024, disk_dir=str(tmp_path))
+
+    assert cache.get('ab12') == cache.get('ab12') == b'value'
+    stats = cache.stats()
+    assert (stats['disk_hits'], stats['memory_hits'], stats['misses']) == (1, 1, 0)
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    cache = ConversionCache(memory_bytes=0, disk_dir=str(tmp_path), disk_bytes=25)
+    for age, key in enumerate(['k1', 'k2']):
+        cache.put(key, b'x' * 10)
+        os.utime(cache._disk_path(key), (1000 + age, 1000 + age))
+    cache.get('k1')  # now the most recently used
+    cache.put('k3', b'x' * 10)
+
+    # Over budget: evicted down to 90% of it, oldest first
+    assert [cache.contains(key) for key in ('k1', 'k2', 'k3')] == [True, False, True]
+    assert cache.stats()['disk_evictions'] == 1
+    assert cache.stats()['disk_bytes'] == 20
+
+
+def test_concurrent_calls_for_a_key_compute_once():
+    cache = ConversionCache(memory_bytes=1024)
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return b'converted'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute('k', compute)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: cache.stats()['coalesced'] == 3)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert results == [b'converted'] * 4
+    assert cache.get_or_compute('k', compute) == b'converted' and calls == [1]
+    assert cache.stats()['inflight'] == 0
+
+
+def test_waiters_see_the_computation_fail():
+    cache = ConversionCache(memory_bytes=1024)
+    started, release = threading.Event(), threading.Event()
+    errors = []
+
+    def compute():
+        started.set()
+        release.wait(5)
+        raise ValueError('broken PDF')
+
+    def call():
+        try:
+            cache.get_or_compute('k', compute)
+        except ValueError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(5)
+    waiter = threading.Thread(target=call)
+    waiter.start()
+    wait_for(lambda: cache.stats()['coalesced'] == 1)
+    release.set()
+    leader.join()
+    waiter.join()
+
+    assert len(errors) == 2 and errors[0] is errors[1]
+    assert not cache.contains('k')
+
+
+def test_cache_key_is_the_same_for_bytes_and_files():
+    data = b'%PDF-1.4 report'
+    stream = io.BytesIO(data)
+    key = cache_key(data, '1.0', format='auto', output='csv')
+
+    assert cache_key(stream, '1.0', output='csv', format='auto') == key
+    assert stream.tell() == 0
+    assert cache_key(data, '1.1', format='auto', output='csv') != key
+    assert cache_key(data, '1.0', format='auto', output='xlsx') != key
+
+
+def test_contains_leaves_the_counters_alone(tmp_path):
+    cache = ConversionCache(memory_bytes=1024, disk_dir=str(tmp_path))
+    cache.put('a', b'value')
+
+    assert cache.contains('a') and not cache.contains('b')
+    stats = cache.stats()
+    assert stats['memory_hits'] == stats['disk_hits'] == stats['misses'] == 0
+
+
+def test_streamed_request_for_a_cached_report_counts_one_hit(monkeypatch, report_pdf):
+    pytest.importorskip('flask')
+    from api.index import app
+    from src.version import EXTRACTOR_VERSION
+
+    pdf = report_pdf('text', 1)
+    cache = ConversionCache(memory_bytes=1024 * 1024)
+    cache.put(cache_key(pdf, EXTRACTOR_VERSION, format='auto', backend='pdfplumber',
+                        output='xlsx'), b'cached workbook')
+    monkeypatch.setattr('api.index.conversion_cache', cache)
+
+    response = app.test_client().post('/api/convert', content_type='multipart/form-data',
+                                      data={'file': (io.BytesIO(pdf), 'report.pdf'),
+                                            'stream': '1'})
+
+    assert response.get_data() == b'cached workbook'
+    stats = cache.stats()
+    assert (stats['memory_hits'], stats['disk_hits'], stats['misses']) == (1, 0, 0)
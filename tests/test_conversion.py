@@ -0,0 +1,59 @@
+"""CSV and JSON Lines conversions hold the rows an XLSX conversion holds."""
+
+import csv
+import io
+import json
+
+import pytest
+
+pytest.importorskip('pdfplumber')
+openpyxl = pytest.importorskip('openpyxl')
+
+from benchmarks.corpus import build_prose_pdf  # noqa: E402
+from src.conversion import convert_upload  # noqa: E402
+
+PROSE = ['Dear Doctor,', 'Please find the sample report attached.',
+         'The laboratory will be closed on Sunday.']
+
+
+def xlsx_rows(data: bytes):
+    sheet = openpyxl.load_workbook(io.BytesIO(data), read_only=True).worksheets[0]
+    return [['' if cell is None else cell for cell in row] for row in sheet.values]
+
+
+def same_cell(text: str, value) -> bool:
+    """A CSV cell (as extracted) holds what the typed XLSX cell holds."""
+    if isinstance(value, (int, float)):
+        return float(text.replace(',', '')) == value
+    return text == str(value)
+
+
+@pytest.fixture(params=['text', 'single_table', 'multi_table', 'prose'])
+def pdf(request, report_pdf):
+    if request.param == 'prose':
+        return build_prose_pdf(PROSE)
+    return report_pdf(request.param, 3)
+
+
+def test_csv_has_the_xlsx_rows(pdf):
+    expected = xlsx_rows(convert_upload(pdf, output='xlsx'))
+    rows = list(csv.reader(io.StringIO(convert_upload(pdf, output='csv').decode('utf-8'))))
+
+    assert len(rows) == len(expected) > 1
+    assert rows[0] == expected[0]
+    for row, expected_row in zip(rows[1:], expected[1:]):
+        assert all(same_cell(text, value) for text, value in zip(row, expected_row)), row
+
+
+def test_jsonl_has_the_xlsx_rows(pdf):
+    expected = xlsx_rows(convert_upload(pdf, output='xlsx'))
+    lines = convert_upload(pdf, output='jsonl').decode('utf-8').splitlines()
+
+    assert [list(json.loads(line)) for line in lines[:1]] == [expected[0]]
+    assert len(lines) == len(expected) - 1
+
+
+def test_prose_is_kept_line_by_line():
+    rows = list(csv.reader(io.StringIO(
+        convert_upload(build_prose_pdf(PROSE), output='csv').decode('utf-8'))))
+    assert [row[0] for row in rows[1:]] == PROSE
@@ -0,0 +1,41 @@
+"""Workbooks from ExcelWriter spill long frames onto extra sheets."""
+
+import pytest
+
+pd = pytest.importorskip('pandas')
+openpyxl = pytest.importorskip('openpyxl')
+
+from src.excel_writer import ExcelWriter  # noqa: E402
+
+
+def frame(rows: int, start: int = 0) -> 'pd.DataFrame':
+    return pd.DataFrame({'Test': [f'Test {i}' for i in range(start, start + rows)],
+                         'Value': list(range(start, start + rows))})
+
+
+def sheet_rows(path):
+    workbook = openpyxl.load_workbook(path)
+    return {title: list(workbook[title].values) for title in workbook.sheetnames}
+
+
+@pytest.mark.parametrize('write_only', [False, True])
+def test_multiple_sheets_spill_past_the_row_limit(tmp_path, write_only):
+    output = tmp_path / 'bulk.xlsx'
+    # 'CBC (2)' is taken by the second frame, so the spill skips past it
+    ExcelWriter(write_only=write_only, max_rows=4).write_multiple_sheets(
+        {'CBC': frame(7), 'CBC (2)': frame(2, 100), 'Lipid': frame(1, 200)}, output)
+
+    sheets = sheet_rows(output)
+    assert list(sheets) == ['CBC', 'CBC (3)', 'CBC (4)', 'CBC (2)', 'Lipid']
+    assert all(rows[0] == ('Test', 'Value') for rows in sheets.values())
+    spilled = [row for title in ('CBC', 'CBC (3)', 'CBC (4)') for row in sheets[title][1:]]
+    assert spilled == [(f'Test {i}', i) for i in range(7)]
+    assert sheets['CBC (2)'][1:] == [('Test 100', 100), ('Test 101', 101)]
+
+
+def test_multiple_sheets_below_the_limit_keep_their_titles(tmp_path):
+    output = tmp_path / 'bulk.xlsx'
+    ExcelWriter(max_rows=4).write_multiple_sheets(
+        {'a/b': frame(3), 'A_B': frame(1)}, output)
+
+    assert list(sheet_rows(output)) == ['a_b', 'A_B (2)']
@@ -0,0 +1,64 @@
+"""Result lines and report headers parsed from the text layer."""
+
+import pytest
+
+from src.lab_parser import RESULT_COLUMNS, lab_result_rows, parse_report_header
+
+REPORT = """\
+Patient Name: Ravi Kumar Age: 45
+Patient ID: P-1001
+Report Date: 05/03/2024
+Haemoglobin 17.7 g/dL H 13.0 - 17.0
+Total Cholesterol: 180 mg/dL < 200
+HBsAg Non Reactive
+Page 1
+Platelet Count 2,50,000 /cumm 150000 - 450000
+"""
+
+RESULTS = [
+    ('Haemoglobin', '17.7', 'g/dL', 'H', '13.0 - 17.0'),
+    ('Total Cholesterol', '180', 'mg/dL', '', '< 200'),
+    ('HBsAg', 'Non Reactive', '', '', ''),
+    ('Platelet Count', '2,50,000', '/cumm', '', '150000 - 450000'),
+]
+
+
+def test_result_lines_are_split_into_columns():
+    # "Page 1" has neither unit, range nor qualitative value: not a result
+    assert lab_result_rows(REPORT) == RESULTS
+
+
+def test_lines_and_text_parse_alike():
+    assert lab_result_rows(REPORT.splitlines()) == RESULTS
+
+
+@pytest.mark.parametrize('line, expected', [
+    ('Glucose 95 mg/dL L', ('Glucose', '95', 'mg/dL', 'L', '')),
+    ('Creatinine: 1.1 mg/dL 0.7 to 1.3', ('Creatinine', '1.1', 'mg/dL', '', '0.7 to 1.3')),
+    ('TSH < 0.01 uIU/mL', ('TSH', '< 0.01', 'uIU/mL', '', '')),
+    ('Urine Sugar Nil', ('Urine Sugar', 'Nil', '', '', '')),
+])
+def test_result_line_variants(line, expected):
+    assert lab_result_rows(line) == [expected]
+
+
+def test_a_match_does_not_run_into_the_next_line():
+    assert lab_result_rows('Remarks\n14.2 g/dL') == []
+
+
+def test_dataframe_parse_keeps_the_same_rows():
+    pytest.importorskip('pandas')
+    from src.lab_parser import parse_lab_results
+
+    df = parse_lab_results(REPORT)
+    assert list(df.columns) == RESULT_COLUMNS
+    assert [tuple(row) for row in df.values.tolist()] == RESULTS
+    assert parse_lab_results('no results here').empty
+
+
+def test_report_header():
+    assert parse_report_header(REPORT) == {'patient_name': 'Ravi Kumar',
+                                           'patient_id': 'P-1001',
+                                           'report_date': '05/03/2024'}
+    assert parse_report_header('Haemoglobin 14.2 g/dL') == {
+        'patient_name': '', 'patient_id': '', 'report_date': ''}
@@ -0,0 +1,96 @@
+"""The batch conversion manifest."""
+
+import json
+import os
+
+import pytest
+
+from src import manifest as manifest_module
+from src.manifest import MANIFEST_NAME, ConversionManifest
+
+
+@pytest.fixture
+def converted(tmp_path):
+    """An input PDF, its output and a manifest recording the conversion."""
+    pdf = tmp_path / 'in' / 'report.pdf'
+    pdf.parent.mkdir()
+    pdf.write_bytes(b'%PDF-1.4 report')
+    output = tmp_path / 'out' / 'report.xlsx'
+    output.parent.mkdir()
+    output.write_bytes(b'workbook')
+    manifest = ConversionManifest(str(output.parent))
+    manifest.record('report.pdf', pdf, output, 'medical')
+    manifest.flush()
+    return pdf, output
+
+
+def test_recorded_conversion_is_up_to_date_after_reload(converted):
+    pdf, output = converted
+    manifest = ConversionManifest(str(output.parent))
+
+    assert manifest.is_up_to_date('report.pdf', pdf, output, 'medical')
+    assert not manifest.is_up_to_date('report.pdf', pdf, output, 'general')
+    assert not manifest.is_up_to_date('other.pdf', pdf, output, 'medical')
+
+
+def test_touched_input_is_recognised_by_its_hash(converted):
+    pdf, output = converted
+    stat = pdf.stat()
+    os.utime(pdf, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    manifest = ConversionManifest(str(output.parent))
+
+    assert manifest.is_up_to_date('report.pdf', pdf, output, 'medical')
+    assert manifest.entries['report.pdf']['mtime_ns'] == stat.st_mtime_ns + 10 ** 9
+
+    pdf.write_bytes(b'%PDF-1.4 amended')
+    assert not manifest.is_up_to_date('report.pdf', pdf, output, 'medical')
+
+
+def test_failed_or_missing_outputs_are_redone(converted):
+    pdf, output = converted
+    manifest = ConversionManifest(str(output.parent))
+    manifest.record('report.pdf', pdf, output, 'medical', error='boom')
+    assert not manifest.is_up_to_date('report.pdf', pdf, output, 'medical')
+
+    manifest.record('report.pdf', pdf, output, 'medical')
+    output.unlink()
+    assert not manifest.is_up_to_date('report.pdf', pdf, output, 'medical')
+
+
+def test_interrupted_write_keeps_the_previous_manifest(converted, monkeypatch):
+    pdf, output = converted
+    path = output.parent / MANIFEST_NAME
+    before = path.read_bytes()
+
+    def torn_dump(data, f):
+        f.write('{"version": 1, "entries": {"rep')
+        raise KeyboardInterrupt
+    monkeypatch.setattr(manifest_module.json, 'dump', torn_dump)
+    manifest = ConversionManifest(str(output.parent))
+    manifest.record('second.pdf', pdf, output, 'medical')
+    with pytest.raises(KeyboardInterrupt):
+        manifest.flush()
+
+    assert path.read_bytes() == before
+    assert sorted(p.name for p in output.parent.iterdir()) == [MANIFEST_NAME, 'report.xlsx']
+
+
+def test_torn_manifest_file_is_ignored(converted):
+    pdf, output = converted
+    (output.parent / MANIFEST_NAME).write_text('{"version": 1, "entries": {"rep')
+
+    manifest = ConversionManifest(str(output.parent))
+    assert manifest.entries == {}
+    assert not manifest.is_up_to_date('report.pdf', pdf, output, 'medical')
+
+
+def test_records_are_flushed_at_most_every_interval(converted):
+    pdf, output = converted
+    manifest = ConversionManifest(str(output.parent), flush_interval=3600)
+    manifest.record('second.pdf', pdf, output, 'medical')
+    on_disk = json.loads((output.parent / MANIFEST_NAME).read_text())
+    assert list(on_disk['entries']) == ['report.pdf']
+
+    manifest.flush()
+    on_disk = json.loads((output.parent / MANIFEST_NAME).read_text())
+    assert sorted(on_disk['entries']) == ['report.pdf', 'second.pdf']
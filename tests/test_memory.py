@@ -0,0 +1,44 @@
+"""Streamed extraction keeps a memory ceiling as the page count grows.
+
+benchmarks/memory_bench.py measures peak RSS on long reports; this
+check traces Python allocations on short ones, so it runs quickly.
+"""
+
+import io
+import tracemalloc
+
+import pytest
+
+pytest.importorskip('pdfplumber')
+
+from src.extractor import stream_lab_report  # noqa: E402
+from src.sinks import get_sink  # noqa: E402
+
+SHORT_PAGES, LONG_PAGES = 3, 12
+# Allocations held at the peak, and what each extra page may add to it
+# (pdfminer keeps a small per-page cache of document objects)
+CEILING_MB = 8.0
+PER_PAGE_MB = 0.2
+
+
+def streamed_peak_mb(pdf: bytes, output) -> float:
+    tracemalloc.start()
+    try:
+        stream_lab_report(io.BytesIO(pdf), output, get_sink('csv'))
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+
+def test_streamed_peak_memory_stays_flat(report_pdf, tmp_path):
+    output = tmp_path / 'report.csv'
+    # Warm up imports and module caches outside the traced runs
+    stream_lab_report(io.BytesIO(report_pdf('text', 1)), output, get_sink('csv'))
+
+    short = streamed_peak_mb(report_pdf('text', SHORT_PAGES), output)
+    long = streamed_peak_mb(report_pdf('text', LONG_PAGES), output)
+
+    assert long < CEILING_MB
+    assert long - short < PER_PAGE_MB * (LONG_PAGES - SHORT_PAGES)
+    with open(output, encoding='utf-8') as f:
+        assert sum(1 for _ in f) > LONG_PAGES
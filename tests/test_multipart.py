@@ -0,0 +1,91 @@
+"""Incremental multipart/form-data parsing of raw request bodies."""
+
+import io
+
+import pytest
+
+from src.multipart import (MAX_FIELD_SIZE, MultipartError, MultipartParser,
+                           RequestTooLarge, boundary_from_content_type)
+
+BOUNDARY = b'----form7MA4YWxk'
+# File data holding a near-delimiter, so a partial match must be kept as data
+PDF = b'%PDF-1.4\r\n----form7MA4YWx\r\n--' + bytes(range(256)) * 4 + b'\r\n%%EOF'
+
+
+def body(*parts, boundary=BOUNDARY):
+    """Encode (name, filename, data) parts as a multipart body."""
+    out = b'preamble\r\n'
+    for name, filename, data in parts:
+        out += b'--' + boundary + b'\r\n'
+        disposition = f'form-data; name="{name}"'
+        if filename is not None:
+            disposition += f'; filename="{filename}"'
+        out += f'Content-Disposition: {disposition}\r\n'.encode()
+        if filename is not None:
+            out += b'Content-Type: application/pdf\r\n'
+        out += b'\r\n' + data + b'\r\n'
+    return out + b'--' + boundary + b'--\r\nepilogue'
+
+
+def parse(data, chunk_size=64 * 1024, max_size=10 * 1024 * 1024, length=True):
+    parser = MultipartParser(io.BytesIO(data), BOUNDARY, len(data) if length else None,
+                             max_size, chunk_size=chunk_size, spool_size=512)
+    return parser.parse()
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 16, 19, 64, 1000])
+def test_boundary_split_across_chunks(chunk_size):
+    # Every delimiter (len 20) straddles at least one chunk edge for these sizes
+    fields, files = parse(body(('format', None, b'medical'), ('file', 'r.pdf', PDF),
+                               ('output', None, b'csv')), chunk_size)
+
+    assert fields == {'format': 'medical', 'output': 'csv'}
+    part = files['file']
+    assert (part.filename, part.content_type, part.size) == ('r.pdf', 'application/pdf', len(PDF))
+    assert part.file.read() == PDF
+    part.close()
+
+
+def test_body_without_content_length_is_read_to_eof():
+    fields, files = parse(body(('file', 'r.pdf', PDF)), chunk_size=100, length=False)
+    assert files['file'].file.read() == PDF
+
+
+def test_truncated_body():
+    data = body(('file', 'r.pdf', PDF))
+    with pytest.raises(MultipartError, match='Unexpected end'):
+        parse(data[:len(data) // 2], chunk_size=50)
+
+
+def test_declared_length_over_the_limit_is_refused_before_reading():
+    stream = io.BytesIO(body(('file', 'r.pdf', PDF)))
+    with pytest.raises(RequestTooLarge):
+        MultipartParser(stream, BOUNDARY, 10 ** 9, 1000).parse()
+    assert stream.tell() == 0
+
+
+def test_undeclared_length_over_the_limit_stops_reading():
+    data = body(('file', 'r.pdf', PDF * 10))
+    stream = io.BytesIO(data)
+    with pytest.raises(RequestTooLarge):
+        MultipartParser(stream, BOUNDARY, None, 2000, chunk_size=100).parse()
+    assert stream.tell() <= 2100
+
+
+def test_oversized_form_field():
+    with pytest.raises(RequestTooLarge, match="'notes'"):
+        parse(body(('notes', None, b'x' * (MAX_FIELD_SIZE + 1))))
+
+
+def test_part_without_name():
+    data = (b'--' + BOUNDARY + b'\r\nContent-Disposition: form-data\r\n\r\nx\r\n--'
+            + BOUNDARY + b'--\r\n')
+    with pytest.raises(MultipartError, match='name'):
+        parse(data)
+
+
+def test_boundary_from_content_type():
+    assert boundary_from_content_type(
+        'multipart/form-data; charset=utf-8; Boundary="abc def"') == b'abc def'
+    with pytest.raises(MultipartError):
+        boundary_from_content_type('multipart/form-data')
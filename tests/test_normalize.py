@@ -0,0 +1,71 @@
+"""Column typing and widths of extracted tables."""
+
+import datetime
+
+import pytest
+
+pd = pytest.importorskip('pandas')
+
+from src.normalize import (DATE, NUMERIC, TEXT, column_type,  # noqa: E402
+                           column_widths, normalize_frame)
+
+
+def normalized(*values):
+    return normalize_frame(pd.DataFrame({'column': list(values)}))['column']
+
+
+def test_integer_column():
+    column = normalized('12', '1,200', ' 7 ')
+    assert column.dtype == 'int64'
+    assert column.tolist() == [12, 1200, 7]
+
+
+def test_blanks_make_a_float_column_with_missing_values():
+    column = normalized('1.5', '', None, '2')
+    assert column.dtype == 'float64'
+    assert column.iloc[0] == 1.5 and column.iloc[3] == 2.0
+    assert column.iloc[1:3].isna().all()
+
+
+@pytest.mark.parametrize('values', [
+    ('007', '12'),                         # leading zero
+    ('1234567890123456', '1'),             # more than 15 digits
+    ('14.2', 'High'),                      # not all numbers
+    ('05/03/2024', '2024-03-06'),          # mixed date formats
+    ('31/02/2024',),                       # not a date
+])
+def test_values_that_would_be_damaged_stay_text(values):
+    column = normalized(*values)
+    assert column.tolist() == list(values)
+    assert column_type(column) == TEXT
+
+
+def test_day_first_dates():
+    column = normalized('05/03/2024', '', '28/02/2024')
+    assert column[[0, 2]].tolist() == [datetime.date(2024, 3, 5), datetime.date(2024, 2, 28)]
+    assert pd.isna(column[1])
+    assert column_type(column) == DATE
+
+
+def test_empty_column_is_left_alone():
+    column = normalized('', None)
+    assert column.iloc[0] == '' and pd.isna(column.iloc[1])
+
+
+def test_column_types():
+    assert column_type(pd.Series([1, 2])) == NUMERIC
+    assert column_type(pd.Series([1.5, None], dtype=object)) == NUMERIC
+    assert column_type(pd.Series([True, False])) == TEXT
+    assert column_type(pd.Series(['a'])) == TEXT
+
+
+def test_column_widths_fit_values_and_headers():
+    df = pd.DataFrame({'Test': ['Haemoglobin', 'MCV'], 'Value': [14.2, None],
+                       'Remarks': ['x' * 80, '']})
+    assert column_widths(df) == [len('Haemoglobin') + 2, len('Value') + 2, 50]
+
+
+def test_column_widths_of_a_long_frame_are_sampled():
+    df = pd.DataFrame({'Value': ['1'] * 500 + ['1234567890']})
+    assert column_widths(df, sample_rows=100) == [len('Value') + 2]
+    assert column_widths(df) == [12]
@@ -0,0 +1,60 @@
+"""Pages without a text layer are OCR'd on every conversion path."""
+
+import csv
+import io
+
+import pytest
+
+pytest.importorskip('pdfplumber')
+
+from benchmarks.corpus import build_prose_pdf  # noqa: E402
+from src.ocr_processor import OCRProcessor, ocr_processor  # noqa: E402
+from src.pdf_extractor import PDFtoExcelConverter  # noqa: E402
+
+RESULT = 'Haemoglobin 14.2 g/dL 13.0 - 17.0'
+
+
+@pytest.fixture
+def scan(tmp_path):
+    """A one-page PDF without a text layer."""
+    path = tmp_path / 'scan.pdf'
+    path.write_bytes(build_prose_pdf([]))
+    return path
+
+
+@pytest.fixture
+def fake_ocr(monkeypatch):
+    """Make OCR available and 'recognise' RESULT on every page."""
+    calls = []
+
+    def ocr_pages(pdf_path, page_numbers, workers=None):
+        calls.append(list(page_numbers))
+        return {number: RESULT for number in page_numbers}
+    monkeypatch.setattr(ocr_processor, 'available', lambda: True)
+    monkeypatch.setattr(ocr_processor, 'ocr_pages', ocr_pages)
+    return calls
+
+
+@pytest.mark.parametrize('backend', ['pypdf', 'pdfplumber'])
+def test_cli_conversion_ocrs_scanned_pages(scan, fake_ocr, tmp_path, backend):
+    output = tmp_path / 'scan.csv'
+    PDFtoExcelConverter('medical', backend).convert_pdf(str(scan), str(output))
+
+    assert fake_ocr == [[1]]
+    with open(output, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert [(row['Test'], row['Value']) for row in rows] == [('Haemoglobin', '14.2')]
+
+
+def test_ocr_pools_are_shared_between_documents(report_pdf):
+    pytest.importorskip('pypdfium2')
+    pytest.importorskip('PIL')
+    processor = OCRProcessor(workers=2, cache=None)
+    processor._run_tesseract = lambda image: [('word', 0, 0, 10, 10, 95.0)]
+
+    first = processor.ocr_pages(io.BytesIO(report_pdf('text', 2)), [1, 2])
+    pools = processor._pools
+    second = processor.ocr_pages(io.BytesIO(report_pdf('text', 2, seed=1)), [1, 2])
+
+    assert first == second == {1: 'word', 2: 'word'}
+    assert pools is not None and processor._pools is pools
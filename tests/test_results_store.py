@@ -0,0 +1,103 @@
+"""The SQLite store of extracted lab results."""
+
+import pytest
+
+from src.results_store import ResultsStore, build_report, iso_date
+
+TEXT = """\
+Patient Name: Ravi Kumar
+Patient ID: P-1001
+Report Date: 05/03/2024
+Haemoglobin 17.7 g/dL H 13.0 - 17.0
+HbA1c 6.1 % 4.0 - 5.6
+"""
+
+
+def report(sha256, patient_id, report_date, rows, source=None):
+    return {'source': source or f'{sha256}.pdf', 'sha256': sha256,
+            'patient_name': '', 'patient_id': patient_id,
+            'report_date': report_date, 'pages': 1, 'rows': rows}
+
+
+@pytest.fixture
+def store(tmp_path):
+    with ResultsStore(tmp_path / 'results.db') as store:
+        store.add_report(report('aa', 'P1', '2024-03-05', [
+            ('Haemoglobin', '14.2', 'g/dL', '', '13.0 - 17.0'),
+            ('HbA1c', '6.1', '%', 'H', '4.0 - 5.6')]))
+        store.add_report(report('bb', 'P2', '2024-02-01', [('hba1c', '5.2', '%', '', '')]))
+        store.add_report(report('cc', 'P1', '2024-04-10', [('HbA1c', '5.9', '%', 'H', '')]))
+        store.flush()
+        yield store
+
+
+def values(rows):
+    return [(row[1], row[3], row[4]) for row in rows]
+
+
+def test_build_report_parses_the_text(tmp_path):
+    pdf = tmp_path / 'report.pdf'
+    pdf.write_bytes(b'%PDF-1.4')
+    built = build_report(pdf, TEXT, pages=1)
+
+    assert (built['patient_name'], built['patient_id'], built['report_date']) == (
+        'Ravi Kumar', 'P-1001', '2024-03-05')
+    assert [row[0] for row in built['rows']] == ['Haemoglobin', 'HbA1c']
+    assert len(built['sha256']) == 64
+
+
+@pytest.mark.parametrize('printed, expected', [
+    ('05/03/2024', '2024-03-05'), ('2024-03-05', '2024-03-05'),
+    ('5.3.2024', '2024-03-05'), ('05-03-24', '2024-03-05'), ('March 5', 'March 5'),
+])
+def test_iso_date(printed, expected):
+    assert iso_date(printed) == expected
+
+
+def test_query_by_test_is_case_insensitive_and_ordered_by_date(store):
+    assert values(store.query(['HBA1C'])) == [('P2', 'hba1c', '5.2'), ('P1', 'HbA1c', '6.1'),
+                                             ('P1', 'HbA1c', '5.9')]
+    assert store.count(['hb%']) == 3
+    assert store.count(['hb%', 'h_emoglobin']) == 4
+
+
+def test_query_filters(store):
+    assert values(store.query(patient_id='P1', date_from='2024-04-01')) == [
+        ('P1', 'HbA1c', '5.9')]
+    assert values(store.query(date_to='2024-03-05', flagged=True)) == [('P1', 'HbA1c', '6.1')]
+    assert values(store.query(sha256='BB')) == [('P2', 'hba1c', '5.2')]
+    assert len(list(store.query(limit=2))) == 2
+    assert store.count(patient_id='P3') == 0
+
+
+def test_loading_a_file_again_replaces_its_rows(store):
+    store.add_report(report('aa', 'P1', '2024-03-05', [('MCV', '88', 'fL', '', '')]))
+    store.flush()
+
+    assert values(store.query(sha256='aa')) == [('P1', 'MCV', '88')]
+    assert store.stats() == {'reports': 3, 'results': 3, 'patients': 2,
+                             'first_date': '2024-02-01', 'last_date': '2024-04-10'}
+
+
+def test_reports_are_buffered_until_the_batch_is_full(tmp_path):
+    path = tmp_path / 'results.db'
+    with ResultsStore(path, batch_rows=3) as store:
+        store.add_report(report('aa', 'P1', '2024-03-05', [('MCV', '88', 'fL', '', '')] * 2))
+        assert store.has_report('aa') and store.stats()['reports'] == 0
+        store.add_report(report('bb', 'P1', '2024-03-06', [('MCV', '90', 'fL', '', '')]))
+        assert store.stats()['results'] == 3
+        store.add_report(report('cc', 'P1', '2024-03-07', [('MCV', '91', 'fL', '', '')]))
+    # close() writes what is still queued
+    with ResultsStore(path) as store:
+        assert store.stats()['reports'] == 3
+        assert store.has_report('cc') and not store.has_report('dd')
+        assert not store.has_report(None)
+
+
+def test_a_failed_batch_is_rolled_back(tmp_path):
+    with ResultsStore(tmp_path / 'results.db') as store:
+        store.add_report(report('aa', 'P1', '2024-03-05', [('MCV', '88', 'fL', '', '')]))
+        store.add_report(report('bb', 'P1', '2024-03-06', [('MCV', '90')]))
+        with pytest.raises(ValueError):
+            store.flush()
+        assert store.stats()['reports'] == 0
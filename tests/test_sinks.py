@@ -0,0 +1,27 @@
+"""CSV output has the same bytes whichever path writes it."""
+
+import io
+
+import pytest
+
+pd = pytest.importorskip('pandas')
+
+from src.sinks import get_sink  # noqa: E402
+
+
+def test_rows_and_frame_write_the_same_bytes():
+    columns = ['Test', 'Value', 'Unit']
+    rows = [['Haemoglobin', '14.2', 'g/dL'], ['HBsAg', 'Non Reactive', '']]
+    sink = get_sink('csv')
+
+    from_rows, from_frame = io.BytesIO(), io.BytesIO()
+    sink.write_rows(rows, columns, from_rows)
+    sink.write_dataframe(pd.DataFrame(rows, columns=columns), from_frame)
+
+    assert from_rows.getvalue() == from_frame.getvalue()
+
+
+def test_csv_lines_end_with_crlf():
+    output = io.BytesIO()
+    get_sink('csv').write_rows([['a', 'b']], ['x', 'y'], output)
+    assert output.getvalue() == b'x,y\r\na,b\r\n'
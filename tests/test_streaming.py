@@ -0,0 +1,55 @@
+"""Streamed XLSX responses start before extraction finishes.
+
+Each entry point serves a multi-page report with ``stream=1`` on a local
+server. The first body byte must arrive before the last page has been
+extracted, over chunked transfer encoding, and the streamed workbook
+must hold the same rows as the buffered one. benchmarks/ttfb_bench.py
+times the same on long reports and measures peak memory.
+"""
+
+import time
+
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('pdfplumber')
+pytest.importorskip('openpyxl')
+
+import src.extractor as extractor  # noqa: E402
+from benchmarks.load_test import start_server  # noqa: E402
+from benchmarks.ttfb_bench import multipart_body, shape, timed_post  # noqa: E402
+
+PAGES = 12
+
+
+@pytest.fixture
+def page_times(monkeypatch):
+    """Record when each page's rows are extracted."""
+    times = []
+    batches = extractor._lab_row_batches
+
+    def timed_batches(*args):
+        for batch in batches(*args):
+            times.append(time.perf_counter())
+            yield batch
+    monkeypatch.setattr(extractor, '_lab_row_batches', timed_batches)
+    return times
+
+
+@pytest.mark.parametrize('target', ['index', 'app', 'convert'])
+def test_first_byte_arrives_before_extraction_finishes(target, page_times, report_pdf):
+    pdf = report_pdf('single_table', PAGES)
+    server = start_server(target)
+    port = server.server_address[1]
+    try:
+        _, _, buffered, _ = timed_post(port, multipart_body(pdf, '0'))
+        page_times.clear()
+        started = time.perf_counter()
+        first_byte, _, streamed, chunked = timed_post(port, multipart_body(pdf, '1'))
+    finally:
+        server.shutdown()
+
+    assert chunked
+    assert len(page_times) >= PAGES
+    assert started + first_byte < page_times[-1], "first byte came after the last page"
+    assert shape(streamed) == shape(buffered)
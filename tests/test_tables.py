@@ -0,0 +1,57 @@
+"""Stitching table fragments into logical tables."""
+
+import io
+
+import pytest
+
+from src.tables import stack_tables
+
+pd = pytest.importorskip('pandas')
+
+from src.tables import combine_tables, stitch_tables  # noqa: E402
+
+CBC = [['Test', 'Value'], ['Haemoglobin', '14.2'], ['MCV', '88']]
+CBC_MORE = [['Test', 'Value'], ['Platelet Count', '2.5']]
+LIPID = [['Test', 'Value', 'Reference'], ['Cholesterol', '180', '< 200']]
+
+
+def bodies(pages):
+    return [frame.values.tolist() for frame in stitch_tables(pages)]
+
+
+def test_repeated_header_continues_across_a_page_break():
+    assert bodies([[CBC], [CBC_MORE]]) == [CBC[1:] + CBC_MORE[1:]]
+
+
+def test_headerless_fragment_continues_across_a_page_break():
+    assert bodies([[CBC], [CBC_MORE[1:]]]) == [CBC[1:] + CBC_MORE[1:]]
+
+
+def test_same_header_panels_on_one_page_stay_apart():
+    assert bodies([[CBC, CBC_MORE]]) == [CBC[1:], CBC_MORE[1:]]
+
+
+def test_only_the_first_table_on_a_page_continues():
+    # LIPID opens page 2, so the CBC table after it starts anew
+    assert bodies([[CBC], [LIPID, CBC_MORE]]) == [CBC[1:], LIPID[1:], CBC_MORE[1:]]
+    # a page without tables breaks the chain
+    assert bodies([[CBC], [], [CBC_MORE]]) == [CBC[1:], CBC_MORE[1:]]
+
+
+def test_panels_of_one_page_are_separate_tables(report_pdf):
+    pytest.importorskip('pdfplumber')
+    from src.extractor import PDFExtractor
+
+    tables = PDFExtractor.extract_tables(io.BytesIO(report_pdf('multi_table', 1)))
+    assert [len(table) for table in tables] == [11, 11, 11]
+
+
+def test_stack_tables_takes_the_union_of_columns():
+    columns, rows = stack_tables([[CBC, LIPID]])
+
+    assert columns == ['Test', 'Value', 'Reference']
+    assert rows == [['Haemoglobin', '14.2', None], ['MCV', '88', None],
+                    ['Cholesterol', '180', '< 200']]
+    frame = combine_tables(stitch_tables([[CBC, LIPID]]))
+    assert list(frame.columns) == columns
+    assert frame.astype(object).where(frame.notna(), None).values.tolist() == rows
@@ -0,0 +1,42 @@
+"""Learned templates only take pages whose tables fit the learned boxes."""
+
+import pytest
+
+pdfplumber = pytest.importorskip('pdfplumber')
+
+from benchmarks.corpus import build_pdf  # noqa: E402
+from src.templates import TemplateRegistry, learn_templates  # noqa: E402
+
+
+@pytest.fixture
+def registry(tmp_path):
+    """A template learned from two reports with 10-row tables."""
+    samples = []
+    for seed in (1, 2):
+        path = tmp_path / f'sample{seed}.pdf'
+        path.write_bytes(build_pdf('single_table', 1, seed, rows=10))
+        samples.append(str(path))
+    (template, agreement), = learn_templates('short', samples)
+    assert agreement == 1.0
+    return TemplateRegistry([template])
+
+
+def page_tables(registry, tmp_path, rows):
+    path = tmp_path / f'report{rows}.pdf'
+    path.write_bytes(build_pdf('single_table', 1, 3, rows=rows))
+    with pdfplumber.open(path) as pdf:
+        page = pdf.pages[0]
+        return registry.extract_tables(page), page.extract_tables()
+
+
+def test_page_like_the_samples_uses_the_template(registry, tmp_path):
+    tables, detected = page_tables(registry, tmp_path, 10)
+    assert tables == detected
+    assert registry.stats()['hits'] == 1
+
+
+def test_longer_table_falls_back_to_detection(registry, tmp_path):
+    tables, detected = page_tables(registry, tmp_path, 30)
+    assert len(tables[0]) == 31
+    assert tables == detected
+    assert registry.stats()['hits'] == 0
@@ -0,0 +1,45 @@
+"""Streamed XLSX workbooks open in openpyxl with the rows that went in."""
+
+import io
+import math
+
+import pytest
+
+from src.xlsx_stream import iter_xlsx
+
+openpyxl = pytest.importorskip('openpyxl')
+
+
+def load(chunks):
+    return openpyxl.load_workbook(io.BytesIO(b''.join(chunks)))
+
+
+def test_round_trip_with_missing_and_non_finite_values():
+    rows = [
+        ['Hemoglobin', 13.5, 'g/dL'],
+        ['Glucose', math.nan, None],
+        ['Ratio', math.inf, ''],
+        ['Ratio', -math.inf, '  padded '],
+        ['Count', 4200, 'cumm'],
+    ]
+    workbook = load(iter_xlsx(rows, ['Test', 'Value', 'Unit'], chunk_size=64))
+
+    assert workbook.sheetnames == ['Data']
+    values = list(workbook['Data'].values)
+    assert values[0] == ('Test', 'Value', 'Unit')
+    assert values[1:] == [
+        ('Hemoglobin', 13.5, 'g/dL'),
+        ('Glucose', None, None),
+        ('Ratio', None, None),
+        ('Ratio', None, '  padded '),
+        ('Count', 4200, 'cumm'),
+    ]
+
+
+def test_rows_spill_onto_extra_sheets():
+    rows = ([f'Test {i}', i] for i in range(10))
+    workbook = load(iter_xlsx(rows, ['Test', 'Value'], max_rows=4))
+
+    assert workbook.sheetnames == ['Data', 'Data (2)', 'Data (3)', 'Data (4)']
+    values = [row for sheet in workbook.worksheets for row in list(sheet.values)[1:]]
+    assert values == [(f'Test {i}', i) for i in range(10)]